@@ -0,0 +1,124 @@
+"""
+Prebuilt catalog of the available rule sets.
+
+``rule_sets/catalog.json`` describes every rule set (file count, size, token
+estimate, RooCode modes, bundled starters) so ``list-rules --json`` and
+other tooling can read metadata for many sets without walking their trees.
+The catalog is shipped with the package and regenerated with
+``rulebook-ai list-rules --refresh``; it is never written otherwise. Entries
+for rule sets added or edited locally are built on first use and kept in a
+per-directory catalog in the user cache (see ``sources.default_cache_dir``),
+stamped with the modification times of the set's directories so they are
+rebuilt once the set changes.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .sources import default_cache_dir
+
+CATALOG_FILE = "catalog.json"
+CATALOG_VERSION = 1
+CATALOG_CACHE_SUBDIR = "catalogs"
+# Rough size of a token for English prose and Markdown
+BYTES_PER_TOKEN = 4
+
+
+def estimate_tokens(byte_count: int) -> int:
+    """Estimate the number of LLM tokens in a given amount of text."""
+    return -(-byte_count // BYTES_PER_TOKEN)
+
+
+def rule_set_stamp(rule_set_dir: Path) -> int:
+    """
+    Return the latest modification time (ns) of a rule set and its top-level directories.
+
+    Adding, removing or replacing (as editors do when saving) a rule file
+    changes the stamp.
+    """
+    stamp = rule_set_dir.stat().st_mtime_ns
+    with os.scandir(rule_set_dir) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                stamp = max(stamp, entry.stat().st_mtime_ns)
+    return stamp
+
+
+def cached_catalog_path(rule_sets_dir: Path) -> Path:
+    """Return where the user cache keeps locally built catalog entries for a rule sets directory."""
+    digest = hashlib.sha256(str(rule_sets_dir.resolve()).encode('utf-8')).hexdigest()[:16]
+    return default_cache_dir() / CATALOG_CACHE_SUBDIR / f"{digest}.json"
+
+
+def _read_catalog(path: Path) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Read a catalog file; None if it is missing, unreadable or from another catalog version."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != CATALOG_VERSION:
+        return None
+    rule_sets = data.get("rule_sets")
+    return rule_sets if isinstance(rule_sets, dict) else None
+
+
+def _write_catalog(path: Path, entries: Dict[str, Dict[str, Any]]) -> bool:
+    """Atomically write a catalog file; False if it cannot be written."""
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": CATALOG_VERSION, "rule_sets": entries}, f, indent=2,
+                      sort_keys=True)
+            f.write("\n")
+        os.replace(tmp_path, path)
+    except OSError:
+        return False
+    return True
+
+
+def load_catalog(rule_sets_dir: Path) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Load the shipped catalog of a rule sets directory.
+
+    Args:
+        rule_sets_dir: Directory holding the rule sets
+
+    Returns:
+        Catalog entries keyed by rule set name, or None if the catalog is
+        missing, unreadable or from another catalog version
+    """
+    return _read_catalog(rule_sets_dir / CATALOG_FILE)
+
+
+def save_catalog(rule_sets_dir: Path, entries: Dict[str, Dict[str, Any]]) -> bool:
+    """
+    Atomically write the shipped catalog of a rule sets directory.
+
+    Args:
+        rule_sets_dir: Directory holding the rule sets
+        entries: Catalog entries keyed by rule set name
+
+    Returns:
+        True if the catalog was written, False if the directory is not writable
+    """
+    return _write_catalog(rule_sets_dir / CATALOG_FILE, entries)
+
+
+def load_cached_catalog(rule_sets_dir: Path) -> Dict[str, Dict[str, Any]]:
+    """
+    Load the locally built catalog entries of a rule sets directory from the user cache.
+
+    Returns:
+        {"stamp": ..., "entry": ...} records keyed by rule set name (empty if there are none)
+    """
+    return _read_catalog(cached_catalog_path(rule_sets_dir)) or {}
+
+
+def save_cached_catalog(rule_sets_dir: Path, records: Dict[str, Dict[str, Any]]) -> bool:
+    """Write the locally built catalog entries of a rule sets directory to the user cache."""
+    return _write_catalog(cached_catalog_path(rule_sets_dir), records)
@@ -6,11 +6,18 @@ built on the core functionality in the core module.
 """
 
 import argparse
+import json
 import sys
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import Any, Callable, Dict, List, Optional
 
-from .core import RuleManager, DEFAULT_RULE_SET
+from .core import DEFAULT_RULE_SET, RuleManager
+
+# Packages the bundled tool starters depend on
+REQUIRED_PACKAGES = [
+    "openai", "anthropic", "python-dotenv",
+    "playwright", "html5lib", "duckduckgo-search"
+]
 
 
 def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
@@ -34,8 +41,10 @@ def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
     install_parser = subparsers.add_parser("install", help="Install a rule set")
     install_parser.add_argument(
         "--rule-set", "-r",
-        default=DEFAULT_RULE_SET,
-        help=f"Rule set to install (default: {DEFAULT_RULE_SET})"
+        action="append",
+        metavar="RULE_SET",
+        help=f"Rule set to install (default: {DEFAULT_RULE_SET}). Repeat to layer "
+             "overlays on a base set; later sets win for files at the same path"
     )
     install_parser.add_argument(
         "--project-dir", "-p",
@@ -51,6 +60,25 @@ def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
         action="store_true",
         help="Skip creating GitHub Copilot instructions"
     )
+    install_parser.add_argument(
+        "--rule-set-source",
+        metavar="SOURCE",
+        help="Where to find rule sets besides the bundled ones: a directory, an archive "
+             "(.tar.gz/.zip), a file:// URL, or a local git repo as git+file:///path[@ref]. "
+             "Archives and commits are unpacked once into a content-addressed cache"
+    )
+    install_parser.add_argument(
+        "--copilot-budget",
+        type=int,
+        metavar="BYTES",
+        help="Maximum size of .github/copilot-instructions.md "
+             "(default: the rule set's copilot.budget_bytes, if any)"
+    )
+    install_parser.add_argument(
+        "--copilot-budget-action",
+        choices=["warn", "fail"],
+        help="What to do when the Copilot budget is exceeded (default: warn)"
+    )
     
     # Assistant-specific installation flags
     assistant_group = install_parser.add_mutually_exclusive_group()
@@ -96,6 +124,24 @@ def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
         action="store_true",
         help="Skip updating GitHub Copilot instructions"
     )
+    sync_parser.add_argument(
+        "--changed-only",
+        action="store_true",
+        help="Only re-render outputs for rule files changed since the last sync "
+             "(exits immediately when nothing changed; suited to pre-commit hooks)"
+    )
+    sync_parser.add_argument(
+        "--copilot-budget",
+        type=int,
+        metavar="BYTES",
+        help="Maximum size of .github/copilot-instructions.md "
+             "(default: the rule set's copilot.budget_bytes, if any)"
+    )
+    sync_parser.add_argument(
+        "--copilot-budget-action",
+        choices=["warn", "fail"],
+        help="What to do when the Copilot budget is exceeded (default: warn)"
+    )
     
     # Assistant-specific sync flags
     sync_assistant_group = sync_parser.add_mutually_exclusive_group()
@@ -125,6 +171,155 @@ def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
         help="Sync rules for all AI assistants"
     )
     
+    # Status command
+    status_parser = subparsers.add_parser(
+        "status",
+        help="Report stale, missing and orphaned assistant outputs (read-only)"
+    )
+    status_parser.add_argument(
+        "--project-dir", "-p",
+        help="Target project directory (default: current directory)"
+    )
+    status_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print the report as JSON"
+    )
+    
+    # Stats command
+    stats_parser = subparsers.add_parser(
+        "stats",
+        help="Report the bytes and estimated tokens each assistant loads from the installed rules"
+    )
+    stats_parser.add_argument(
+        "--project-dir", "-p",
+        help="Target project directory (default: current directory)"
+    )
+    stats_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print the report as JSON"
+    )
+    stats_parser.add_argument(
+        "--top",
+        type=int,
+        default=10,
+        help="Number of heaviest files and duplicated paragraphs to list (default: 10)"
+    )
+    stats_parser.add_argument(
+        "--fail-over",
+        type=int,
+        metavar="BUDGET",
+        help="Exit with code 1 if any assistant always loads more than BUDGET tokens"
+    )
+    
+    # Memory command
+    memory_parser = subparsers.add_parser("memory", help="Maintain the memory bank")
+    memory_subparsers = memory_parser.add_subparsers(dest="memory_command",
+                                                     help="Memory command to run")
+    memory_subparsers.required = True
+    memory_index_parser = memory_subparsers.add_parser(
+        "index",
+        help="Generate memory/INDEX.md with per-file and per-section summaries, sizes and anchors"
+    )
+    memory_index_parser.add_argument(
+        "--project-dir", "-p",
+        help="Target project directory (default: current directory)"
+    )
+    memory_index_parser.add_argument(
+        "--split-over",
+        type=int,
+        metavar="BYTES",
+        help="First split Markdown memory files larger than BYTES into per-section shards"
+    )
+    
+    memory_snapshot_parser = memory_subparsers.add_parser(
+        "snapshot",
+        help="Record a snapshot of memory/ (unchanged files are deduplicated)"
+    )
+    memory_snapshot_parser.add_argument(
+        "--project-dir", "-p",
+        help="Target project directory (default: current directory)"
+    )
+    memory_snapshot_parser.add_argument(
+        "--message", "-m",
+        default="",
+        help="Note stored with the snapshot"
+    )
+    memory_snapshot_parser.add_argument(
+        "--list",
+        action="store_true",
+        help="List existing snapshots instead of creating one"
+    )
+    memory_diff_parser = memory_subparsers.add_parser(
+        "diff",
+        help="Show changes between two snapshots, or between a snapshot and memory/"
+    )
+    memory_diff_parser.add_argument(
+        "old",
+        nargs="?",
+        default="latest",
+        help="Snapshot id or prefix (default: latest)"
+    )
+    memory_diff_parser.add_argument(
+        "new",
+        nargs="?",
+        help="Later snapshot id or prefix (default: the current memory bank)"
+    )
+    memory_diff_parser.add_argument(
+        "--project-dir", "-p",
+        help="Target project directory (default: current directory)"
+    )
+    memory_diff_parser.add_argument(
+        "--name-only",
+        action="store_true",
+        help="Only list changed files"
+    )
+    memory_restore_parser = memory_subparsers.add_parser(
+        "restore",
+        help="Restore memory/ to a snapshot (the current state is snapshotted first)"
+    )
+    memory_restore_parser.add_argument("snapshot", help="Snapshot id, prefix or 'latest'")
+    memory_restore_parser.add_argument(
+        "--project-dir", "-p",
+        help="Target project directory (default: current directory)"
+    )
+    
+    # Pack command
+    pack_parser = subparsers.add_parser(
+        "pack",
+        help="Archive project_rules/ and the rendered assistant outputs (e.g. for a CI cache)"
+    )
+    pack_parser.add_argument(
+        "--project-dir", "-p",
+        help="Target project directory (default: current directory)"
+    )
+    pack_parser.add_argument(
+        "--output", "-o",
+        help="Archive path (default: rulebook-ai-<key>.tar.gz)"
+    )
+    pack_parser.add_argument(
+        "--print-key",
+        action="store_true",
+        help="Only print the input key of project_rules/, to use as a cache key"
+    )
+    
+    # Unpack command
+    unpack_parser = subparsers.add_parser(
+        "unpack",
+        help="Restore an archive written by 'pack', verifying every file"
+    )
+    unpack_parser.add_argument("archive", help="Archive written by 'rulebook-ai pack'")
+    unpack_parser.add_argument(
+        "--project-dir", "-p",
+        help="Target project directory (default: current directory)"
+    )
+    unpack_parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Restore even if project_rules/ differs from the rules the archive was built from"
+    )
+    
     # Clean-rules command
     clean_rules_parser = subparsers.add_parser("clean-rules", help="Remove installed rules")
     clean_rules_parser.add_argument(
@@ -140,10 +335,34 @@ def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
     )
     
     # List-rules command
-    subparsers.add_parser("list-rules", help="List available rule sets")
+    list_parser = subparsers.add_parser("list-rules", help="List available rule sets")
+    list_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print catalog metadata (files, bytes, token estimate, modes, starters) as JSON"
+    )
+    list_parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Rebuild every catalog entry and rewrite the prebuilt rule_sets/catalog.json"
+    )
     
     # Doctor command
-    subparsers.add_parser("doctor", help="Verify environment and rule activation")
+    doctor_parser = subparsers.add_parser("doctor", help="Verify environment and rule activation")
+    doctor_parser.add_argument(
+        "--perf",
+        action="store_true",
+        help="Measure filesystem latency, tool starter imports, rule tree size and render time"
+    )
+    doctor_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print the --perf report as JSON"
+    )
+    doctor_parser.add_argument(
+        "--project-dir", "-p",
+        help="Project directory to diagnose (default: current directory)"
+    )
     
     return parser.parse_args(args)
 
@@ -177,11 +396,14 @@ def handle_install(args: argparse.Namespace) -> int:
         assistants = ['cursor', 'windsurf', 'cline', 'roo']
     
     return rule_manager.install(
-        rule_set=args.rule_set,
+        rule_set=args.rule_set or [DEFAULT_RULE_SET],
         project_dir=args.project_dir,
         clean_first=args.clean,
         include_copilot=not args.no_copilot,
-        assistants=assistants
+        assistants=assistants,
+        copilot_budget=args.copilot_budget,
+        copilot_budget_action=args.copilot_budget_action,
+        rule_set_source=args.rule_set_source
     )
 
 
@@ -198,7 +420,7 @@ def handle_sync(args: argparse.Namespace) -> int:
     rule_manager = RuleManager()
     
     # Determine which assistants to sync
-    assistants = []
+    assistants: Optional[List[str]] = []
     if args.cursor:
         assistants = ['cursor']
     elif args.windsurf:
@@ -217,10 +439,191 @@ def handle_sync(args: argparse.Namespace) -> int:
         rule_set=args.rule_set,
         project_dir=args.project_dir,
         include_copilot=not args.no_copilot,
-        assistants=assistants
+        assistants=assistants,
+        changed_only=args.changed_only,
+        copilot_budget=args.copilot_budget,
+        copilot_budget_action=args.copilot_budget_action
     )
 
 
+def handle_status(args: argparse.Namespace) -> int:
+    """
+    Handle the 'status' command.
+    
+    Args:
+        args: Parsed command-line arguments
+        
+    Returns:
+        Exit code (0 if outputs are up to date, 1 if they drifted,
+        2 if the project has never been synced)
+    """
+    rule_manager = RuleManager()
+    report = rule_manager.status(project_dir=args.project_dir)
+    
+    if not report["synced"]:
+        exit_code = 2
+    elif report["up_to_date"]:
+        exit_code = 0
+    else:
+        exit_code = 1
+        
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return exit_code
+        
+    if not report["synced"]:
+        print(f"No sync manifest found in {report['project_root']}.")
+        print("Run 'rulebook-ai install' or 'rulebook-ai sync' first.")
+        return exit_code
+        
+    _print_status_changes(report)
+        
+    if report["up_to_date"]:
+        print("All assistant outputs are up to date.")
+    else:
+        print("Assistant outputs are out of date. Run 'rulebook-ai sync' to update them.")
+    return exit_code
+
+
+def _print_status_changes(report: Dict[str, Any]) -> None:
+    """Print the changed sources and the stale, missing and orphaned outputs of a status report."""
+    sources = report["sources"]
+    for kind in ("modified", "added", "removed"):
+        for rel_path in sources[kind]:
+            print(f"  {kind}: project_rules/{rel_path}")
+    for name in report["stale"]:
+        print(f"Stale: {name}")
+    for output in report["missing"]:
+        print(f"Missing: {output}")
+    for output in report["orphaned"]:
+        print(f"Orphaned: {output}")
+
+
+def handle_stats(args: argparse.Namespace) -> int:
+    """
+    Handle the 'stats' command.
+    
+    Args:
+        args: Parsed command-line arguments
+        
+    Returns:
+        Exit code (0 for success, 1 if over the --fail-over budget or nothing is installed)
+    """
+    from .context_cost import over_budget
+
+    rule_manager = RuleManager()
+    report = rule_manager.context_stats(project_dir=args.project_dir, top=args.top)
+    if not report["assistants"]:
+        print(f"Error: No assistant rules found in {report['project_root']}. "
+              "Run 'rulebook-ai install' first.")
+        return 1
+    over = over_budget(report, args.fail_over) if args.fail_over is not None else []
+    
+    if args.json:
+        print(json.dumps(dict(report, over_budget=over), indent=2))
+        return 1 if over else 0
+        
+    _print_context_costs(report["assistants"])
+    
+    print("\nHeaviest files:")
+    for entry in report["heaviest"]:
+        print(f"  {entry['tokens']:>6} tokens  {entry['path']} ({entry['loading']})")
+    if report["duplicates"]:
+        print("\nDuplicated paragraphs:")
+        for entry in report["duplicates"]:
+            print(f"  {entry['assistant']}: {entry['count']}x, ~{entry['wasted_tokens']} tokens "
+                  f"wasted: \"{entry['preview']}...\"")
+            for path in entry["files"]:
+                print(f"      {path}")
+    
+    if over:
+        print(f"\nError: Over the {args.fail_over}-token budget: {', '.join(over)}")
+        return 1
+    return 0
+
+
+def _print_context_costs(assistants: Dict[str, Dict[str, Any]]) -> None:
+    """Print the estimated context cost of each assistant's rules."""
+    print("Estimated context cost per assistant (tokens are approximate):")
+    for name, summary in assistants.items():
+        always, scoped, on_demand = summary["always"], summary["scoped"], summary["on_demand"]
+        print(f"  {name}: always {always['tokens']} tokens ({always['bytes']} bytes, "
+              f"{always['files']} files), scoped {scoped['tokens']}, "
+              f"on demand {on_demand['tokens']}")
+        for mode, totals in summary.get("modes", {}).items():
+            print(f"    mode {mode}: {totals['tokens']} tokens ({totals['bytes']} bytes)")
+        if summary.get("always_chars", 0) > summary.get("char_limit", float("inf")):
+            print(f"    ⚠️ {summary['always_chars']} always-on characters exceed Windsurf's "
+                  f"{summary['char_limit']}-character limit; later rules are dropped")
+
+
+def handle_memory(args: argparse.Namespace) -> int:
+    """
+    Handle the 'memory' command and its subcommands.
+    
+    Args:
+        args: Parsed command-line arguments
+        
+    Returns:
+        Exit code (0 for success)
+    """
+    rule_manager = RuleManager()
+    if args.memory_command == "index":
+        return rule_manager.index_memory(project_dir=args.project_dir, split_over=args.split_over)
+    if args.memory_command == "snapshot":
+        if not args.list:
+            return rule_manager.snapshot_memory(project_dir=args.project_dir, message=args.message)
+        snapshots = rule_manager.memory_snapshots(project_dir=args.project_dir)
+        if not snapshots:
+            print("No memory snapshots yet.")
+        for record in snapshots:
+            line = f"{record['id']}  {record['created']}  {len(record['files'])} files"
+            print(f"{line}  {record['message']}" if record["message"] else line)
+        return 0
+    if args.memory_command == "diff":
+        return rule_manager.diff_memory(args.old, args.new, project_dir=args.project_dir,
+                                        name_only=args.name_only)
+    if args.memory_command == "restore":
+        return rule_manager.restore_memory(args.snapshot, project_dir=args.project_dir)
+    print(f"Error: Unknown memory command '{args.memory_command}'")
+    return 1
+
+
+def handle_pack(args: argparse.Namespace) -> int:
+    """
+    Handle the 'pack' command.
+    
+    Args:
+        args: Parsed command-line arguments
+        
+    Returns:
+        Exit code (0 for success)
+    """
+    rule_manager = RuleManager()
+    if args.print_key:
+        key = rule_manager.pack_key(project_dir=args.project_dir)
+        if key is None:
+            print("Error: project_rules/ not found. Run 'rulebook-ai install' first.")
+            return 1
+        print(key)
+        return 0
+    return rule_manager.pack(project_dir=args.project_dir, output=args.output)
+
+
+def handle_unpack(args: argparse.Namespace) -> int:
+    """
+    Handle the 'unpack' command.
+    
+    Args:
+        args: Parsed command-line arguments
+        
+    Returns:
+        Exit code (0 for success)
+    """
+    rule_manager = RuleManager()
+    return rule_manager.unpack(args.archive, project_dir=args.project_dir, force=args.force)
+
+
 def handle_clean_rules(args: argparse.Namespace) -> int:
     """
     Handle the 'clean-rules' command.
@@ -260,23 +663,74 @@ def handle_list_rules(args: argparse.Namespace) -> int:
         Exit code (0 for success)
     """
     rule_manager = RuleManager()
-    rule_sets = rule_manager.list_rules()
+    catalog = rule_manager.rule_set_catalog(refresh=args.refresh)
+    
+    if args.json:
+        print(json.dumps({"default": DEFAULT_RULE_SET, "rule_sets": catalog}, indent=2))
+        return 0 if catalog else 1
     
-    if not rule_sets:
+    if not catalog:
         print("No rule sets found.")
         return 1
         
     print("Available rule sets:")
-    for rule_set in rule_sets:
-        print(f"  - {rule_set}")
+    for rule_set, entry in catalog.items():
+        print(f"  - {rule_set} ({entry['files']} files, ~{entry['tokens']} tokens)")
         
     print(f"\nDefault rule set: {DEFAULT_RULE_SET}")
     print("\nTo install a rule set:")
-    print(f"  rulebook-ai install --rule-set <rule_set_name>")
+    print("  rulebook-ai install --rule-set <rule_set_name>")
     
     return 0
 
 
+def handle_doctor_perf(args: argparse.Namespace) -> int:
+    """
+    Handle 'doctor --perf': measure and report against PERF_THRESHOLDS.
+    
+    Args:
+        args: Parsed command-line arguments
+        
+    Returns:
+        Exit code (0 for success)
+    """
+    from .diagnostics import evaluate, installed_versions
+
+    rule_manager = RuleManager()
+    report = rule_manager.perf_report(project_dir=args.project_dir)
+    report["packages"] = installed_versions(REQUIRED_PACKAGES)
+    checks = evaluate(report)
+    
+    if args.json:
+        print(json.dumps(dict(report, checks=checks), indent=2))
+        return 0
+        
+    print(f"Rulebook-AI Doctor: performance report for {report['project_root']}")
+    tree = report["rule_tree"]
+    print(f"Rule tree: {tree['files']} files, {tree['bytes']} bytes (~{tree['tokens']} tokens) "
+          f"in {tree['source']}")
+    if tree["largest"]:
+        print(f"  Largest file: {tree['largest']}")
+    print("Filesystem latency (median / max ms):")
+    for op, summary in report["filesystem"].items():
+        print(f"  {op}: {summary['median']} / {summary['max']}")
+    
+    print("\nChecks:")
+    for check in checks:
+        icon = "✅" if check["status"] == "ok" else "⚠️"
+        value = "n/a" if check["value"] is None else check["value"]
+        print(f"{icon} {check['name']}: {value} (threshold {check['threshold']})")
+        if check.get("error"):
+            print(f"   {check['error']}")
+    
+    warnings = [check for check in checks if check["status"] != "ok"]
+    if any(check["name"].startswith("fs.") for check in warnings):
+        print("\nℹ️ Slow file operations usually mean a network filesystem, a sync client or an")
+        print("   antivirus scanner on the project directory. Consider excluding it from scanning.")
+    print(f"\nPerformance check complete: {len(warnings)} warning(s).")
+    return 0
+
+
 def handle_doctor(args: argparse.Namespace) -> int:
     """
     Handle the 'doctor' command.
@@ -289,6 +743,12 @@ def handle_doctor(args: argparse.Namespace) -> int:
     Returns:
         Exit code (0 for success)
     """
+    if args.json and not args.perf:
+        print("Error: --json is only supported together with --perf")
+        return 1
+    if args.perf:
+        return handle_doctor_perf(args)
+        
     print("Rulebook-AI Doctor: Checking environment and setup...")
     
     # Check Python version
@@ -308,30 +768,47 @@ def handle_doctor(args: argparse.Namespace) -> int:
     else:
         print("⚠️ WARNING: Not running in a virtual environment")
     
-    # Check installed packages
+    _check_packages()
+    _check_project_files(Path.cwd())
+    
+    # Check for known issues
+    print("\nChecking for known issues...")
+    
+    # Check for the Windsurf activation bug
     try:
-        import importlib.metadata
-        required_packages = [
-            "openai", "anthropic", "python-dotenv", 
-            "playwright", "html5lib", "duckduckgo-search"
-        ]
-        missing = []
-        for pkg in required_packages:
-            try:
-                version = importlib.metadata.version(pkg)
-                print(f"✅ {pkg} version {version} installed")
-            except importlib.metadata.PackageNotFoundError:
-                missing.append(pkg)
-                print(f"❌ {pkg} not installed")
-        
-        if missing:
-            print("\n⚠️ Some required packages are missing. Install them with:")
-            print(f"  pip install {' '.join(missing)}")
-    except ImportError:
-        print("⚠️ Unable to check installed packages (importlib.metadata not available)")
+        import os
+        if "WINDSURF_ACTIVATION_TOKEN" in os.environ:
+            print("✅ WINDSURF_ACTIVATION_TOKEN is set in environment")
+        else:
+            print("ℹ️ WINDSURF_ACTIVATION_TOKEN not found in environment")
+            print("   This is only needed if you're using Windsurf")
+    except Exception:
+        print("⚠️ Unable to check for Windsurf activation token")
     
+    print("\nDiagnostic check complete.")
+    return 0
+
+
+def _check_packages() -> None:
+    """Report which required packages are installed."""
+    from .diagnostics import installed_versions
+    versions = installed_versions(REQUIRED_PACKAGES)
+    missing = []
+    for pkg, version in versions.items():
+        if version is not None:
+            print(f"✅ {pkg} version {version} installed")
+        else:
+            missing.append(pkg)
+            print(f"❌ {pkg} not installed")
+    
+    if missing:
+        print("\n⚠️ Some required packages are missing. Install them with:")
+        print(f"  pip install {' '.join(missing)}")
+
+
+def _check_project_files(cwd: Path) -> None:
+    """Report whether the project has rules and a .env file."""
     # Check for project rules
-    cwd = Path.cwd()
     rules_dir = cwd / "project_rules"
     if rules_dir.is_dir():
         rule_count = len([f for f in rules_dir.glob("*.md") if f.is_file()])
@@ -350,27 +827,25 @@ def handle_doctor(args: argparse.Namespace) -> int:
     else:
         env_example = cwd / ".env.example"
         if env_example.exists():
-            print(f"⚠️ .env file not found, but .env.example exists")
+            print("⚠️ .env file not found, but .env.example exists")
             print("   Create a .env file by copying .env.example and filling in your API keys")
         else:
             print("❌ Neither .env nor .env.example found")
-    
-    # Check for known issues
-    print("\nChecking for known issues...")
-    
-    # Check for the Windsurf activation bug
-    try:
-        import os
-        if "WINDSURF_ACTIVATION_TOKEN" in os.environ:
-            print("✅ WINDSURF_ACTIVATION_TOKEN is set in environment")
-        else:
-            print("ℹ️ WINDSURF_ACTIVATION_TOKEN not found in environment")
-            print("   This is only needed if you're using Windsurf")
-    except Exception:
-        print("⚠️ Unable to check for Windsurf activation token")
-    
-    print("\nDiagnostic check complete.")
-    return 0
+
+
+COMMAND_HANDLERS: Dict[str, Callable[[argparse.Namespace], int]] = {
+    "install": handle_install,
+    "sync": handle_sync,
+    "status": handle_status,
+    "stats": handle_stats,
+    "memory": handle_memory,
+    "pack": handle_pack,
+    "unpack": handle_unpack,
+    "clean-rules": handle_clean_rules,
+    "clean-all": handle_clean_all,
+    "list-rules": handle_list_rules,
+    "doctor": handle_doctor,
+}
 
 
 def main(args: Optional[List[str]] = None) -> int:
@@ -386,22 +861,12 @@ def main(args: Optional[List[str]] = None) -> int:
     parsed_args = parse_args(args)
     
     # Handle the selected command
-    if parsed_args.command == "install":
-        return handle_install(parsed_args)
-    elif parsed_args.command == "sync":
-        return handle_sync(parsed_args)
-    elif parsed_args.command == "clean-rules":
-        return handle_clean_rules(parsed_args)
-    elif parsed_args.command == "clean-all":
-        return handle_clean_all(parsed_args)
-    elif parsed_args.command == "list-rules":
-        return handle_list_rules(parsed_args)
-    elif parsed_args.command == "doctor":
-        return handle_doctor(parsed_args)
-    else:
+    handler = COMMAND_HANDLERS.get(parsed_args.command)
+    if handler is None:
         print("Error: Please specify a command.")
         print("Run 'rulebook-ai --help' for usage information.")
         return 1
+    return handler(parsed_args)
 
 
 if __name__ == "__main__":
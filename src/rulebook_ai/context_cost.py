@@ -0,0 +1,212 @@
+"""
+Context-cost model of the rule files each assistant loads.
+
+Assistants load rule files differently, so the same rule set costs each of
+them a different number of tokens per request:
+
+- Cursor (``.mdc``): ``alwaysApply: true`` rules are always sent, rules with
+  ``globs`` only for matching files, the rest only when the model or user
+  asks for them.
+- Windsurf: ``trigger: always_on`` (or no trigger) rules are always sent,
+  ``glob`` rules for matching files, ``model_decision``/``manual`` on demand.
+  Windsurf also caps the always-on rules at ``WINDSURF_CHAR_LIMIT`` characters
+  and silently drops the rest.
+- Cline: every file in ``.clinerules/`` is always sent.
+- RooCode: ``.roo/rules/`` is sent in every mode, ``.roo/rules-<mode>/`` only
+  in that mode.
+- GitHub Copilot: ``copilot-instructions.md`` is always sent,
+  ``*.instructions.md`` files only for files matching their ``applyTo``.
+
+Token counts use ``approximate_tokens``, an offline approximation of BPE
+tokenizers, so no tokenizer package or network access is needed.
+"""
+
+import hashlib
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from .frontmatter import parse_globs, split_frontmatter
+
+ALWAYS = "always"
+SCOPED = "scoped"
+ON_DEMAND = "on_demand"
+LOADING_CLASSES = (ALWAYS, SCOPED, ON_DEMAND)
+# Roo mode name used for rules shared by all modes
+ROO_BASE_MODE = "default"
+WINDSURF_CHAR_LIMIT = 12000
+# Paragraphs shorter than this are too generic to report as duplicates
+MIN_DUPLICATE_CHARS = 80
+
+_WORD_PATTERN = re.compile(r"[A-Za-z]+|\d+|[^\w\s]+|[^\x00-\x7f]")
+
+
+def approximate_tokens(text: str) -> int:
+    """
+    Approximate the token count of text as a BPE tokenizer would split it.
+
+    Common words are a single token and long words split every ~6 letters;
+    digits group by three, punctuation runs (Markdown markers) by two and
+    each non-ASCII character is a token of its own.
+
+    Args:
+        text: Text to count
+
+    Returns:
+        Estimated number of tokens
+    """
+    tokens = 0
+    for match in _WORD_PATTERN.finditer(text):
+        chunk = match.group()
+        if chunk[0].isalpha() and chunk.isascii():
+            tokens += -(-len(chunk) // 6)
+        elif chunk[0].isdigit():
+            tokens += -(-len(chunk) // 3)
+        elif chunk.isascii():
+            tokens += -(-len(chunk) // 2)
+        else:
+            tokens += 1
+    return tokens
+
+
+def _is_true(value: str) -> bool:
+    """Interpret a frontmatter boolean."""
+    return value.strip().strip('"\'').lower() == "true"
+
+
+def loading_class(assistant: str, rel_path: str, text: str, mode: Optional[str] = None) -> str:
+    """
+    Classify when an assistant loads a rendered rule file.
+
+    Args:
+        assistant: Assistant name ('cursor', 'windsurf', 'cline', 'roo' or 'copilot')
+        rel_path: Output path relative to the project root
+        text: Content of the output file
+        mode: RooCode mode the file is restricted to, if any
+
+    Returns:
+        ALWAYS, SCOPED or ON_DEMAND (mode-specific RooCode rules count as SCOPED)
+    """
+    fields, _ = split_frontmatter(text)
+    if assistant == 'cursor':
+        if _is_true(fields.get('alwaysApply', '')):
+            return ALWAYS
+        return SCOPED if parse_globs(fields.get('globs', '')) else ON_DEMAND
+    if assistant == 'windsurf':
+        trigger = fields.get('trigger', 'always_on').strip().strip('"\'')
+        if trigger == 'always_on':
+            return ALWAYS
+        return SCOPED if trigger == 'glob' else ON_DEMAND
+    if assistant == 'copilot':
+        return SCOPED if rel_path.endswith(".instructions.md") else ALWAYS
+    return SCOPED if mode else ALWAYS
+
+
+def _paragraphs(text: str) -> List[str]:
+    """Split a file body into whitespace-normalized paragraphs."""
+    _, body = split_frontmatter(text)
+    paragraphs = (" ".join(block.split()) for block in re.split(r"\n[ \t]*\n", body))
+    return [paragraph for paragraph in paragraphs if len(paragraph) >= MIN_DUPLICATE_CHARS]
+
+
+def _empty_totals() -> Dict[str, int]:
+    """Return zeroed file/byte/token totals."""
+    return {"files": 0, "bytes": 0, "tokens": 0}
+
+
+def _add(totals: Dict[str, int], size: int, tokens: int) -> None:
+    """Add one file to a totals dictionary."""
+    totals["files"] += 1
+    totals["bytes"] += size
+    totals["tokens"] += tokens
+
+
+def profile_outputs(outputs: Dict[str, List[Tuple[str, Optional[str], str]]],
+                    top: int = 10) -> Dict[str, Any]:
+    """
+    Model the context cost of rendered assistant outputs.
+
+    Args:
+        outputs: Per assistant, (output path, Roo mode or None, content) tuples
+        top: Number of heaviest files and duplicated paragraphs to report
+
+    Returns:
+        Dictionary with 'assistants' (per assistant totals for each loading
+        class, per-mode totals for RooCode, and 'load_tokens', the most tokens
+        sent with every request in any mode), 'heaviest' and 'duplicates'
+    """
+    assistants: Dict[str, Any] = {}
+    files: List[Dict[str, Any]] = []
+    occurrences: Dict[str, Dict[str, Any]] = {}
+
+    for assistant, entries in outputs.items():
+        summary: Dict[str, Any] = {loading: _empty_totals() for loading in LOADING_CLASSES}
+        modes: Dict[str, Dict[str, int]] = {}
+        always_chars = 0
+        for rel_path, mode, text in entries:
+            size = len(text.encode('utf-8'))
+            tokens = approximate_tokens(text)
+            loading = loading_class(assistant, rel_path, text, mode)
+            _add(summary[loading], size, tokens)
+            if loading == ALWAYS:
+                always_chars += len(text)
+            if assistant == 'roo':
+                _add(modes.setdefault(mode or ROO_BASE_MODE, _empty_totals()), size, tokens)
+            files.append({"assistant": assistant, "path": rel_path, "loading": loading,
+                          "bytes": size, "tokens": tokens})
+
+            for paragraph in _paragraphs(text):
+                key = f"{assistant}:{hashlib.sha256(paragraph.encode('utf-8')).hexdigest()}"
+                entry = occurrences.setdefault(key, {
+                    "assistant": assistant, "paragraph": paragraph, "files": [],
+                })
+                entry["files"].append(rel_path)
+
+        if assistant == 'roo':
+            base = modes.get(ROO_BASE_MODE, _empty_totals())
+            summary["modes"] = {
+                mode: totals if mode == ROO_BASE_MODE else {
+                    key: totals[key] + base[key] for key in totals
+                }
+                for mode, totals in sorted(modes.items())
+            }
+            summary["load_tokens"] = max(
+                (totals["tokens"] for totals in summary["modes"].values()), default=0
+            )
+        else:
+            summary["load_tokens"] = summary[ALWAYS]["tokens"]
+        if assistant == 'windsurf':
+            summary["always_chars"] = always_chars
+            summary["char_limit"] = WINDSURF_CHAR_LIMIT
+        assistants[assistant] = summary
+
+    duplicates = []
+    for entry in occurrences.values():
+        count = len(entry["files"])
+        if count < 2:
+            continue
+        tokens = approximate_tokens(entry["paragraph"])
+        duplicates.append({
+            "assistant": entry["assistant"],
+            "count": count,
+            "wasted_tokens": tokens * (count - 1),
+            "files": sorted(set(entry["files"])),
+            "preview": entry["paragraph"][:80],
+        })
+    duplicates.sort(key=lambda d: (-d["wasted_tokens"], d["assistant"], d["preview"]))
+    files.sort(key=lambda f: (-f["tokens"], f["assistant"], f["path"]))
+    return {"assistants": assistants, "heaviest": files[:top], "duplicates": duplicates[:top]}
+
+
+def over_budget(report: Dict[str, Any], budget: int) -> List[str]:
+    """
+    List the assistants whose always-loaded rules exceed a token budget.
+
+    Args:
+        report: Report from profile_outputs()
+        budget: Maximum tokens sent with every request
+
+    Returns:
+        Names of assistants over budget
+    """
+    return [name for name, summary in report["assistants"].items()
+            if summary["load_tokens"] > budget]
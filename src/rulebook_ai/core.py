@@ -5,11 +5,53 @@ This module provides the core functionality for managing AI rulebooks,
 separated from the CLI interface for better modularity and testing.
 """
 
+import collections
+import contextlib
+import hashlib
+import io
+import json
 import os
-import shutil
 import re
+import shutil
+import sys
+import tempfile
+import time
 from pathlib import Path
-from typing import List, Optional, Tuple, Dict, Any
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple, Union
+
+from .fragments import (
+    INCLUDE_MARKER,
+    IncludeError,
+    dependents,
+    direct_includes,
+    expand_includes,
+    is_fragment,
+)
+from .frontmatter import parse_globs, split_frontmatter
+from .layers import (
+    RULE_SET_MEMORY_STARTERS_DIR,
+    RULE_SET_STARTER_DIRS,
+    RULE_SET_TOOL_STARTERS_DIR,
+    index_tree,
+    merge_layers,
+)
+from .locking import SyncCoalescer
+from .manifest import (
+    TARGET_STATE_DIR,
+    SourceChanges,
+    diff_sources,
+    file_changed,
+    file_fingerprint,
+    fingerprint_sources,
+    load_manifest,
+    manifest_path,
+    save_manifest,
+    scan_tree,
+    tree_digest,
+)
+
+if TYPE_CHECKING:
+    from .templates import RuleTemplate
 
 # --- Constants ---
 SOURCE_RULE_SETS_DIR = "rule_sets"
@@ -23,12 +65,41 @@ TARGET_TOOLS_DIR = "tools"
 DEFAULT_RULE_SET = "light-spec"
 TARGET_GITHUB_COPILOT_DIR = ".github"
 TARGET_COPILOT_INSTRUCTIONS_FILE = "copilot-instructions.md"
+TARGET_COPILOT_SCOPED_DIR = "instructions"
+COPILOT_SCOPED_SUFFIX = ".instructions.md"
 
 # Assistant-specific directories
 TARGET_CURSOR_DIR = ".cursor/rules"
 TARGET_WINDSURF_DIR = ".windsurf/rules"
 TARGET_CLINE_DIR = ".clinerules"
 TARGET_ROO_DIR = ".roo/rules"
+TARGET_ROO_PARENT_DIR = ".roo"
+ROO_MODE_DIR_PREFIX = "rules-"
+# Top-level rule directories such as '02-rules-architect' hold the rules of one Roo mode
+ROO_MODE_DIR_PATTERN = re.compile(r"^\d+-rules-(?P<mode>[A-Za-z0-9][\w-]*)$")
+
+# Optional per-rule-set configuration, kept at the rule set root and copied into project_rules/
+RULE_SET_CONFIG_FILE = ".rulebook.json"
+
+ALL_ASSISTANTS = ['cursor', 'windsurf', 'cline', 'roo']
+ASSISTANT_TARGET_DIRS = {
+    'cursor': TARGET_CURSOR_DIR,
+    'windsurf': TARGET_WINDSURF_DIR,
+    'cline': TARGET_CLINE_DIR,
+    'roo': TARGET_ROO_DIR,
+}
+# File naming mode used by copy_and_number_files; RooCode mirrors the tree instead
+ASSISTANT_EXTENSION_MODES = {
+    'cursor': 'add_mdc',
+    'windsurf': 'add_md',
+    'cline': 'remove',
+}
+ASSISTANT_LABELS = {
+    'cursor': "Cursor",
+    'windsurf': "Windsurf",
+    'cline': "Cline",
+    'roo': "RooCode",
+}
 
 SOURCE_ENV_EXAMPLE_FILE = ".env.example"
 SOURCE_REQUIREMENTS_TXT_FILE = "requirements.txt"
@@ -72,6 +143,10 @@ class RuleManager:
         self.target_memory_dir = self.project_root / TARGET_MEMORY_BANK_DIR
         self.target_tools_dir = self.project_root / TARGET_TOOLS_DIR
         self.target_github_dir = self.project_root / TARGET_GITHUB_COPILOT_DIR
+        
+        # Compiled rule templates with the file stamps they were compiled from
+        self._template_cache: Dict[
+            Path, Tuple[List[Tuple[str, int, int]], Optional[RuleTemplate]]] = {}
 
     def copy_file(self, source: Path, destination: Path) -> bool:
         """
@@ -155,8 +230,222 @@ class RuleManager:
                         
         return new_items_copied_count
 
+    def copy_index_non_destructive(self, files: Dict[str, Path], dest_dir: Path) -> int:
+        """
+        Copy indexed files into a directory without overwriting existing files.
+        
+        Args:
+            files: Files to copy, keyed by POSIX path relative to dest_dir
+            dest_dir: Destination directory
+            
+        Returns:
+            int: Number of new files copied
+        """
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        new_items_copied_count = 0
+        for rel_path, source_path in files.items():
+            dest_path = dest_dir / rel_path
+            if not dest_path.exists() and self.copy_file(source_path, dest_path):
+                new_items_copied_count += 1
+        return new_items_copied_count
+
+    def numbered_filename(self, source_path: Path, number: int,
+                          extension_mode: str = 'keep') -> str:
+        """
+        Build the numbered output filename for a source rule file.
+        
+        Args:
+            source_path: Source rule file
+            number: Sequence number to prefix
+            extension_mode: How to handle file extensions ('keep', 'add_mdc', 'add_md', 'remove')
+            
+        Returns:
+            The new filename, e.g. '03-plan_v1.mdc'
+        """
+        if extension_mode == 'keep':
+            filename_no_prefix = re.sub(r"^\d+-", "", source_path.name)
+            return f"{number:02d}-{filename_no_prefix}"
+            
+        filename_stem = re.sub(r"^\d+-", "", source_path.stem)
+        if extension_mode == 'add_mdc':
+            return f"{number:02d}-{filename_stem}.mdc"
+        elif extension_mode == 'remove':
+            return f"{number:02d}-{filename_stem}"
+        # 'add_md' and default: add .md extension
+        return f"{number:02d}-{filename_stem}.md"
+
+    def rule_file_index(self, source_dir: Path) -> Dict[str, Path]:
+        """
+        Index the source files of a directory by POSIX relative path, in render order.
+        
+        The index includes shared fragments (see renderable_rules()).
+        
+        Args:
+            source_dir: Rule set or project_rules directory
+            
+        Returns:
+            Mapping of relative path to source file
+        """
+        return {
+            path.relative_to(source_dir).as_posix(): path
+            for path in self.get_ordered_source_files(source_dir)
+        }
+
+    def renderable_rules(self, files: Dict[str, Path]) -> Dict[str, Path]:
+        """
+        Drop shared fragments from a source index, leaving the rules that produce outputs.
+        
+        Args:
+            files: Source index from rule_file_index()
+            
+        Returns:
+            The index without files under shared/
+        """
+        return {rel_path: path for rel_path, path in files.items() if not is_fragment(rel_path)}
+
+    def _file_stamp(self, path: Path) -> Tuple[str, int, int]:
+        """Return (path, size, mtime_ns) for cache validation."""
+        st = path.stat()
+        return str(path), st.st_size, st.st_mtime_ns
+
+    def compile_rule_file(self, source_path: Path,
+                          files: Dict[str, Path]) -> Optional['RuleTemplate']:
+        """
+        Compile a rule file's includes and conditional sections into a template.
+        
+        Each source is compiled once and cached until it, or a fragment it
+        includes, changes on disk; renderers then evaluate the cached template
+        for their assistant.
+        
+        Args:
+            source_path: Rule file to compile
+            files: Source index used to look up fragments
+            
+        Returns:
+            The compiled template, or None if the file has neither includes nor
+            conditional sections and can be copied verbatim
+            
+        Raises:
+            IncludeError: If a fragment is missing or includes itself
+            TemplateError: If conditional directives are malformed
+        """
+        from .templates import DIRECTIVE_MARKER, compile_template
+
+        cached = self._template_cache.get(source_path)
+        if cached is not None:
+            cached_stamps, cached_template = cached
+            try:
+                if all(self._file_stamp(Path(stamp[0])) == stamp for stamp in cached_stamps):
+                    return cached_template
+            except OSError:
+                pass
+                
+        stamp = self._file_stamp(source_path)
+        data = source_path.read_bytes()
+        stamps = [stamp]
+        template: Optional[RuleTemplate] = None
+        if INCLUDE_MARKER in data or DIRECTIVE_MARKER in data:
+            text, used = expand_includes(data.decode('utf-8'), files)
+            stamps += [self._file_stamp(files[rel_path]) for rel_path in used]
+            template = compile_template(text)
+            if not used and not template.conditional:
+                template = None
+        self._template_cache[source_path] = (stamps, template)
+        return template
+
+    def read_rule_text(self, source_path: Path, files: Dict[str, Path],
+                       assistant: Optional[str] = None) -> str:
+        """
+        Read a rule file's content as rendered for an assistant.
+        
+        Args:
+            source_path: Rule file to read
+            files: Source index used to look up fragments
+            assistant: Assistant the text is rendered for
+            
+        Returns:
+            The rendered text
+        """
+        template = self.compile_rule_file(source_path, files)
+        if template is None:
+            return source_path.read_text(encoding='utf-8')
+        return template.render(assistant)
+
+    def write_rule_output(self, source_path: Path, destination: Path,
+                          files: Dict[str, Path], assistant: Optional[str] = None) -> bool:
+        """
+        Write one rendered rule output, copying the file verbatim when it has no directives.
+        
+        Args:
+            source_path: Rule file to render
+            destination: Output file path
+            files: Source index used to look up fragments
+            assistant: Assistant the output is rendered for
+            
+        Returns:
+            bool: True if the output was written, False otherwise
+        """
+        from .templates import TemplateError
+
+        try:
+            template = self.compile_rule_file(source_path, files)
+        except (IncludeError, TemplateError, OSError, UnicodeDecodeError) as e:
+            print(f"Error rendering {source_path}: {e}")
+            return False
+        if template is None:
+            return self.copy_file(source_path, destination)
+        try:
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            destination.write_text(template.render(assistant), encoding='utf-8')
+            return True
+        except Exception as e:
+            print(f"Error writing {destination}: {e}")
+            return False
+
+    def plan_assistant_outputs(self, source_dir: Path, assistant: str,
+                               files: Optional[Dict[str, Path]] = None,
+                               config: Optional[Dict[str, Any]] = None) -> List[Tuple[Path, str]]:
+        """
+        Map every source rule file to the output it produces for an assistant.
+        
+        The plan matches what a fresh sync writes: numbered files for Cursor,
+        Windsurf and Cline, and shared plus per-mode directories for RooCode.
+        
+        Args:
+            source_dir: Source rules directory (normally project_rules/)
+            assistant: Assistant name
+            files: Source files, keyed by relative path, instead of scanning
+                source_dir (used for merged rule set layers)
+            config: Rule set config to use instead of source_dir's
+            
+        Returns:
+            List of (source file, output path relative to the project root) pairs
+        """
+        target_dir = ASSISTANT_TARGET_DIRS[assistant]
+        if files is None:
+            files = self.rule_file_index(source_dir)
+        files = self.renderable_rules(files)
+        
+        if assistant == 'roo':
+            if config is None:
+                config = self.load_rule_set_config(source_dir)
+            modes = self.config_section(config, "roo_modes")
+            return [
+                (source_path, f"{TARGET_ROO_PARENT_DIR}/{self.roo_output_path(rel_path, modes)}")
+                for rel_path, source_path in files.items()
+            ]
+            
+        extension_mode = ASSISTANT_EXTENSION_MODES[assistant]
+        return [
+            (source_path,
+             f"{target_dir}/{self.numbered_filename(source_path, num, extension_mode)}")
+            for num, source_path in enumerate(files.values(), start=1)
+        ]
+
     def copy_and_number_files(self, source_dir: Path, dest_dir: Path, 
-                             extension_mode: str = 'keep') -> int:
+                             extension_mode: str = 'keep',
+                             files: Optional[Dict[str, Path]] = None,
+                             assistant: Optional[str] = None) -> int:
         """
         Copy files from source to destination with numeric prefixes.
         
@@ -164,12 +453,16 @@ class RuleManager:
             source_dir: Source directory
             dest_dir: Destination directory
             extension_mode: How to handle file extensions ('keep', 'add_mdc', 'add_md', 'remove')
+            files: Files to copy, keyed by relative path, instead of scanning source_dir
+            assistant: Assistant the files are rendered for (selects conditional sections)
             
         Returns:
             int: Number of files copied
         """
         dest_dir.mkdir(parents=True, exist_ok=True)
-        all_source_files = self.get_ordered_source_files(source_dir)
+        if files is None:
+            files = self.rule_file_index(source_dir)
+        all_source_files = list(self.renderable_rules(files).values())
         
         if not all_source_files:
             print(f"Info: No source files found in '{source_dir}' to process for numbering.")
@@ -187,65 +480,157 @@ class RuleManager:
         files_copied = 0
         
         for source_path in all_source_files:
-            base_filename = source_path.name
-            filename_no_prefix = re.sub(r"^\d+-", "", base_filename)
-            
-            if extension_mode == 'keep':
-                new_filename = f"{next_num:02d}-{filename_no_prefix}"
-            elif extension_mode == 'add_mdc':
-                filename_stem = source_path.stem
-                filename_stem = re.sub(r"^\d+-", "", filename_stem)
-                new_filename = f"{next_num:02d}-{filename_stem}.mdc"
-            elif extension_mode == 'add_md':
-                filename_stem = source_path.stem
-                filename_stem = re.sub(r"^\d+-", "", filename_stem)
-                new_filename = f"{next_num:02d}-{filename_stem}.md"
-            elif extension_mode == 'remove':
-                filename_stem = source_path.stem
-                filename_stem = re.sub(r"^\d+-", "", filename_stem)
-                new_filename = f"{next_num:02d}-{filename_stem}"
-            else:
-                # Default: add .md extension
-                filename_stem = source_path.stem
-                filename_stem = re.sub(r"^\d+-", "", filename_stem)
-                new_filename = f"{next_num:02d}-{filename_stem}.md"
-                
+            new_filename = self.numbered_filename(source_path, next_num, extension_mode)
             dest_file_path = dest_dir / new_filename
-            if self.copy_file(source_path, dest_file_path):
+            if self.write_rule_output(source_path, dest_file_path, files, assistant):
                 next_num += 1
                 files_copied += 1
                 
         return files_copied
                 
-    def copy_and_restructure_roocode(self, source_dir: Path, dest_dir: Path) -> int:
+    def load_rule_set_config(self, source_dir: Path) -> Dict[str, Any]:
+        """
+        Load the optional rule set configuration file (.rulebook.json).
+        
+        Args:
+            source_dir: Rule set or project_rules directory
+            
+        Returns:
+            The configuration dictionary, empty if the file is missing or invalid
+        """
+        config_path = source_dir / RULE_SET_CONFIG_FILE
+        if not config_path.is_file():
+            return {}
+        try:
+            with open(config_path, encoding='utf-8') as f:
+                config = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Ignoring invalid rule set config {config_path}: {e}")
+            return {}
+        if not isinstance(config, dict):
+            print(f"Warning: Ignoring rule set config {config_path}: expected a JSON object")
+            return {}
+        return config
+
+    def config_section(self, config: Dict[str, Any], *keys: str) -> Dict[str, Any]:
+        """
+        Look up a nested object in a rule set config.
+        
+        Args:
+            config: Rule set config (see load_rule_set_config)
+            keys: Path to the section, e.g. ("copilot", "apply_to")
+            
+        Returns:
+            The section, empty if it is missing or is not a JSON object
+        """
+        section: Any = config
+        for depth, key in enumerate(keys):
+            section = section.get(key, {})
+            if not isinstance(section, dict):
+                name = ".".join(keys[:depth + 1])
+                print(f"Warning: Ignoring rule set config \"{name}\": expected a JSON object")
+                return {}
+        result: Dict[str, Any] = section
+        return result
+
+    def roo_output_path(self, rel_path: str, modes: Dict[str, Optional[str]]) -> str:
+        """
+        Decide where a rule file goes in RooCode's layout.
+        
+        Files under a mode directory go to .roo/rules-{mode}/ so that only that
+        mode loads them; everything else is shared and mirrored under .roo/rules/.
+        A top-level directory is a mode directory if the rule set config maps it
+        ("roo_modes": {"02-rules-architect": "architect"}) or if it is named
+        like 'NN-rules-{mode}'. Mapping a directory to null keeps it shared.
+        
+        Args:
+            rel_path: POSIX path of the rule file relative to the rules directory
+            modes: Explicit directory-to-mode mapping from the rule set config
+            
+        Returns:
+            Output path relative to the .roo/ directory
+        """
+        parts = rel_path.split('/', 1)
+        if len(parts) == 2:
+            top_dir, rest = parts
+            if top_dir in modes:
+                mode = modes[top_dir]
+            else:
+                match = ROO_MODE_DIR_PATTERN.match(top_dir)
+                mode = match.group('mode') if match else None
+            if mode:
+                return f"{ROO_MODE_DIR_PREFIX}{mode}/{rest}"
+        return f"{Path(TARGET_ROO_DIR).name}/{rel_path}"
+
+    def assistant_output_dirs(self, target_root: Path, assistant: str,
+                              outputs: Optional[List[str]] = None) -> List[Path]:
+        """
+        List the existing directories an assistant's rules are rendered into.
+        
+        RooCode mode directories count only if this tool wrote them: they are
+        taken from the manifest's roo output record and the current plan for
+        project_rules/, so hand-written .roo/rules-*/ directories are left alone.
+        
+        Args:
+            target_root: Target project root directory
+            assistant: Assistant name
+            outputs: Additional output paths (relative to target_root) about to be written
+            
+        Returns:
+            Existing output directories (for RooCode, .roo/rules/ and the written .roo/rules-*/)
+        """
+        dirs = [target_root / ASSISTANT_TARGET_DIRS[assistant]]
+        if assistant == 'roo':
+            written = list(outputs or [])
+            manifest = load_manifest(target_root) or {}
+            written += (manifest.get("outputs", {}).get("roo") or {}).get("files", [])
+            source_rules_dir = target_root / TARGET_PROJECT_RULES_DIR
+            if source_rules_dir.is_dir():
+                plan = self.plan_assistant_outputs(source_rules_dir, 'roo')
+                written += [output for _, output in plan]
+            mode_prefix = f"{TARGET_ROO_PARENT_DIR}/{ROO_MODE_DIR_PREFIX}"
+            dirs += [target_root / TARGET_ROO_PARENT_DIR / name for name in sorted({
+                output[len(TARGET_ROO_PARENT_DIR) + 1:].split('/', 1)[0]
+                for output in written if output.startswith(mode_prefix)
+            })]
+        return [d for d in dirs if d.is_dir()]
+
+    def copy_and_restructure_roocode(self, source_dir: Path, dest_dir: Path,
+                                     files: Optional[Dict[str, Path]] = None,
+                                     config: Optional[Dict[str, Any]] = None) -> int:
         """
         Copy and restructure files for roocode format.
         
+        Shared rules are mirrored under dest_dir (.roo/rules/); rules in mode
+        directories go to sibling .roo/rules-{mode}/ directories (see roo_output_path).
+        
         Args:
             source_dir: Source directory 
             dest_dir: Destination directory
+            files: Files to copy, keyed by relative path, instead of scanning source_dir
+            config: Rule set config to use instead of source_dir's
             
         Returns:
             int: Number of files copied
         """
         dest_dir.mkdir(parents=True, exist_ok=True)
-        all_source_files = self.get_ordered_source_files(source_dir)
+        if files is None:
+            files = self.rule_file_index(source_dir)
         
-        if not all_source_files:
+        if not files:
             print(f"Info: No source files found in '{source_dir}' for restructuring.")
             return 0
             
+        if config is None:
+            config = self.load_rule_set_config(source_dir)
+        modes = self.config_section(config, "roo_modes")
         files_copied = 0
         # Process each file
-        for source_path in all_source_files:
-            rel_path = source_path.relative_to(source_dir)
-            dest_path = dest_dir / rel_path
-            
-            # Create intermediate directories
-            dest_path.parent.mkdir(parents=True, exist_ok=True)
+        for rel_path, source_path in self.renderable_rules(files).items():
+            dest_path = dest_dir.parent / self.roo_output_path(rel_path, modes)
             
-            # Copy the file
-            if self.copy_file(source_path, dest_path):
+            # Copy the file (intermediate directories are created as needed)
+            if self.write_rule_output(source_path, dest_path, files, 'roo'):
                 files_copied += 1
                 
         return files_copied
@@ -270,7 +655,7 @@ class RuleManager:
         with open(dest_file_path, 'w', encoding='utf-8') as output_file:
             for source_path in all_source_files:
                 try:
-                    with open(source_path, 'r', encoding='utf-8') as input_file:
+                    with open(source_path, encoding='utf-8') as input_file:
                         file_content = input_file.read()
                     
                     output_file.write(f"# {source_path.name}\n\n")
@@ -279,20 +664,196 @@ class RuleManager:
                 except Exception as e:
                     print(f"Error processing {source_path}: {e}")
 
-    def install(self, rule_set: str = DEFAULT_RULE_SET, 
+    def _copilot_apply_to(self, rel_path: str, fields: Dict[str, str],
+                          apply_to: Dict[str, Any]) -> List[str]:
+        """
+        Work out the applyTo globs for a rule file, if it is path-scoped.
+        
+        The rule set config ("copilot": {"apply_to": {...}}) wins, matched on the
+        exact relative path first and then on its top-level directory; otherwise
+        the file's own applyTo/globs frontmatter is used.
+        
+        Args:
+            rel_path: POSIX path of the rule file relative to the rules directory
+            fields: Parsed frontmatter of the rule file
+            apply_to: Path-to-glob mapping from the rule set config
+            
+        Returns:
+            Glob patterns, empty for always-on rules
+        """
+        for key in (rel_path, rel_path.split('/', 1)[0]):
+            if key in apply_to:
+                value = apply_to[key]
+                if isinstance(value, str):
+                    return parse_globs(value)
+                if value is None or isinstance(value, list):
+                    return [str(item) for item in value or []]
+                print(f"Warning: Ignoring rule set config \"copilot.apply_to.{key}\": "
+                      "expected a glob string or a list of globs")
+        return parse_globs(fields.get('applyTo') or fields.get('globs') or "")
+
+    def _copilot_scoped_names(self, rel_paths: List[str]) -> Dict[str, str]:
+        """
+        Name the scoped Copilot instruction files of path-scoped rules.
+        
+        Names join the path parts without their numeric prefixes
+        ('02-rules-code/01-python.md' becomes 'rules-code-python'). Rules whose
+        short names would collide keep their full paths instead, so no
+        instruction file overwrites another.
+        
+        Args:
+            rel_paths: POSIX paths of the rule files relative to the rules directory
+            
+        Returns:
+            Output name (without suffix) keyed by relative path
+        """
+        def join(rel_path: str, strip: bool) -> str:
+            parts = Path(rel_path).with_suffix('').parts
+            return "-".join(re.sub(r"^\d+-", "", part) if strip else part for part in parts)
+            
+        short = {rel_path: join(rel_path, True) for rel_path in rel_paths}
+        counts = collections.Counter(short.values())
+        names = {rel_path: name if counts[name] == 1 else join(rel_path, False)
+                 for rel_path, name in short.items()}
+        # Full paths can still meet a short name or each other ('a-b/c' and 'a/b-c')
+        counts = collections.Counter(names.values())
+        for rel_path, name in names.items():
+            if counts[name] > 1:
+                digest = hashlib.sha256(rel_path.encode('utf-8')).hexdigest()[:8]
+                names[rel_path] = f"{join(rel_path, False)}-{digest}"
+        return names
+
+    def plan_copilot_outputs(self, source_dir: Path) -> Dict[str, str]:
+        """
+        Render GitHub Copilot instructions for a rules directory.
+        
+        Always-on rules are joined into a compact copilot-instructions.md, with
+        frontmatter and per-file headers stripped. Path-scoped rules become
+        .github/instructions/*.instructions.md files with an applyTo header, so
+        Copilot only sends them for matching files.
+        
+        Args:
+            source_dir: Source rules directory (normally project_rules/)
+            
+        Returns:
+            Mapping of output path (relative to the project root) to content,
+            starting with copilot-instructions.md
+        """
+        from .templates import TemplateError
+
+        apply_to = self.config_section(self.load_rule_set_config(source_dir), "copilot", "apply_to")
+        core_sections = []
+        scoped: Dict[str, Tuple[List[str], str]] = {}
+        
+        files = self.rule_file_index(source_dir)
+        for rel_path, source_path in self.renderable_rules(files).items():
+            try:
+                fields, body = split_frontmatter(self.read_rule_text(source_path, files, 'copilot'))
+            except (IncludeError, TemplateError, OSError, UnicodeDecodeError) as e:
+                print(f"Error processing {source_path}: {e}")
+                continue
+            body = body.strip()
+            if not body:
+                continue
+                
+            globs = self._copilot_apply_to(rel_path, fields, apply_to)
+            if globs:
+                scoped[rel_path] = (globs, body)
+            else:
+                core_sections.append(body)
+                
+        outputs = {
+            f"{TARGET_GITHUB_COPILOT_DIR}/{TARGET_COPILOT_INSTRUCTIONS_FILE}":
+                "\n\n".join(core_sections) + "\n"
+        }
+        names = self._copilot_scoped_names(list(scoped))
+        outputs.update(sorted(
+            (f"{TARGET_GITHUB_COPILOT_DIR}/{TARGET_COPILOT_SCOPED_DIR}/{names[rel_path]}{COPILOT_SCOPED_SUFFIX}",
+             f'---\napplyTo: "{",".join(globs)}"\n---\n\n{body}\n')
+            for rel_path, (globs, body) in scoped.items()
+        ))
+        return outputs
+
+    def _write_copilot_instructions(self, source_dir: Path, target_root: Path,
+                                    budget: Optional[int] = None,
+                                    budget_action: Optional[str] = None,
+                                    previous_files: Optional[List[str]] = None
+                                    ) -> Optional[List[str]]:
+        """
+        Write GitHub Copilot instructions, enforcing the size budget of the always-on file.
+        
+        The budget and the action taken when it is exceeded ('warn' or 'fail')
+        default to "budget_bytes" and "on_budget_exceeded" in the rule set
+        config's "copilot" section.
+        
+        Args:
+            source_dir: Source rules directory (normally project_rules/)
+            target_root: Target project root directory
+            budget: Maximum size in bytes of copilot-instructions.md
+            budget_action: 'warn' to write anyway, 'fail' to write nothing
+            previous_files: Copilot outputs recorded by the last sync; scoped files
+                no longer produced are removed
+            
+        Returns:
+            Output paths written (relative to target_root), or None if the budget
+            check failed and nothing was written
+        """
+        config = self.config_section(self.load_rule_set_config(source_dir), "copilot")
+        if budget is None:
+            budget = config.get("budget_bytes")
+        budget_action = budget_action or config.get("on_budget_exceeded", "warn")
+        
+        outputs = self.plan_copilot_outputs(source_dir)
+        core_output = f"{TARGET_GITHUB_COPILOT_DIR}/{TARGET_COPILOT_INSTRUCTIONS_FILE}"
+        core_size = len(outputs[core_output].encode('utf-8'))
+        if budget is not None and core_size > budget:
+            message = (f"GitHub Copilot instructions are {core_size} bytes, over the "
+                       f"{budget}-byte budget. Scope rules with applyTo globs to shrink them.")
+            if budget_action == 'fail':
+                print(f"Error: {message}")
+                return None
+            print(f"Warning: {message}")
+            
+        for stale in set(previous_files or []) - set(outputs):
+            stale_path = target_root / stale
+            if stale.endswith(COPILOT_SCOPED_SUFFIX) and stale_path.is_file():
+                stale_path.unlink()
+                
+        for output, content in outputs.items():
+            output_path = target_root / output
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            output_path.write_text(content, encoding='utf-8')
+            
+        print(f"Updated GitHub Copilot instructions at {target_root / core_output} "
+              f"({core_size} bytes, {len(outputs) - 1} scoped instruction files)")
+        return list(outputs)
+
+    def install(self, rule_set: Union[str, List[str]] = DEFAULT_RULE_SET, 
                project_dir: Optional[str] = None,
                clean_first: bool = False,
                include_copilot: bool = True,
-               assistants: Optional[List[str]] = None) -> int:
+               assistants: Optional[List[str]] = None,
+               copilot_budget: Optional[int] = None,
+               copilot_budget_action: Optional[str] = None,
+               rule_set_source: Optional[str] = None) -> int:
         """
         Install a ruleset into a target project directory.
         
+        Several rule sets can be layered (e.g. an organisation base set plus team
+        overlays). They are merged into one index by relative path, later sets
+        taking precedence, and each file is then written once.
+        
         Args:
-            rule_set: Name of the rule set to install
+            rule_set: Name of the rule set to install, or a list of rule sets, base first
             project_dir: Target project directory. If None, uses current project root.
             clean_first: Whether to clean existing rules before installation
             include_copilot: Whether to include GitHub Copilot instructions
-            assistants: List of AI assistants to install for. If None/empty, installs generic rules only.
+            assistants: List of AI assistants to install for. If None/empty, installs generic
+                rules only.
+            copilot_budget: Maximum size in bytes of copilot-instructions.md
+            copilot_budget_action: 'warn' or 'fail' when the Copilot budget is exceeded
+            rule_set_source: Directory, archive, file:// or git+file:// URL providing
+                rule sets; names not found there fall back to the bundled rule sets
             
         Returns:
             int: Return code (0 for success, non-zero for error)
@@ -306,25 +867,26 @@ class RuleManager:
         target_rules_dir = target_root / TARGET_PROJECT_RULES_DIR
         target_memory_dir = target_root / TARGET_MEMORY_BANK_DIR
         target_tools_dir = target_root / TARGET_TOOLS_DIR
-        target_github_dir = target_root / TARGET_GITHUB_COPILOT_DIR
         
-        # Source directory for the specific rule set
-        rule_set_source_dir = self.source_rules_dir / rule_set
+        # Source directories for the rule set layers, base first
+        rule_sets = [rule_set] if isinstance(rule_set, str) else list(rule_set)
+        rule_set_label = " + ".join(f"'{name}'" for name in rule_sets)
+        layer_dirs = self._locate_layers(rule_sets, rule_set_source)
+        if layer_dirs is None:
+            return 1
         
         # Clean first if requested
         if clean_first:
-            if target_rules_dir.exists():
-                shutil.rmtree(target_rules_dir)
-            if include_copilot and (target_github_dir / TARGET_COPILOT_INSTRUCTIONS_FILE).exists():
-                (target_github_dir / TARGET_COPILOT_INSTRUCTIONS_FILE).unlink()
-                
-        # Verify the rule set exists
-        if not rule_set_source_dir.is_dir():
-            print(f"Error: Rule set '{rule_set}' not found in {self.source_rules_dir}")
-            print("Available rule sets:")
-            for rule_dir in sorted(p.name for p in self.source_rules_dir.iterdir() if p.is_dir()):
-                print(f"  - {rule_dir}")
-            return 1
+            self._clean_before_install(target_root, include_copilot)
+            
+        # Merge the layers into one index before touching the target
+        merged = merge_layers(layer_dirs, RULE_SET_CONFIG_FILE,
+                              self.source_memory_dir, self.source_tools_dir)
+        rule_files = dict(merged.rules)
+        config: Dict[str, Any] = {}
+        if merged.config_file:
+            rule_files[RULE_SET_CONFIG_FILE] = merged.config_file
+            config = self.load_rule_set_config(merged.config_file.parent)
             
         # Create target directories
         target_rules_dir.mkdir(parents=True, exist_ok=True)
@@ -332,39 +894,18 @@ class RuleManager:
         target_tools_dir.mkdir(parents=True, exist_ok=True)
         
         # Copy rule files preserving directory structure
-        print(f"Installing rule set '{rule_set}'...")
-        rules_count = self.copy_tree_non_destructive(rule_set_source_dir, target_rules_dir)
+        print(f"Installing rule set{'s' if len(rule_sets) > 1 else ''} {rule_set_label}...")
+        rules_count = self.copy_index_non_destructive(rule_files, target_rules_dir)
         print(f"Copied {rules_count} new rule files.")
+        if merged.overridden:
+            print(f"{len(merged.overridden)} rule files taken from overlay rule sets.")
         
-        # Copy memory starters non-destructively (ruleset-specific first, then global fallback)
-        ruleset_memory_dir = rule_set_source_dir / "memory_starters"
-        if ruleset_memory_dir.exists():
-            memory_count = self.copy_tree_non_destructive(
-                ruleset_memory_dir, 
-                target_memory_dir
-            )
-            print(f"Copied {memory_count} new ruleset-specific memory starter files.")
-        else:
-            memory_count = self.copy_tree_non_destructive(
-                self.source_memory_dir, 
-                target_memory_dir
-            )
-            print(f"Copied {memory_count} new global memory starter files.")
-        
-        # Copy tool starters non-destructively (ruleset-specific first, then global fallback)
-        ruleset_tools_dir = rule_set_source_dir / "tool_starters"
-        if ruleset_tools_dir.exists():
-            tools_count = self.copy_tree_non_destructive(
-                ruleset_tools_dir, 
-                target_tools_dir
-            )
-            print(f"Copied {tools_count} new ruleset-specific tool starter files.")
-        else:
-            tools_count = self.copy_tree_non_destructive(
-                self.source_tools_dir, 
-                target_tools_dir
-            )
-            print(f"Copied {tools_count} new global tool starter files.")
+        # Copy memory and tool starters non-destructively (merged from the rule sets,
+        # or the global starters when none of them ship their own)
+        memory_count = self.copy_index_non_destructive(merged.memory, target_memory_dir)
+        print(f"Copied {memory_count} new memory starter files.")
+        tools_count = self.copy_index_non_destructive(merged.tools, target_tools_dir)
+        print(f"Copied {tools_count} new tool starter files.")
         
         # Copy .env.example if it exists
         env_example_path = self.project_root / SOURCE_ENV_EXAMPLE_FILE
@@ -374,29 +915,130 @@ class RuleManager:
             print(f"Copied .env.example to {target_env_example}")
             
         # Copy GitHub Copilot instructions if requested
+        rendered: Dict[str, List[str]] = {}
+        copilot_failed = False
         if include_copilot:
-            github_dir_path = target_github_dir
-            github_dir_path.mkdir(parents=True, exist_ok=True)
-            
-            copilot_dest_path = github_dir_path / TARGET_COPILOT_INSTRUCTIONS_FILE
-            if not copilot_dest_path.exists():
-                # Create instructions by concatenating all rules
-                self.concatenate_ordered_files(
-                    target_rules_dir, 
-                    copilot_dest_path
-                )
-                print(f"Created GitHub Copilot instructions at {copilot_dest_path}")
-            else:
-                print(f"GitHub Copilot instructions already exist at {copilot_dest_path}")
+            copilot_failed = not self._install_copilot_instructions(
+                target_rules_dir, target_root, copilot_budget, copilot_budget_action, rendered
+            )
         
         # Install assistant-specific rules if requested
         if assistants:
-            self._install_assistant_rules(rule_set_source_dir, target_root, assistants)
+            rendered.update(self._install_assistants(layer_dirs[-1], target_root, assistants,
+                                                     merged.rules, config))
                 
-        print(f"Rule set '{rule_set}' installed successfully in {target_root}")
+        self._record_manifest(target_root, layer_dirs[-1], rendered,
+                              files=merged.rules, config_file=merged.config_file)
+        if copilot_failed:
+            print(f"Rule set {rule_set_label} installed in {target_root}, but GitHub Copilot "
+                  "instructions exceed their budget and were not written.")
+            return 1
+        print(f"Rule set {rule_set_label} installed successfully in {target_root}")
         return 0
 
-    def _install_assistant_rules(self, source_dir: Path, target_root: Path, assistants: List[str]) -> None:
+    def _clean_before_install(self, target_root: Path, include_copilot: bool) -> None:
+        """Remove project_rules/ and, if Copilot is included, its instructions file."""
+        target_rules_dir = target_root / TARGET_PROJECT_RULES_DIR
+        if target_rules_dir.exists():
+            shutil.rmtree(target_rules_dir)
+        copilot_file = target_root / TARGET_GITHUB_COPILOT_DIR / TARGET_COPILOT_INSTRUCTIONS_FILE
+        if include_copilot and copilot_file.exists():
+            copilot_file.unlink()
+
+    def _install_copilot_instructions(self, target_rules_dir: Path, target_root: Path,
+                                      copilot_budget: Optional[int],
+                                      copilot_budget_action: Optional[str],
+                                      rendered: Dict[str, List[str]]) -> bool:
+        """
+        Create Copilot instructions for a fresh install, unless they already exist.
+        
+        The written outputs are recorded in rendered under 'copilot'.
+        
+        Returns:
+            False if the instructions exceed their budget and were not written
+        """
+        github_dir_path = target_root / TARGET_GITHUB_COPILOT_DIR
+        github_dir_path.mkdir(parents=True, exist_ok=True)
+        
+        copilot_dest_path = github_dir_path / TARGET_COPILOT_INSTRUCTIONS_FILE
+        if copilot_dest_path.exists():
+            print(f"GitHub Copilot instructions already exist at {copilot_dest_path}")
+            return True
+        # Create the always-on instructions plus path-scoped instruction files
+        copilot_outputs = self._write_copilot_instructions(
+            target_rules_dir, target_root, copilot_budget, copilot_budget_action
+        )
+        if copilot_outputs is None:
+            return False
+        rendered["copilot"] = copilot_outputs
+        return True
+
+    def _install_assistants(self, source_dir: Path, target_root: Path, assistants: List[str],
+                            files: Dict[str, Path],
+                            config: Dict[str, Any]) -> Dict[str, List[str]]:
+        """
+        Install assistant-specific rules and return the outputs to record per assistant.
+        
+        Outputs are only predictable (and recorded) for directories that start empty;
+        otherwise numbering continues after the files already present.
+        """
+        fresh = [
+            assistant for assistant in assistants
+            if assistant in ASSISTANT_TARGET_DIRS
+            and not any((target_root / ASSISTANT_TARGET_DIRS[assistant]).glob('*'))
+        ]
+        self._install_assistant_rules(source_dir, target_root, assistants, files, config)
+        return {
+            assistant: [
+                output for _, output in self.plan_assistant_outputs(
+                    source_dir, assistant, files, config
+                )
+            ]
+            for assistant in fresh
+        }
+
+    def _locate_layers(self, rule_sets: List[str],
+                       rule_set_source: Optional[str]) -> Optional[List[Path]]:
+        """
+        Return the source directory of each rule set layer, base first.
+        
+        Names are looked up in rule_set_source first, if given, then among the
+        bundled rule sets. Prints an error and returns None if the source
+        cannot be used or a rule set is not found.
+        """
+        layer_dirs = [self.source_rules_dir / name for name in rule_sets]
+        if rule_set_source:
+            from .sources import SourceError, locate_rule_sets
+            try:
+                layer_dirs = locate_rule_sets(rule_set_source, rule_sets, self.source_rules_dir)
+            except SourceError as e:
+                print(f"Error: Unable to use rule set source '{rule_set_source}': {e}")
+                return None
+        if not self._check_layers(rule_sets, layer_dirs, rule_set_source):
+            return None
+        return layer_dirs
+
+    def _check_layers(self, rule_sets: List[str], layer_dirs: List[Path],
+                      rule_set_source: Optional[str]) -> bool:
+        """Return True if every rule set layer exists, else print what is available."""
+        missing = [name for name, layer_dir in zip(rule_sets, layer_dirs) if not layer_dir.is_dir()]
+        if rule_sets and not missing:
+            return True
+        searched = str(self.source_rules_dir)
+        if rule_set_source:
+            searched = f"{rule_set_source} or {searched}"
+        for name in missing:
+            print(f"Error: Rule set '{name}' not found in {searched}")
+        if not rule_sets:
+            print("Error: No rule set given")
+        print("Available rule sets:")
+        for rule_dir in self.list_rules():
+            print(f"  - {rule_dir}")
+        return False
+
+    def _install_assistant_rules(self, source_dir: Path, target_root: Path, assistants: List[str],
+                                 files: Optional[Dict[str, Path]] = None,
+                                 config: Optional[Dict[str, Any]] = None) -> None:
         """
         Install rules for specific AI assistants.
         
@@ -404,55 +1046,68 @@ class RuleManager:
             source_dir: Source directory containing the rules
             target_root: Target project root directory
             assistants: List of assistant names to install for
+            files: Merged rule files to install instead of scanning source_dir
+            config: Rule set config to use instead of source_dir's
         """
         for assistant in assistants:
             if assistant == 'cursor':
-                self._install_cursor_rules(source_dir, target_root)
+                self._install_cursor_rules(source_dir, target_root, files)
             elif assistant == 'windsurf':
-                self._install_windsurf_rules(source_dir, target_root)
+                self._install_windsurf_rules(source_dir, target_root, files)
             elif assistant == 'cline':
-                self._install_cline_rules(source_dir, target_root)
+                self._install_cline_rules(source_dir, target_root, files)
             elif assistant == 'roo':
-                self._install_roo_rules(source_dir, target_root)
+                self._install_roo_rules(source_dir, target_root, files, config)
             else:
                 print(f"Warning: Unknown assistant '{assistant}' - skipping")
 
-    def _install_cursor_rules(self, source_dir: Path, target_root: Path) -> None:
+    def _install_cursor_rules(self, source_dir: Path, target_root: Path,
+                              files: Optional[Dict[str, Path]] = None) -> None:
         """Install rules for Cursor AI assistant (.cursor/rules/*.mdc)."""
         target_dir = target_root / TARGET_CURSOR_DIR
         target_dir.mkdir(parents=True, exist_ok=True)
         
-        count = self.copy_and_number_files(source_dir, target_dir, extension_mode='add_mdc')
+        count = self.copy_and_number_files(source_dir, target_dir, extension_mode='add_mdc',
+                                           files=files, assistant='cursor')
         print(f"Created {count} Cursor rule files in {target_dir}")
 
-    def _install_windsurf_rules(self, source_dir: Path, target_root: Path) -> None:
+    def _install_windsurf_rules(self, source_dir: Path, target_root: Path,
+                                files: Optional[Dict[str, Path]] = None) -> None:
         """Install rules for Windsurf AI assistant (.windsurf/rules/*.md)."""
         target_dir = target_root / TARGET_WINDSURF_DIR
         target_dir.mkdir(parents=True, exist_ok=True)
         
-        count = self.copy_and_number_files(source_dir, target_dir, extension_mode='add_md')
+        count = self.copy_and_number_files(source_dir, target_dir, extension_mode='add_md',
+                                           files=files, assistant='windsurf')
         print(f"Created {count} Windsurf rule files in {target_dir}")
 
-    def _install_cline_rules(self, source_dir: Path, target_root: Path) -> None:
+    def _install_cline_rules(self, source_dir: Path, target_root: Path,
+                             files: Optional[Dict[str, Path]] = None) -> None:
         """Install rules for Cline AI assistant (.clinerules/)."""
         target_dir = target_root / TARGET_CLINE_DIR
         target_dir.mkdir(parents=True, exist_ok=True)
         
-        count = self.copy_and_number_files(source_dir, target_dir, extension_mode='remove')
+        count = self.copy_and_number_files(source_dir, target_dir, extension_mode='remove',
+                                           files=files, assistant='cline')
         print(f"Created {count} Cline rule files in {target_dir}")
 
-    def _install_roo_rules(self, source_dir: Path, target_root: Path) -> None:
+    def _install_roo_rules(self, source_dir: Path, target_root: Path,
+                           files: Optional[Dict[str, Path]] = None,
+                           config: Optional[Dict[str, Any]] = None) -> None:
         """Install rules for RooCode AI assistant (.roo/rules/)."""
         target_dir = target_root / TARGET_ROO_DIR
         target_dir.mkdir(parents=True, exist_ok=True)
         
-        count = self.copy_and_restructure_roocode(source_dir, target_dir)
+        count = self.copy_and_restructure_roocode(source_dir, target_dir, files, config)
         print(f"Created {count} RooCode rule files in {target_dir}")
 
     def sync(self, rule_set: str = DEFAULT_RULE_SET,
             project_dir: Optional[str] = None,
             include_copilot: bool = True,
-            assistants: Optional[List[str]] = None) -> int:
+            assistants: Optional[List[str]] = None,
+            changed_only: bool = False,
+            copilot_budget: Optional[int] = None,
+            copilot_budget_action: Optional[str] = None) -> int:
         """
         Synchronize assistant-specific rules from existing project_rules directory.
         
@@ -464,6 +1119,11 @@ class RuleManager:
             project_dir: Target project directory. If None, uses current project root.
             include_copilot: Whether to include GitHub Copilot instructions
             assistants: List of assistants to sync. If None, syncs all existing assistants.
+            changed_only: Compare project_rules/ against the manifest recorded by the
+                last sync and only re-render outputs of files that changed. Returns
+                immediately when nothing changed.
+            copilot_budget: Maximum size in bytes of copilot-instructions.md
+            copilot_budget_action: 'warn' or 'fail' when the Copilot budget is exceeded
             
         Returns:
             int: Return code (0 for success, non-zero for error)
@@ -482,104 +1142,936 @@ class RuleManager:
             print("Run 'install' command first to create the initial rule structure.")
             return 1
             
-        print("Syncing assistant-specific rules from project_rules/...")
+        # Concurrent syncs of the same project wait on one lock; requests queued
+        # while a sync runs are served together by a single follow-up sync.
+        request = {
+            "assistants": assistants,
+            "include_copilot": include_copilot,
+            "changed_only": changed_only,
+            "copilot_budget": copilot_budget,
+            "copilot_budget_action": copilot_budget_action,
+        }
+        coalescer = SyncCoalescer(target_root / TARGET_STATE_DIR)
+        return coalescer.run(
+            request,
+            lambda batch: self._sync_now(target_root,
+                                         **self._merge_sync_requests(target_root, batch))
+        )
+
+    def _merge_sync_requests(self, target_root: Path,
+                             requests: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Combine queued sync requests into one that covers all of them.
+        
+        Args:
+            target_root: Target project root directory
+            requests: Queued requests (keyword arguments of sync())
+            
+        Returns:
+            Keyword arguments for _sync_now
+        """
+        explicit: Set[str] = set()
+        detect_existing = False
+        for request in requests:
+            if request["assistants"] is None:
+                detect_existing = True
+            else:
+                explicit.update(request["assistants"])
+                
+        budgets = [r["copilot_budget"] for r in requests if r.get("copilot_budget") is not None]
+        actions = [r["copilot_budget_action"] for r in requests if r.get("copilot_budget_action")]
+        assistants: Optional[List[str]] = None
+        if explicit:
+            if detect_existing:
+                explicit.update(
+                    assistant for assistant in ALL_ASSISTANTS
+                    if (target_root / ASSISTANT_TARGET_DIRS[assistant]).exists()
+                )
+            assistants = [a for a in ALL_ASSISTANTS if a in explicit]
+            assistants += sorted(explicit - set(ALL_ASSISTANTS))
+            
+        return {
+            "assistants": assistants,
+            "include_copilot": any(request["include_copilot"] for request in requests),
+            # A full sync satisfies a changed-only request, not the other way around
+            "changed_only": all(request["changed_only"] for request in requests),
+            # The strictest Copilot budget wins
+            "copilot_budget": min(budgets) if budgets else None,
+            "copilot_budget_action": ("fail" if "fail" in actions
+                                      else (actions[0] if actions else None)),
+        }
+
+    def _sync_now(self, target_root: Path, include_copilot: bool = True,
+                  assistants: Optional[List[str]] = None,
+                  changed_only: bool = False,
+                  copilot_budget: Optional[int] = None,
+                  copilot_budget_action: Optional[str] = None) -> int:
+        """
+        Perform one sync. Callers must hold the project's sync lock (see sync()).
+        
+        Args:
+            target_root: Target project root directory
+            include_copilot: Whether to include GitHub Copilot instructions
+            assistants: List of assistants to sync. If None, syncs all existing assistants.
+            changed_only: Only re-render outputs of files changed since the last sync
+            copilot_budget: Maximum size in bytes of copilot-instructions.md
+            copilot_budget_action: 'warn' or 'fail' when the Copilot budget is exceeded
+            
+        Returns:
+            int: Return code (0 for success, non-zero for error)
+        """
+        source_rules_dir = target_root / TARGET_PROJECT_RULES_DIR
         
         # Determine which assistants to sync
         if assistants is None:
             # Auto-detect existing assistant directories
-            assistants = []
-            if (target_root / TARGET_CURSOR_DIR).exists():
-                assistants.append('cursor')
-            if (target_root / TARGET_WINDSURF_DIR).exists():
-                assistants.append('windsurf') 
-            if (target_root / TARGET_CLINE_DIR).exists():
-                assistants.append('cline')
-            if (target_root / TARGET_ROO_DIR).exists():
-                assistants.append('roo')
+            assistants = [
+                assistant for assistant in ALL_ASSISTANTS
+                if (target_root / ASSISTANT_TARGET_DIRS[assistant]).exists()
+            ]
                 
             if not assistants:
                 print("No existing assistant directories found.")
-                print("Use --cursor, --windsurf, --cline, --roo, or --all-assistants to specify which to sync.")
+                print("Use --cursor, --windsurf, --cline, --roo, or --all-assistants to specify "
+                      "which to sync.")
                 return 2
+        
+        manifest = load_manifest(target_root)
+        previous_copilot = ((manifest or {}).get("outputs", {}).get("copilot") or {}).get("files")
+        if not changed_only:
+            manifest = None
+        only_sources: Dict[str, Set[str]] = {}
+        copilot_fresh = False
+        if manifest is not None:
+            only_sources, copilot_fresh, unchanged = self._incremental_sync_plan(
+                manifest, source_rules_dir, assistants)
+            if (unchanged and len(only_sources) == len(assistants)
+                    and (copilot_fresh or not include_copilot)):
+                print("No rule changes since last sync; outputs are up to date.")
+                return 0
+            
+        print("Syncing assistant-specific rules from project_rules/...")
                 
         # Remove and regenerate assistant-specific directories
+        rendered: Dict[str, List[str]] = {}
         if assistants:
-            self._sync_assistant_rules(source_rules_dir, target_root, assistants)
+            rendered = self._sync_assistant_rules(source_rules_dir, target_root, assistants,
+                                                  only_sources=only_sources)
         
         # Update GitHub Copilot instructions if requested
-        if include_copilot:
-            target_github_dir = target_root / TARGET_GITHUB_COPILOT_DIR
-            copilot_dest_path = target_github_dir / TARGET_COPILOT_INSTRUCTIONS_FILE
-            if copilot_dest_path.exists():
-                copilot_dest_path.unlink()
-                
-            target_github_dir.mkdir(parents=True, exist_ok=True)
-            self.concatenate_ordered_files(source_rules_dir, copilot_dest_path)
-            print(f"Updated GitHub Copilot instructions at {copilot_dest_path}")
+        copilot_failed = False
+        if include_copilot and not copilot_fresh:
+            copilot_outputs = self._write_copilot_instructions(
+                source_rules_dir, target_root, copilot_budget, copilot_budget_action,
+                previous_files=previous_copilot
+            )
+            if copilot_outputs is None:
+                copilot_failed = True
+            else:
+                rendered["copilot"] = copilot_outputs
             
+        self._record_manifest(target_root, source_rules_dir, rendered, manifest)
+        if copilot_failed:
+            print("Sync incomplete: GitHub Copilot instructions exceed their budget and were "
+                  "not updated.")
+            return 1
         print(f"Rules synced successfully from {source_rules_dir}")
         return 0
 
-    def _sync_assistant_rules(self, source_dir: Path, target_root: Path, assistants: List[str]) -> None:
+    def _incremental_sync_plan(self, manifest: Dict[str, Any], source_rules_dir: Path,
+                               assistants: List[str]) -> Tuple[Dict[str, Set[str]], bool, bool]:
         """
-        Sync rules for specific AI assistants by removing and regenerating their directories.
+        Work out what a changed-only sync has to re-render.
         
-        Args:
-            source_dir: Source directory (project_rules/)
-            target_root: Target project root directory
-            assistants: List of assistant names to sync
+        Returns:
+            tuple: (only_sources, copilot_fresh, unchanged) - the source files to
+                re-render per assistant that can be updated in place, whether the
+                Copilot instructions are current, and whether no source changed
         """
+        changes = diff_sources(manifest.get("sources", {}), source_rules_dir)
+        config_changed = file_changed(manifest.get("config"),
+                                      source_rules_dir / RULE_SET_CONFIG_FILE)
+        recorded_outputs = manifest.get("outputs", {})
+        
+        # Fragments produce no outputs of their own. Any changed file, fragment
+        # or ordinary rule, also re-renders the rules that include it.
+        rule_changes = SourceChanges(*(
+            [rel_path for rel_path in paths if not is_fragment(rel_path)] for paths in changes
+        ))
+        affected = set(rule_changes.modified) | dependents(
+            manifest.get("includes", {}), [rel_path for paths in changes for rel_path in paths]
+        )
+        
+        # An output can be updated in place only if it was rendered from the
+        # recorded tree and no rule was added or removed (which renumbers files)
+        # and the rule set config (which can move files, e.g. Roo modes) is unchanged.
+        only_sources: Dict[str, Set[str]] = {}
         for assistant in assistants:
-            if assistant == 'cursor':
-                self._sync_cursor_rules(source_dir, target_root)
-            elif assistant == 'windsurf':
-                self._sync_windsurf_rules(source_dir, target_root)
-            elif assistant == 'cline':
-                self._sync_cline_rules(source_dir, target_root)
-            elif assistant == 'roo':
-                self._sync_roo_rules(source_dir, target_root)
+            record = recorded_outputs.get(assistant)
+            if (record and record.get("tree") == manifest.get("tree")
+                    and not rule_changes.structural and not config_changed):
+                only_sources[assistant] = affected
+        unchanged = not changes and not config_changed
+        copilot_record = recorded_outputs.get("copilot")
+        copilot_fresh = (
+            unchanged
+            and bool(copilot_record)
+            and copilot_record.get("tree") == manifest.get("tree")
+        )
+        return only_sources, copilot_fresh, unchanged
+
+    def _record_manifest(self, target_root: Path, source_dir: Path,
+                         rendered: Dict[str, List[str]],
+                         previous: Optional[Dict[str, Any]] = None,
+                         files: Optional[Dict[str, Path]] = None,
+                         config_file: Optional[Path] = None) -> None:
+        """
+        Record the rendered source tree and outputs in the project manifest.
+        
+        Output records of assistants not rendered this time are carried over
+        unchanged, so they show up as stale once the source tree moves on.
+        
+        Args:
+            target_root: Target project root directory
+            source_dir: Source directory that was rendered (project_rules/ or a rule set)
+            rendered: Output paths written by this run, keyed by assistant
+            previous: Previously loaded manifest, if the caller already has it
+            files: Rendered rule files keyed by relative path (merged rule set layers);
+                defaults to the files under source_dir
+            config_file: Rule set config used with files
+        """
+        if previous is None:
+            previous = load_manifest(target_root) or {}
+        outputs = dict(previous.get("outputs", {}))
+        if files is None:
+            files = self.rule_file_index(source_dir)
+            config_file = source_dir / RULE_SET_CONFIG_FILE
+        sources = fingerprint_sources(files, previous.get("sources"))
+        includes = self._include_graph(files, sources, previous)
+        config = file_fingerprint(config_file) if config_file else None
+        tree = tree_digest(sources)
+        if config is not None:
+            tree = tree_digest(dict(sources, **{RULE_SET_CONFIG_FILE: config}))
+        for name, paths in rendered.items():
+            outputs[name] = {"files": paths, "tree": tree}
+        try:
+            save_manifest(target_root, {
+                "sources": sources, "config": config, "tree": tree, "outputs": outputs,
+                "includes": includes,
+            })
+        except OSError as e:
+            print(f"Warning: Unable to write sync manifest: {e}")
+
+    def _include_graph(self, files: Dict[str, Path], sources: Dict[str, List[Any]],
+                       previous: Dict[str, Any]) -> Dict[str, List[str]]:
+        """
+        Build the include dependency graph of a source tree.
+        
+        Entries of files whose blob id is unchanged since the previous manifest
+        are reused, so only edited files are read.
+        
+        Args:
+            files: Source index keyed by relative path
+            sources: Fingerprints of files, as recorded in the manifest
+            previous: Previous manifest (may be empty)
+            
+        Returns:
+            Direct includes per file, for files that include anything
+        """
+        previous_sources = previous.get("sources", {})
+        previous_graph = previous.get("includes", {})
+        graph: Dict[str, List[str]] = {}
+        for rel_path, path in files.items():
+            old = previous_sources.get(rel_path)
+            if old is not None and old[2] == sources[rel_path][2]:
+                if rel_path in previous_graph:
+                    graph[rel_path] = previous_graph[rel_path]
+                continue
+            try:
+                data = path.read_bytes()
+                if INCLUDE_MARKER in data:
+                    graph[rel_path] = direct_includes(data.decode('utf-8'))
+            except (OSError, UnicodeDecodeError):
+                continue
+        return graph
+
+    def _sync_assistant_rules(self, source_dir: Path, target_root: Path, assistants: List[str],
+                              only_sources: Optional[Dict[str, Set[str]]] = None
+                              ) -> Dict[str, List[str]]:
+        """
+        Sync rules for specific AI assistants by removing and regenerating their directories.
+        
+        Args:
+            source_dir: Source directory (project_rules/)
+            target_root: Target project root directory
+            assistants: List of assistant names to sync
+            only_sources: Per-assistant sets of source paths (relative to source_dir) to
+                re-render in place. Assistants not listed are fully regenerated.
+            
+        Returns:
+            Output paths (relative to target_root) for each synced assistant
+        """
+        only_sources = only_sources or {}
+        rendered: Dict[str, List[str]] = {}
+        for assistant in assistants:
+            if assistant in ASSISTANT_TARGET_DIRS:
+                rendered[assistant] = self._sync_planned_rules(
+                    assistant, source_dir, target_root, only_sources.get(assistant)
+                )
             else:
                 print(f"Warning: Unknown assistant '{assistant}' - skipping")
+        return rendered
 
-    def _sync_cursor_rules(self, source_dir: Path, target_root: Path) -> None:
-        """Sync rules for Cursor AI assistant (.cursor/rules/*.mdc)."""
-        target_dir = target_root / TARGET_CURSOR_DIR
-        if target_dir.exists():
-            shutil.rmtree(target_dir)
-        target_dir.mkdir(parents=True, exist_ok=True)
+    def _sync_planned_rules(self, assistant: str, source_dir: Path, target_root: Path,
+                            only_sources: Optional[Set[str]] = None) -> List[str]:
+        """
+        Render an assistant's rule directory from its output plan.
         
-        count = self.copy_and_number_files(source_dir, target_dir, extension_mode='add_mdc')
-        print(f"Synced {count} Cursor rule files in {target_dir}")
+        Args:
+            assistant: Assistant name
+            source_dir: Source directory (project_rules/)
+            target_root: Target project root directory
+            only_sources: If given, rewrite only the outputs of these source paths
+                (relative to source_dir) and leave the rest of the directory untouched.
+            
+        Returns:
+            All output paths in the assistant's plan, relative to target_root
+        """
+        target_dir = target_root / ASSISTANT_TARGET_DIRS[assistant]
+        files = self.rule_file_index(source_dir)
+        plan = self.plan_assistant_outputs(source_dir, assistant, files)
+        if only_sources is None:
+            outputs = [output for _, output in plan]
+            for output_dir in self.assistant_output_dirs(target_root, assistant, outputs):
+                shutil.rmtree(output_dir)
+            target_dir.mkdir(parents=True, exist_ok=True)
+        count = 0
+        for source_path, output in plan:
+            if (only_sources is not None
+                    and source_path.relative_to(source_dir).as_posix() not in only_sources):
+                continue
+            if self.write_rule_output(source_path, target_root / output, files, assistant):
+                count += 1
+                
+        print(f"Synced {count} {ASSISTANT_LABELS[assistant]} rule files in {target_dir}")
+        return [output for _, output in plan]
+
+    def _sync_cursor_rules(self, source_dir: Path, target_root: Path) -> List[str]:
+        """Sync rules for Cursor AI assistant (.cursor/rules/*.mdc)."""
+        return self._sync_planned_rules('cursor', source_dir, target_root)
 
-    def _sync_windsurf_rules(self, source_dir: Path, target_root: Path) -> None:
+    def _sync_windsurf_rules(self, source_dir: Path, target_root: Path) -> List[str]:
         """Sync rules for Windsurf AI assistant (.windsurf/rules/*.md)."""
-        target_dir = target_root / TARGET_WINDSURF_DIR
-        if target_dir.exists():
-            shutil.rmtree(target_dir)
-        target_dir.mkdir(parents=True, exist_ok=True)
-        
-        count = self.copy_and_number_files(source_dir, target_dir, extension_mode='add_md')
-        print(f"Synced {count} Windsurf rule files in {target_dir}")
+        return self._sync_planned_rules('windsurf', source_dir, target_root)
 
-    def _sync_cline_rules(self, source_dir: Path, target_root: Path) -> None:
+    def _sync_cline_rules(self, source_dir: Path, target_root: Path) -> List[str]:
         """Sync rules for Cline AI assistant (.clinerules/)."""
-        target_dir = target_root / TARGET_CLINE_DIR
-        if target_dir.exists():
-            shutil.rmtree(target_dir)
-        target_dir.mkdir(parents=True, exist_ok=True)
-        
-        count = self.copy_and_number_files(source_dir, target_dir, extension_mode='remove')
-        print(f"Synced {count} Cline rule files in {target_dir}")
+        return self._sync_planned_rules('cline', source_dir, target_root)
 
-    def _sync_roo_rules(self, source_dir: Path, target_root: Path) -> None:
+    def _sync_roo_rules(self, source_dir: Path, target_root: Path) -> List[str]:
         """Sync rules for RooCode AI assistant (.roo/rules/)."""
-        target_dir = target_root / TARGET_ROO_DIR
-        if target_dir.exists():
-            shutil.rmtree(target_dir)
-        target_dir.mkdir(parents=True, exist_ok=True)
+        return self._sync_planned_rules('roo', source_dir, target_root)
+
+    def status(self, project_dir: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Report drift between project_rules/ and the generated assistant outputs.
+        
+        This is read-only and cheap: it loads the manifest, stats the source tree
+        (hashing only files whose stat changed) and lists the assistant output
+        directories once. Nothing is rendered.
+        
+        Args:
+            project_dir: Target project directory. If None, uses current project root.
+            
+        Returns:
+            Report dictionary with keys 'project_root', 'synced', 'up_to_date',
+            'sources' (added/removed/modified paths), 'stale' (output groups rendered
+            from an older tree), 'missing' and 'orphaned' (output paths).
+        """
+        if project_dir is not None:
+            target_root = Path(project_dir).absolute()
+        else:
+            target_root = self.project_root
+            
+        source_rules_dir = target_root / TARGET_PROJECT_RULES_DIR
+        report: Dict[str, Any] = {
+            "project_root": str(target_root),
+            "synced": False,
+            "up_to_date": False,
+            "sources": {"added": [], "removed": [], "modified": [], "config_changed": False},
+            "stale": [],
+            "missing": [],
+            "orphaned": [],
+        }
+        manifest = load_manifest(target_root)
+        if manifest is None or not source_rules_dir.is_dir():
+            return report
+        report["synced"] = True
+        
+        changes = diff_sources(manifest.get("sources", {}), source_rules_dir)
+        config_changed = file_changed(manifest.get("config"),
+                                      source_rules_dir / RULE_SET_CONFIG_FILE)
+        report["sources"] = dict(changes._asdict(), config_changed=config_changed)
+        
+        recorded_outputs = manifest.get("outputs", {})
+        present: Set[str] = set()
+        for assistant in ALL_ASSISTANTS:
+            for output_dir in self.assistant_output_dirs(target_root, assistant):
+                prefix = output_dir.relative_to(target_root).as_posix()
+                present.update(f"{prefix}/{rel_path}" for rel_path in scan_tree(output_dir))
+        recorded = set()
+        for name, record in sorted(recorded_outputs.items()):
+            files = record.get("files", [])
+            recorded.update(files)
+            if changes or config_changed or record.get("tree") != manifest.get("tree"):
+                report["stale"].append(name)
+            for output in files:
+                if output not in present and not (target_root / output).is_file():
+                    report["missing"].append(output)
+        report["orphaned"] = sorted(present - recorded)
+        report["up_to_date"] = not (report["stale"] or report["missing"] or report["orphaned"])
+        return report
+
+    def index_memory(self, project_dir: Optional[str] = None,
+                     split_over: Optional[int] = None) -> int:
+        """
+        Generate memory/INDEX.md, re-reading only memory files changed since the last run.
+        
+        Args:
+            project_dir: Target project directory. If None, uses current project root.
+            split_over: Shard Markdown memory files larger than this many bytes
+                at their '##' headings before indexing
+            
+        Returns:
+            int: Return code (0 for success, non-zero for error)
+        """
+        from .memory_index import (
+            MEMORY_INDEX_FILE,
+            load_index_cache,
+            render_index,
+            save_index_cache,
+            update_entries,
+        )
+
+        located = self._memory_state(project_dir)
+        if located is None:
+            return 1
+        memory_dir, state_dir = located
+            
+        def memory_files() -> Dict[str, Path]:
+            files = index_tree(memory_dir)
+            files.pop(MEMORY_INDEX_FILE, None)
+            return files
+            
+        if split_over is not None:
+            self._split_memory_files(memory_files(), split_over)
+                    
+        entries, reread = update_entries(memory_files(), load_index_cache(state_dir))
+        try:
+            save_index_cache(state_dir, entries)
+        except OSError as e:
+            print(f"Warning: Unable to write memory index cache: {e}")
+            
+        index_path = memory_dir / MEMORY_INDEX_FILE
+        content = render_index(entries)
+        try:
+            unchanged = index_path.read_text(encoding='utf-8') == content
+        except OSError:
+            unchanged = False
+        if unchanged:
+            print(f"Memory index is up to date ({len(entries)} files): {index_path}")
+        else:
+            index_path.write_text(content, encoding='utf-8')
+            print(f"Indexed {len(entries)} memory files ({len(reread)} re-read) into {index_path}")
+        return 0
+
+    def _split_memory_files(self, files: Dict[str, Path], split_over: int) -> None:
+        """Shard the Markdown memory files larger than split_over bytes at their '##' headings."""
+        from .memory_index import split_memory_file
+
+        for rel_path, path in files.items():
+            if path.suffix.lower() != ".md" or path.stat().st_size <= split_over:
+                continue
+            shards = split_memory_file(path)
+            if shards is None:
+                print(f"Warning: Not splitting {rel_path}: it has fewer than two '##' sections "
+                      "or its shard directory already exists")
+            else:
+                print(f"Split {rel_path} into {len(shards)} shards in "
+                      f"{path.with_suffix('').name}/")
+
+    def _memory_state(self, project_dir: Optional[str]) -> Optional[Tuple[Path, Path]]:
+        """Return (memory_dir, state_dir) of a project, or print an error without a memory bank."""
+        target_root = Path(project_dir).absolute() if project_dir is not None else self.project_root
+        memory_dir = target_root / TARGET_MEMORY_BANK_DIR
+        if not memory_dir.is_dir():
+            print(f"Error: Memory bank not found: {memory_dir}. Run 'rulebook-ai install' first.")
+            return None
+        return memory_dir, target_root / TARGET_STATE_DIR
+
+    def _fingerprint_memory(self, memory_dir: Path,
+                            state_dir: Path) -> Tuple[Dict[str, Path], Dict[str, List[Any]]]:
+        """Index and fingerprint the memory bank, reusing blob ids of the latest snapshot."""
+        from .snapshots import list_snapshots
+
+        files = index_tree(memory_dir)
+        snapshots = list_snapshots(state_dir)
+        previous = snapshots[-1]["files"] if snapshots else None
+        return files, fingerprint_sources(files, previous)
+
+    def snapshot_memory(self, project_dir: Optional[str] = None, message: str = "") -> int:
+        """
+        Record a point-in-time snapshot of the memory bank.
+        
+        Only file contents not already in the object store are copied.
+        
+        Args:
+            project_dir: Target project directory. If None, uses current project root.
+            message: Optional note stored with the snapshot
+            
+        Returns:
+            int: Return code (0 for success, non-zero for error)
+        """
+        from .snapshots import list_snapshots, take_snapshot
+
+        located = self._memory_state(project_dir)
+        if located is None:
+            return 1
+        memory_dir, state_dir = located
+        snapshots = list_snapshots(state_dir)
+        files, fingerprints = self._fingerprint_memory(memory_dir, state_dir)
+        record = take_snapshot(state_dir, fingerprints, files, message)
+        if snapshots and record["id"] == snapshots[-1]["id"]:
+            print(f"Memory bank unchanged since snapshot {record['id']}")
+        else:
+            print(f"Created memory snapshot {record['id']} ({len(files)} files)")
+        return 0
+
+    def memory_snapshots(self, project_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        List the memory snapshots of a project, oldest first.
+        
+        Args:
+            project_dir: Target project directory. If None, uses current project root.
+            
+        Returns:
+            Snapshot records with 'id', 'seq', 'digest', 'created', 'message' and 'files'
+        """
+        from .snapshots import list_snapshots
+
+        target_root = Path(project_dir).absolute() if project_dir is not None else self.project_root
+        return list_snapshots(target_root / TARGET_STATE_DIR)
+
+    def diff_memory(self, old_ref: Optional[str] = None, new_ref: Optional[str] = None,
+                    project_dir: Optional[str] = None, name_only: bool = False) -> int:
+        """
+        Show what changed in the memory bank between two snapshots, or since a snapshot.
+        
+        Files are compared by blob id; only files that differ are read.
+        
+        Args:
+            old_ref: Snapshot id, id prefix or 'latest' (the default when None)
+            new_ref: Later snapshot, or None for the current memory bank
+            project_dir: Target project directory. If None, uses current project root.
+            name_only: List changed paths without their diffs
+            
+        Returns:
+            int: Return code (0 for success, non-zero for error)
+        """
+        from .snapshots import (
+            LATEST_SNAPSHOT,
+            SnapshotError,
+            changed_paths,
+            find_snapshot,
+            read_object,
+            unified_diff,
+        )
+
+        located = self._memory_state(project_dir)
+        if located is None:
+            return 1
+        memory_dir, state_dir = located
+        try:
+            old = find_snapshot(state_dir, old_ref or LATEST_SNAPSHOT)
+            if new_ref is not None:
+                new_files = find_snapshot(state_dir, new_ref)["files"]
+                new_paths, new_label = None, new_ref
+            else:
+                new_paths = index_tree(memory_dir)
+                new_files, new_label = fingerprint_sources(new_paths, old["files"]), "working"
+            changes = changed_paths(old["files"], new_files)
+            
+            if not any(changes.values()):
+                print(f"No memory changes between {old['id']} and {new_label}")
+                return 0
+            for kind, marker in (("added", "A"), ("removed", "D"), ("modified", "M")):
+                for rel_path in changes[kind]:
+                    if name_only:
+                        print(f"{marker} {rel_path}")
+                        continue
+                    old_data = None
+                    if kind != "added":
+                        old_data = read_object(state_dir, old["files"][rel_path][2])
+                    new_data = None
+                    if kind != "removed":
+                        new_data = (new_paths[rel_path].read_bytes() if new_paths is not None
+                                    else read_object(state_dir, new_files[rel_path][2]))
+                    sys.stdout.writelines(unified_diff(old_data, new_data,
+                                                       f"{old['id']}/{rel_path}",
+                                                       f"{new_label}/{rel_path}"))
+        except SnapshotError as e:
+            print(f"Error: {e}")
+            return 1
+        return 0
+
+    def restore_memory(self, ref: str, project_dir: Optional[str] = None) -> int:
+        """
+        Restore the memory bank to a snapshot.
+        
+        The current state is snapshotted first, so a restore can be undone.
+        Only files whose blob id differs from the snapshot are rewritten;
+        files that did not exist in the snapshot are removed.
+        
+        Args:
+            ref: Snapshot id, id prefix or 'latest'
+            project_dir: Target project directory. If None, uses current project root.
+            
+        Returns:
+            int: Return code (0 for success, non-zero for error)
+        """
+        from .snapshots import (
+            SnapshotError,
+            changed_paths,
+            find_snapshot,
+            read_object,
+            take_snapshot,
+        )
+
+        located = self._memory_state(project_dir)
+        if located is None:
+            return 1
+        memory_dir, state_dir = located
+        try:
+            record = find_snapshot(state_dir, ref)
+            files, current = self._fingerprint_memory(memory_dir, state_dir)
+            changes = changed_paths(current, record["files"])
+            if not any(changes.values()):
+                print(f"Memory bank already matches snapshot {record['id']}")
+                return 0
+                
+            backup = take_snapshot(state_dir, current, files, f"before restoring {record['id']}")
+            # Read every object before touching the memory bank, so a missing one changes nothing
+            contents = {
+                rel_path: read_object(state_dir, record["files"][rel_path][2])
+                for rel_path in changes["added"] + changes["modified"]
+            }
+        except SnapshotError as e:
+            print(f"Error: {e}")
+            return 1
+            
+        for rel_path, data in contents.items():
+            destination = memory_dir / rel_path
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            destination.write_bytes(data)
+        for rel_path in changes["removed"]:
+            files[rel_path].unlink()
+            parent = files[rel_path].parent
+            while parent != memory_dir and not any(parent.iterdir()):
+                parent.rmdir()
+                parent = parent.parent
+        print(f"Restored memory snapshot {record['id']}: {len(changes['modified'])} files "
+              f"reverted, {len(changes['added'])} recreated, {len(changes['removed'])} removed")
+        print(f"Previous state saved as snapshot {backup['id']}")
+        return 0
+
+    def context_stats(self, project_dir: Optional[str] = None, top: int = 10) -> Dict[str, Any]:
+        """
+        Profile the context cost of the installed assistant outputs.
+        
+        Args:
+            project_dir: Target project directory. If None, uses current project root.
+            top: Number of heaviest files and duplicated paragraphs to report
+            
+        Returns:
+            Report from context_cost.profile_outputs() with 'project_root' added;
+            'assistants' is empty if nothing is installed
+        """
+        from .context_cost import profile_outputs
+
+        if project_dir is not None:
+            target_root = Path(project_dir).absolute()
+        else:
+            target_root = self.project_root
+            
+        outputs: Dict[str, List[Tuple[str, Optional[str], str]]] = {}
+        for assistant in ALL_ASSISTANTS:
+            for output_dir in self.assistant_output_dirs(target_root, assistant):
+                mode = None
+                if assistant == 'roo' and output_dir.name.startswith(ROO_MODE_DIR_PREFIX):
+                    mode = output_dir.name[len(ROO_MODE_DIR_PREFIX):]
+                prefix = output_dir.relative_to(target_root).as_posix()
+                for rel_path in sorted(scan_tree(output_dir)):
+                    text = (output_dir / rel_path).read_text(encoding='utf-8', errors='replace')
+                    outputs.setdefault(assistant, []).append((f"{prefix}/{rel_path}", mode, text))
+                    
+        github_dir = target_root / TARGET_GITHUB_COPILOT_DIR
+        copilot_files = [github_dir / TARGET_COPILOT_INSTRUCTIONS_FILE]
+        scoped_dir = github_dir / TARGET_COPILOT_SCOPED_DIR
+        copilot_files += sorted(scoped_dir.glob(f"*{COPILOT_SCOPED_SUFFIX}"))
+        for path in copilot_files:
+            if path.is_file():
+                outputs.setdefault('copilot', []).append((
+                    path.relative_to(target_root).as_posix(), None,
+                    path.read_text(encoding='utf-8', errors='replace'),
+                ))
+                
+        report = profile_outputs(outputs, top=top)
+        report["project_root"] = str(target_root)
+        return report
+
+    def perf_report(self, project_dir: Optional[str] = None,
+                    assistants: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Measure what makes installs and syncs slow in a project.
+        
+        Renders go to a temporary directory, so the project is not modified
+        apart from short-lived probe files used to time the filesystem.
+        
+        Args:
+            project_dir: Target project directory. If None, uses current project root.
+            assistants: Assistants to time a dry-run render for (default: all, plus copilot)
+            
+        Returns:
+            Report dictionary with keys 'project_root', 'filesystem' (median/max
+            milliseconds per operation), 'imports' (tool starter import times),
+            'rule_tree' (source, files, bytes, tokens, largest) and 'render'
+            (seconds per assistant)
+        """
+        from .catalog import estimate_tokens
+        from .diagnostics import measure_filesystem, time_module_import
+
+        if project_dir is not None:
+            target_root = Path(project_dir).absolute()
+        else:
+            target_root = self.project_root
+        assistants = assistants or ALL_ASSISTANTS + ['copilot']
+        
+        source_dir = target_root / TARGET_PROJECT_RULES_DIR
+        if not source_dir.is_dir():
+            source_dir = self.source_rules_dir / DEFAULT_RULE_SET
+        files = self.rule_file_index(source_dir)
+        sizes = {rel_path: path.stat().st_size for rel_path, path in files.items()}
+        total_bytes = sum(sizes.values())
+        
+        report: Dict[str, Any] = {
+            "project_root": str(target_root),
+            "filesystem": measure_filesystem(target_root),
+            "imports": {
+                path.name: time_module_import(path)
+                for path in sorted(self.source_tools_dir.glob("*.py"))
+            },
+            "rule_tree": {
+                "source": str(source_dir),
+                "files": len(files),
+                "bytes": total_bytes,
+                "tokens": estimate_tokens(total_bytes),
+                "largest": max(sizes, key=sizes.__getitem__) if sizes else None,
+            },
+            "render": {},
+        }
+        
+        render_root = Path(tempfile.mkdtemp(prefix="rulebook-ai-render-"))
+        try:
+            for assistant in assistants:
+                # Start cold, as a fresh process would
+                self._template_cache.clear()
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    if assistant == 'copilot':
+                        self.plan_copilot_outputs(source_dir)
+                    else:
+                        self._install_assistant_rules(source_dir, render_root, [assistant])
+                report["render"][assistant] = round(time.perf_counter() - start, 4)
+        finally:
+            shutil.rmtree(render_root, ignore_errors=True)
+        return report
+
+    def _tree_key(self, source_dir: Path, previous: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Compute the input digest of a rules directory, as recorded in the manifest's 'tree'.
+        
+        Args:
+            source_dir: Rules directory (normally project_rules/)
+            previous: Manifest whose blob ids may be reused for files with unchanged stat
+            
+        Returns:
+            Hex digest of the rule files and the rule set config
+        """
+        sources = fingerprint_sources(self.rule_file_index(source_dir),
+                                      (previous or {}).get("sources"))
+        config = file_fingerprint(source_dir / RULE_SET_CONFIG_FILE)
+        if config is not None:
+            return tree_digest(dict(sources, **{RULE_SET_CONFIG_FILE: config}))
+        return tree_digest(sources)
+
+    def pack_key(self, project_dir: Optional[str] = None) -> Optional[str]:
+        """
+        Return the input key a pack of this project would be stored under.
+        
+        Args:
+            project_dir: Target project directory. If None, uses current project root.
+            
+        Returns:
+            Hex digest of project_rules/, or None if it does not exist
+        """
+        target_root = Path(project_dir).absolute() if project_dir is not None else self.project_root
+        source_rules_dir = target_root / TARGET_PROJECT_RULES_DIR
+        if not source_rules_dir.is_dir():
+            return None
+        return self._tree_key(source_rules_dir, load_manifest(target_root))
+
+    def pack(self, project_dir: Optional[str] = None, output: Optional[str] = None) -> int:
+        """
+        Archive project_rules/, all recorded assistant outputs and the manifest.
+        
+        Args:
+            project_dir: Target project directory. If None, uses current project root.
+            output: Archive path (default: rulebook-ai-<key>.tar.gz in the current directory)
+            
+        Returns:
+            int: Return code (0 for success, non-zero for error)
+        """
+        from .packing import write_pack
+
+        target_root = Path(project_dir).absolute() if project_dir is not None else self.project_root
+        report = self.status(project_dir=str(target_root))
+        if not report["synced"]:
+            print(f"Error: No sync manifest found in {target_root}. "
+                  "Run 'rulebook-ai install' or 'sync' first.")
+            return 1
+        if not report["up_to_date"]:
+            print("Error: Assistant outputs are out of date. "
+                  "Run 'rulebook-ai sync' before packing.")
+            return 1
+            
+        manifest = load_manifest(target_root) or {}
+        key = manifest["tree"]
+        rel_paths = [
+            f"{TARGET_PROJECT_RULES_DIR}/{rel_path}"
+            for rel_path in index_tree(target_root / TARGET_PROJECT_RULES_DIR, include_hidden=True)
+        ]
+        for record in manifest.get("outputs", {}).values():
+            rel_paths += [output_path for output_path in record.get("files", [])
+                          if (target_root / output_path).is_file()]
+        rel_paths.append(manifest_path(target_root).relative_to(target_root).as_posix())
+        
+        archive_path = Path(output) if output else Path.cwd() / f"rulebook-ai-{key[:16]}.tar.gz"
+        index = write_pack(target_root, rel_paths, key, archive_path.absolute())
+        print(f"Packed {len(index['files'])} files into {archive_path} (key {key})")
+        return 0
+
+    def unpack(self, archive: str, project_dir: Optional[str] = None, force: bool = False) -> int:
+        """
+        Restore a pack into a project, verifying every file before anything is replaced.
+        
+        Args:
+            archive: Archive written by pack()
+            project_dir: Target project directory. If None, uses current project root.
+            force: Restore even if the project's existing project_rules/ differ
+                from the rules the pack was built from
+            
+        Returns:
+            int: Return code (0 for success, non-zero for error)
+        """
+        from .packing import PackError, install_staged, read_pack
+
+        target_root = Path(project_dir).absolute() if project_dir is not None else self.project_root
+        state_dir = target_root / TARGET_STATE_DIR
+        state_dir.mkdir(parents=True, exist_ok=True)
+        staging_dir = Path(tempfile.mkdtemp(prefix="unpack-", dir=state_dir))
+        try:
+            try:
+                index = read_pack(Path(archive), staging_dir)
+            except PackError as e:
+                print(f"Error: Unable to restore {archive}: {e}")
+                return 1
+                
+            current_key = self.pack_key(str(target_root))
+            if current_key is not None and current_key != index["key"] and not force:
+                print(f"Error: {archive} was built from different rules "
+                      f"(pack key {index['key'][:16]}, project {current_key[:16]}). "
+                      "Use --force to restore it anyway.")
+                return 1
+                
+            restored = set(index["files"])
+            self._prune_before_restore(target_root, restored)
+            install_staged(staging_dir, target_root, sorted(restored))
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            
+        # Files were rewritten, so refresh the recorded stat info to keep later syncs cheap
+        manifest = load_manifest(target_root)
+        if manifest is not None:
+            source_rules_dir = target_root / TARGET_PROJECT_RULES_DIR
+            manifest["sources"] = fingerprint_sources(self.rule_file_index(source_rules_dir))
+            manifest["config"] = file_fingerprint(source_rules_dir / RULE_SET_CONFIG_FILE)
+            save_manifest(target_root, manifest)
+        print(f"Restored {len(index['files'])} files from {archive} into {target_root}")
+        return 0
+
+    def _prune_before_restore(self, target_root: Path, restored: Set[str]) -> None:
+        """
+        Remove what a pack replaces, so nothing outside the archive is left behind.
+        
+        Restoring replaces project_rules/ and the assistant output directories
+        wholesale. Outputs recorded in the current manifest but absent from the
+        archive (e.g. scoped Copilot instructions) are removed as well.
         
-        count = self.copy_and_restructure_roocode(source_dir, target_dir)
-        print(f"Synced {count} RooCode rule files in {target_dir}")
+        Args:
+            target_root: Target project root directory
+            restored: Paths in the archive, relative to target_root
+        """
+        manifest = load_manifest(target_root) or {}
+        for assistant in ALL_ASSISTANTS:
+            if any(path.startswith(f"{ASSISTANT_TARGET_DIRS[assistant]}/") for path in restored):
+                output_dirs = self.assistant_output_dirs(target_root, assistant, sorted(restored))
+                for output_dir in output_dirs:
+                    shutil.rmtree(output_dir)
+        for record in manifest.get("outputs", {}).values():
+            for rel_path in record.get("files", []):
+                if rel_path not in restored and (target_root / rel_path).is_file():
+                    (target_root / rel_path).unlink()
+        # Last: RooCode mode directories are found through project_rules/
+        if any(path.startswith(f"{TARGET_PROJECT_RULES_DIR}/") for path in restored):
+            shutil.rmtree(target_root / TARGET_PROJECT_RULES_DIR, ignore_errors=True)
+
+    def _remove_copilot_scoped_files(self, target_root: Path) -> int:
+        """
+        Remove the path-scoped Copilot instruction files recorded in the manifest.
+        
+        Only recorded files are removed, so instructions the user wrote by hand
+        in .github/instructions/ are left alone.
+        
+        Args:
+            target_root: Target project root directory
+            
+        Returns:
+            Number of files removed
+        """
+        manifest = load_manifest(target_root) or {}
+        recorded = (manifest.get("outputs", {}).get("copilot") or {}).get("files", [])
+        removed = 0
+        for rel_path in recorded:
+            path = target_root / rel_path
+            if rel_path.endswith(COPILOT_SCOPED_SUFFIX) and path.is_file():
+                path.unlink()
+                removed += 1
+        scoped_dir = target_root / TARGET_GITHUB_COPILOT_DIR / TARGET_COPILOT_SCOPED_DIR
+        if removed and scoped_dir.is_dir() and not any(scoped_dir.iterdir()):
+            scoped_dir.rmdir()
+        if removed:
+            print(f"Removed {removed} scoped GitHub Copilot instruction files from {scoped_dir}")
+        return removed
 
     def clean_rules(self, project_dir: Optional[str] = None) -> int:
         """
@@ -601,28 +2093,30 @@ class RuleManager:
         target_github_dir = target_root / TARGET_GITHUB_COPILOT_DIR
         copilot_file = target_github_dir / TARGET_COPILOT_INSTRUCTIONS_FILE
         
+        # Find the output directories (including RooCode's per-mode ones) while project_rules/
+        # still exists
+        output_dirs = [(assistant, dir_path) for assistant in ALL_ASSISTANTS
+                       for dir_path in self.assistant_output_dirs(target_root, assistant)]
+        
         # Clean rules directory
         if target_rules_dir.exists():
             shutil.rmtree(target_rules_dir)
             print(f"Removed rules directory: {target_rules_dir}")
             
         # Clean assistant-specific directories
-        assistant_dirs = [
-            (target_root / TARGET_CURSOR_DIR, "Cursor"),
-            (target_root / TARGET_WINDSURF_DIR, "Windsurf"), 
-            (target_root / TARGET_CLINE_DIR, "Cline"),
-            (target_root / TARGET_ROO_DIR, "RooCode")
-        ]
-        
-        for dir_path, name in assistant_dirs:
-            if dir_path.exists():
-                shutil.rmtree(dir_path)
-                print(f"Removed {name} rules directory: {dir_path}")
+        for assistant, dir_path in output_dirs:
+            shutil.rmtree(dir_path)
+            print(f"Removed {ASSISTANT_LABELS[assistant]} rules directory: {dir_path}")
             
         # Clean GitHub Copilot instructions
         if copilot_file.exists():
             copilot_file.unlink()
             print(f"Removed GitHub Copilot instructions: {copilot_file}")
+        self._remove_copilot_scoped_files(target_root)
+            
+        # The sync manifest describes outputs that no longer exist
+        if manifest_path(target_root).exists():
+            manifest_path(target_root).unlink()
             
         print("Rules cleaned successfully.")
         return 0
@@ -671,6 +2165,13 @@ class RuleManager:
             copilot_file.unlink()
             cleaned_count += 1
             print(f"Removed GitHub Copilot instructions: {copilot_file}")
+        if self._remove_copilot_scoped_files(target_root):
+            cleaned_count += 1
+            
+        # Sync manifest, locks and other rulebook-ai state
+        target_state_dir = target_root / TARGET_STATE_DIR
+        if target_state_dir.exists():
+            shutil.rmtree(target_state_dir)
             
         if cleaned_count == 0:
             print("No rulebook-ai files found to clean.")
@@ -679,20 +2180,101 @@ class RuleManager:
             
         return 0
 
-    def list_rules(self) -> List[str]:
+    def describe_rule_set(self, rule_set_dir: Path) -> Dict[str, Any]:
         """
-        List all available rule sets.
+        Collect the catalog metadata of one rule set.
         
+        Args:
+            rule_set_dir: Rule set directory
+            
         Returns:
-            List of available rule set names
+            Catalog entry: rule file count, size in bytes, token estimate,
+            RooCode modes and whether the set ships memory/tool starters
         """
-        if not self.source_rules_dir.exists():
+        from .catalog import estimate_tokens
+
+        rules = self.renderable_rules(
+            index_tree(rule_set_dir, exclude_dirs=RULE_SET_STARTER_DIRS)
+        )
+        byte_count = sum(path.stat().st_size for path in rules.values())
+        config_modes = self.config_section(self.load_rule_set_config(rule_set_dir), "roo_modes")
+        modes = set()
+        for rel_path in rules:
+            mode_path = self.roo_output_path(rel_path, config_modes)
+            if mode_path.startswith(ROO_MODE_DIR_PREFIX):
+                modes.add(mode_path.split('/', 1)[0][len(ROO_MODE_DIR_PREFIX):])
+        return {
+            "files": len(rules),
+            "bytes": byte_count,
+            "tokens": estimate_tokens(byte_count),
+            "modes": sorted(modes),
+            "memory_starters": (rule_set_dir / RULE_SET_MEMORY_STARTERS_DIR).is_dir(),
+            "tool_starters": (rule_set_dir / RULE_SET_TOOL_STARTERS_DIR).is_dir(),
+        }
+
+    def rule_set_catalog(self, refresh: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Return catalog metadata for every available rule set.
+        
+        The prebuilt catalog (rule_sets/catalog.json) is used for sets not
+        modified since it was written; it is only rewritten by a refresh. Sets
+        missing from it or edited later are described once and kept in the
+        user cache, stamped with their directories' modification times.
+        
+        Args:
+            refresh: Rebuild every entry and the prebuilt catalog, e.g. after
+                editing a bundled rule set
+            
+        Returns:
+            Catalog entries keyed by rule set name, sorted by name
+        """
+        from .catalog import (
+            CATALOG_FILE,
+            load_cached_catalog,
+            load_catalog,
+            rule_set_stamp,
+            save_cached_catalog,
+            save_catalog,
+        )
+
+        if not self.source_rules_dir.is_dir():
             print(f"Error: Rules directory {self.source_rules_dir} not found.")
-            return []
+            return {}
             
-        rule_sets = [
-            p.name for p in self.source_rules_dir.iterdir() 
-            if p.is_dir() and not p.name.startswith('.')
-        ]
+        with os.scandir(self.source_rules_dir) as entries:
+            names = sorted(
+                entry.name for entry in entries
+                if entry.is_dir() and not entry.name.startswith('.')
+            )
+        shipped = {} if refresh else (load_catalog(self.source_rules_dir) or {})
+        try:
+            shipped_mtime = (self.source_rules_dir / CATALOG_FILE).stat().st_mtime_ns
+        except OSError:
+            shipped_mtime = -1
+        cached = {} if refresh else load_cached_catalog(self.source_rules_dir)
+        catalog: Dict[str, Dict[str, Any]] = {}
+        records: Dict[str, Dict[str, Any]] = {}
+        for name in names:
+            stamp = rule_set_stamp(self.source_rules_dir / name)
+            record = cached.get(name)
+            if isinstance(record, dict) and record.get("stamp") == stamp:
+                catalog[name], records[name] = record["entry"], record
+            elif name in shipped and stamp <= shipped_mtime:
+                catalog[name] = shipped[name]
+            else:
+                catalog[name] = self.describe_rule_set(self.source_rules_dir / name)
+                records[name] = {"stamp": stamp, "entry": catalog[name]}
+        if records != cached:
+            save_cached_catalog(self.source_rules_dir, records)
+        if refresh and not save_catalog(self.source_rules_dir, catalog):
+            print(f"Warning: Unable to write {self.source_rules_dir / CATALOG_FILE}")
+        return catalog
+
+    def list_rules(self) -> List[str]:
+        """
+        List all available rule sets.
         
-        return sorted(rule_sets)
+        Returns:
+            List of available rule set names
+        """
+        return list(self.rule_set_catalog())
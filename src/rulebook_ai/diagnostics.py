@@ -0,0 +1,191 @@
+"""
+Performance diagnostics for ``rulebook-ai doctor``.
+
+Measurements are plain functions returning dictionaries so the report can be
+printed or emitted as JSON. ``evaluate`` compares them with
+``PERF_THRESHOLDS`` and marks each check 'ok' or 'warn'.
+
+- Filesystem latency: median and worst stat/create/rename time of small
+  files in the project directory. Network filesystems, sync clients and
+  antivirus overlays typically add milliseconds per operation, which adds up
+  across a sync.
+- Import time of each tool starter, measured in a fresh interpreter so
+  modules already loaded by rulebook-ai do not hide the cost.
+- Installed versions of the packages the tool starters need, found in one
+  pass over the installed distributions.
+"""
+
+import importlib.metadata
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+FS_PROBE_SAMPLES = 50
+IMPORT_TIMEOUT_SECONDS = 60
+
+# Warning thresholds: filesystem operations in milliseconds, imports and
+# renders in seconds, rule tree size in estimated tokens
+PERF_THRESHOLDS: Dict[str, float] = {
+    "fs.stat_ms": 0.5,
+    "fs.create_ms": 5.0,
+    "fs.rename_ms": 5.0,
+    "import_seconds": 1.0,
+    "render_seconds": 0.5,
+    "rule_tree_tokens": 20000,
+}
+
+_IMPORT_PROBE = """
+import importlib.util, json, sys, time
+start = time.perf_counter()
+error = None
+try:
+    spec = importlib.util.spec_from_file_location("_rulebook_ai_probe", sys.argv[1])
+    spec.loader.exec_module(importlib.util.module_from_spec(spec))
+except BaseException as e:
+    error = f"{type(e).__name__}: {e}"
+print()
+print(json.dumps({"seconds": time.perf_counter() - start, "error": error}))
+"""
+
+
+def _normalize(name: str) -> str:
+    """Normalize a distribution name as in PEP 503."""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def installed_versions(packages: Iterable[str]) -> Dict[str, Optional[str]]:
+    """
+    Look up the installed versions of several packages in one pass.
+
+    Args:
+        packages: Distribution names
+
+    Returns:
+        Version per requested name, None for packages that are not installed
+    """
+    wanted = {_normalize(name): name for name in packages}
+    versions: Dict[str, Optional[str]] = dict.fromkeys(wanted.values())
+    for dist in importlib.metadata.distributions():
+        name = wanted.get(_normalize(dist.metadata["Name"] or ""))
+        if name is not None and versions[name] is None:
+            versions[name] = dist.version
+    return versions
+
+
+def _summary_ms(samples: List[float]) -> Dict[str, float]:
+    """Summarize durations in seconds as median and max milliseconds."""
+    return {
+        "median": round(statistics.median(samples) * 1000, 3),
+        "max": round(max(samples) * 1000, 3),
+    }
+
+
+def measure_filesystem(directory: Path,
+                       samples: int = FS_PROBE_SAMPLES) -> Dict[str, Dict[str, float]]:
+    """
+    Measure stat, create and rename latency of small files in a directory.
+
+    The probe files live in a temporary subdirectory that is removed afterwards.
+
+    Args:
+        directory: Directory to probe (normally the project root)
+        samples: Number of files to create, stat and rename
+
+    Returns:
+        Median and max milliseconds per operation, keyed by 'stat', 'create', 'rename'
+    """
+    timings: Dict[str, List[float]] = {"stat": [], "create": [], "rename": []}
+    probe_dir = Path(tempfile.mkdtemp(prefix=".rulebook-ai-probe-", dir=directory))
+    try:
+        for i in range(samples):
+            path = probe_dir / f"{i}.md"
+            start = time.perf_counter()
+            with open(path, 'wb') as f:
+                f.write(b"probe\n")
+            timings["create"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            os.stat(path)
+            timings["stat"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            os.replace(path, probe_dir / f"{i}.mdc")
+            timings["rename"].append(time.perf_counter() - start)
+    finally:
+        shutil.rmtree(probe_dir, ignore_errors=True)
+    return {op: _summary_ms(values) for op, values in timings.items()}
+
+
+def time_module_import(path: Path, timeout: int = IMPORT_TIMEOUT_SECONDS) -> Dict[str, Any]:
+    """
+    Time the import of a Python file in a fresh interpreter.
+
+    Interpreter start-up is not included. The module is imported under a
+    private name, so its ``if __name__ == "__main__"`` block does not run.
+
+    Args:
+        path: Python source file
+        timeout: Seconds to wait before giving up
+
+    Returns:
+        Dictionary with 'seconds' and 'error' (None if the import succeeded)
+    """
+    try:
+        # Our own interpreter with an argument list, no shell
+        result = subprocess.run(  # noqa: S603
+            [sys.executable, "-c", _IMPORT_PROBE, str(path)],
+            capture_output=True, text=True, timeout=timeout, cwd=path.parent,
+        )
+    except subprocess.TimeoutExpired:
+        return {"seconds": float(timeout), "error": f"timed out after {timeout}s"}
+    lines = result.stdout.strip().splitlines()
+    try:
+        measured: Dict[str, Any] = json.loads(lines[-1])
+    except (IndexError, ValueError):
+        return {"seconds": None, "error": result.stderr.strip() or "no result from import probe"}
+    measured["seconds"] = round(measured["seconds"], 4)
+    return measured
+
+
+def _check(name: str, value: Optional[float], threshold: float) -> Dict[str, Any]:
+    """Build one threshold check."""
+    status = "ok" if value is not None and value <= threshold else "warn"
+    return {"name": name, "value": value, "threshold": threshold, "status": status}
+
+
+def evaluate(report: Dict[str, Any],
+             thresholds: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
+    """
+    Compare a performance report with warning thresholds.
+
+    Args:
+        report: Report from RuleManager.perf_report()
+        thresholds: Thresholds to use instead of PERF_THRESHOLDS
+
+    Returns:
+        Checks with 'name', 'value', 'threshold' and 'status' ('ok' or 'warn')
+    """
+    limits = dict(PERF_THRESHOLDS, **(thresholds or {}))
+    checks = []
+    for op, summary in report.get("filesystem", {}).items():
+        checks.append(_check(f"fs.{op}_ms", summary["median"], limits[f"fs.{op}_ms"]))
+    for name, timing in report.get("imports", {}).items():
+        check = _check(f"import {name}", timing["seconds"], limits["import_seconds"])
+        if timing.get("error"):
+            check["status"] = "warn"
+            check["error"] = timing["error"]
+        checks.append(check)
+    for assistant, seconds in report.get("render", {}).items():
+        checks.append(_check(f"render {assistant}", seconds, limits["render_seconds"]))
+    if "rule_tree" in report:
+        checks.append(_check("rule tree tokens", report["rule_tree"]["tokens"],
+                             limits["rule_tree_tokens"]))
+    return checks
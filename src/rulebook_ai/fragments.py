@@ -0,0 +1,120 @@
+"""
+Shared rule fragments and include directives.
+
+A rule file can pull in a fragment with ``{{> shared/memory-files}}``. Names
+are paths relative to the rules root, and ``.md`` is added when the name has
+no extension. Fragments live under the top-level ``shared/`` directory, which
+is never rendered as rules of its own. Fragments may include other fragments;
+cycles are an error.
+
+Which files include which is recorded in the sync manifest as a dependency
+graph, so that editing one fragment re-renders only the rules that use it.
+"""
+
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Tuple
+
+FRAGMENTS_DIR = "shared"
+INCLUDE_PATTERN = re.compile(r"\{\{>\s*(?P<name>[^\s{}]+)\s*\}\}")
+# Cheap pre-check so files without includes are never decoded
+INCLUDE_MARKER = b"{{>"
+
+
+class IncludeError(ValueError):
+    """Raised when an include cannot be resolved (missing fragment or cycle)."""
+
+
+def is_fragment(rel_path: str) -> bool:
+    """Return True if a relative path is a fragment rather than a rule."""
+    return rel_path.startswith(f"{FRAGMENTS_DIR}/")
+
+
+def resolve_include(name: str) -> str:
+    """
+    Normalize an include name to the relative path of the fragment.
+
+    Args:
+        name: Name as written in the directive, e.g. ``shared/memory-files``
+
+    Returns:
+        POSIX path relative to the rules root, e.g. ``shared/memory-files.md``
+    """
+    name = name.strip('/')
+    if not Path(name).suffix:
+        name = f"{name}.md"
+    return name
+
+
+def direct_includes(text: str) -> List[str]:
+    """
+    List the fragments a text includes directly, in order of first use.
+
+    Args:
+        text: Rule or fragment content
+
+    Returns:
+        Relative fragment paths
+    """
+    names = (resolve_include(m.group('name')) for m in INCLUDE_PATTERN.finditer(text))
+    return list(dict.fromkeys(names))
+
+
+def expand_includes(text: str, files: Dict[str, Path],
+                    _stack: Tuple[str, ...] = ()) -> Tuple[str, List[str]]:
+    """
+    Replace include directives with the content of their fragments, recursively.
+
+    Args:
+        text: Rule content
+        files: Every source file of the rules tree, keyed by relative path
+        _stack: Fragments being expanded (for cycle detection)
+
+    Returns:
+        Tuple of (expanded text, fragments used directly or transitively)
+
+    Raises:
+        IncludeError: If a fragment is missing or includes itself
+    """
+    used: List[str] = []
+
+    def replace(match: "re.Match[str]") -> str:
+        rel_path = resolve_include(match.group('name'))
+        if rel_path in _stack:
+            raise IncludeError(f"include cycle: {' -> '.join(_stack + (rel_path,))}")
+        if rel_path not in files:
+            raise IncludeError(f"fragment '{rel_path}' not found")
+        body = files[rel_path].read_text(encoding='utf-8')
+        expanded, nested = expand_includes(body, files, _stack + (rel_path,))
+        used.append(rel_path)
+        used.extend(nested)
+        return expanded.rstrip('\n')
+
+    return INCLUDE_PATTERN.sub(replace, text), list(dict.fromkeys(used))
+
+
+def dependents(graph: Dict[str, List[str]], changed: Iterable[str]) -> Set[str]:
+    """
+    Find every file that includes a changed file, directly or transitively.
+
+    Args:
+        graph: Direct includes per file, as recorded in the manifest
+        changed: Relative paths of changed files (fragments or ordinary rules)
+
+    Returns:
+        Relative paths of the files that need re-rendering (excluding ``changed``)
+    """
+    included_by: Dict[str, Set[str]] = {}
+    for rel_path, includes in graph.items():
+        for include in includes:
+            included_by.setdefault(include, set()).add(rel_path)
+
+    changed = set(changed)
+    found: Set[str] = set()
+    pending = list(changed)
+    while pending:
+        for parent in included_by.get(pending.pop(), ()):
+            if parent not in found and parent not in changed:
+                found.add(parent)
+                pending.append(parent)
+    return found
@@ -0,0 +1,62 @@
+"""
+Minimal frontmatter handling for rule files.
+
+Rule files start with a small YAML-style block (``trigger``, ``description``,
+``globs``, ``alwaysApply``) used by Cursor and Windsurf. Only flat
+``key: value`` pairs occur in practice, so this parser avoids a YAML
+dependency and handles exactly that subset.
+"""
+
+import re
+from typing import Dict, List, Tuple
+
+FRONTMATTER_PATTERN = re.compile(r"\A---[ \t]*\r?\n(.*?)^---[ \t]*(?:\r?\n|\Z)",
+                                 re.DOTALL | re.MULTILINE)
+
+
+def split_frontmatter(text: str) -> Tuple[Dict[str, str], str]:
+    """
+    Separate a rule file's frontmatter from its body.
+
+    Args:
+        text: Full rule file content
+
+    Returns:
+        Tuple of (frontmatter key/value pairs as raw strings, body text)
+    """
+    match = FRONTMATTER_PATTERN.match(text)
+    if not match:
+        return {}, text
+
+    fields: Dict[str, str] = {}
+    for line in match.group(1).splitlines():
+        if ':' not in line or line.lstrip().startswith('#'):
+            continue
+        key, value = line.split(':', 1)
+        fields[key.strip()] = value.strip()
+    return fields, text[match.end():]
+
+
+def parse_globs(value: str) -> List[str]:
+    """
+    Parse a ``globs``/``applyTo`` value into a list of patterns.
+
+    Accepts an empty value, a YAML flow list (``["a", "b"]``), a quoted
+    string, or a comma-separated string.
+
+    Args:
+        value: Raw frontmatter value
+
+    Returns:
+        List of glob patterns (empty if none)
+    """
+    value = value.strip()
+    if value.startswith('[') and value.endswith(']'):
+        value = value[1:-1]
+    globs = []
+    for item in value.split(','):
+        item = item.strip().strip('"\'').strip()
+        if item:
+            globs.append(item)
+    return globs
+
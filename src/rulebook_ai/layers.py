@@ -0,0 +1,103 @@
+"""
+Layered rule set merging for rulebook-ai.
+
+``install`` can stack several rule sets, e.g. an organisation-wide base set,
+a team overlay and a repo-local set. The layers are merged into a single
+index keyed by path relative to the rule set root before anything is
+copied: a later layer's file replaces an earlier layer's file at the same
+relative path, and every other file is kept. Each output is therefore
+written exactly once, from the layer that wins it.
+
+Memory and tool starters shipped inside the rule sets are merged the same
+way. The global starters are used only when none of the layers ship their
+own, matching single rule set installs.
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+RULE_SET_MEMORY_STARTERS_DIR = "memory_starters"
+RULE_SET_TOOL_STARTERS_DIR = "tool_starters"
+# Top-level rule set directories that hold starters rather than rules
+RULE_SET_STARTER_DIRS = (RULE_SET_MEMORY_STARTERS_DIR, RULE_SET_TOOL_STARTERS_DIR)
+
+
+class MergedRuleSet(NamedTuple):
+    """The result of merging rule set layers, keyed by POSIX relative path."""
+
+    rules: Dict[str, Path]
+    config_file: Optional[Path]
+    memory: Dict[str, Path]
+    tools: Dict[str, Path]
+    # Relative rule paths supplied by more than one layer
+    overridden: List[str]
+
+
+def index_tree(root: Path, exclude_dirs: tuple = (),
+               include_hidden: bool = False) -> Dict[str, Path]:
+    """
+    Index the files under a directory by relative path.
+
+    Hidden files are skipped and symlinked directories are not followed,
+    like ``RuleManager.get_ordered_source_files``. Entries are ordered the
+    same way, so numbering is identical whichever of the two is rendered.
+
+    Args:
+        root: Directory to index
+        exclude_dirs: Top-level directory names to leave out
+        include_hidden: Keep hidden files (starters are copied verbatim)
+
+    Returns:
+        Mapping of POSIX relative path to file, in render order
+    """
+    index: Dict[str, Path] = {}
+    if not root.is_dir():
+        return index
+    for dirpath, dirs, files in os.walk(root):
+        if Path(dirpath) == root:
+            dirs[:] = [d for d in dirs if d not in exclude_dirs]
+        for filename in files:
+            path = Path(dirpath) / filename
+            if (include_hidden or not filename.startswith('.')) and path.is_file():
+                index[path.relative_to(root).as_posix()] = path
+    return {rel_path: index[rel_path] for rel_path in sorted(index, key=lambda p: p.split('/'))}
+
+
+def merge_layers(layer_dirs: List[Path], config_name: str,
+                 global_memory_dir: Path, global_tools_dir: Path) -> MergedRuleSet:
+    """
+    Merge rule set layers into one index, later layers taking precedence.
+
+    Args:
+        layer_dirs: Rule set directories, base first
+        config_name: Name of the per-rule-set config file; the last layer
+            that has one supplies it
+        global_memory_dir: Memory starters used when no layer ships its own
+        global_tools_dir: Tool starters used when no layer ships its own
+
+    Returns:
+        The merged rule, config, memory and tool indexes
+    """
+    rules: Dict[str, Path] = {}
+    memory: Dict[str, Path] = {}
+    tools: Dict[str, Path] = {}
+    overridden = set()
+    config_file: Optional[Path] = None
+
+    for layer_dir in layer_dirs:
+        layer_rules = index_tree(layer_dir, exclude_dirs=RULE_SET_STARTER_DIRS)
+        overridden.update(set(layer_rules) & set(rules))
+        rules.update(layer_rules)
+        memory.update(index_tree(layer_dir / RULE_SET_MEMORY_STARTERS_DIR, include_hidden=True))
+        tools.update(index_tree(layer_dir / RULE_SET_TOOL_STARTERS_DIR, include_hidden=True))
+        if (layer_dir / config_name).is_file():
+            config_file = layer_dir / config_name
+
+    if not any((layer_dir / RULE_SET_MEMORY_STARTERS_DIR).is_dir() for layer_dir in layer_dirs):
+        memory = index_tree(global_memory_dir, include_hidden=True)
+    if not any((layer_dir / RULE_SET_TOOL_STARTERS_DIR).is_dir() for layer_dir in layer_dirs):
+        tools = index_tree(global_tools_dir, include_hidden=True)
+
+    ordered = {rel_path: rules[rel_path] for rel_path in sorted(rules, key=lambda p: p.split('/'))}
+    return MergedRuleSet(ordered, config_file, memory, tools, sorted(overridden))
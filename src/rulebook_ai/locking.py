@@ -0,0 +1,161 @@
+"""
+Per-project advisory locking with request coalescing for rulebook-ai.
+
+IDE hooks, file watchers, pre-commit and CI may all sync the same project at
+once. ``SyncCoalescer`` serializes them with an ``fcntl`` lock under the
+project's ``.rulebook-ai/`` directory. Callers that arrive while a sync is
+running queue their request and wait; the first of them to get the lock runs
+a single follow-up sync covering every queued request, and the rest return
+its result without rendering anything.
+
+On platforms without ``fcntl`` the locks are no-ops and every caller simply
+runs its own sync.
+"""
+
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+SYNC_LOCK_FILE = "sync.lock"
+SYNC_QUEUE_FILE = "sync-queue.json"
+SYNC_QUEUE_LOCK_FILE = "sync-queue.lock"
+
+# Results kept for waiters that have not collected theirs yet
+MAX_SERVED_RESULTS = 100
+
+
+@contextmanager
+def file_lock(path: Path, blocking: bool = True) -> Iterator[bool]:
+    """
+    Hold an exclusive advisory lock on a file for the duration of the block.
+
+    Args:
+        path: Lock file, created if it does not exist
+        blocking: Wait for the lock. If False, yield False immediately when
+            another holder has it.
+
+    Yields:
+        True if the lock is held, False if it was busy (non-blocking only)
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is None:
+            yield True
+            return
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(fd, flags)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+class SyncCoalescer:
+    """Serializes and coalesces sync requests for one project."""
+
+    def __init__(self, state_dir: Path) -> None:
+        """
+        Initialize the coalescer.
+
+        Args:
+            state_dir: The project's ``.rulebook-ai/`` directory
+        """
+        self.lock_path = state_dir / SYNC_LOCK_FILE
+        self.queue_path = state_dir / SYNC_QUEUE_FILE
+        self.queue_lock_path = state_dir / SYNC_QUEUE_LOCK_FILE
+
+    def _read_queue(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.queue_path, encoding='utf-8') as f:
+                queue: Dict[str, Dict[str, Any]] = json.load(f)
+        except (OSError, ValueError):
+            queue = {}
+        queue.setdefault("pending", {})
+        queue.setdefault("served", {})
+        return queue
+
+    def _write_queue(self, queue: Dict[str, Dict[str, Any]]) -> None:
+        served = queue["served"]
+        if len(served) > MAX_SERVED_RESULTS:
+            queue["served"] = dict(list(served.items())[-MAX_SERVED_RESULTS:])
+        tmp_path = self.queue_path.with_name(f"{self.queue_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(queue, f)
+        os.replace(tmp_path, self.queue_path)
+
+    def run(self, request: Dict[str, Any],
+            runner: Callable[[List[Dict[str, Any]]], int]) -> int:
+        """
+        Run a sync request, coalescing it with any concurrent ones.
+
+        Args:
+            request: JSON-serializable description of the requested sync
+            runner: Performs one sync for a batch of requests and returns its
+                exit code. Called with the lock held.
+
+        Returns:
+            Exit code of the sync that served this request
+        """
+        ticket = os.urandom(16).hex()
+        with file_lock(self.queue_lock_path):
+            queue = self._read_queue()
+            queue["pending"][ticket] = request
+            self._write_queue(queue)
+
+        with file_lock(self.lock_path, blocking=False) as acquired:
+            if acquired:
+                return self._run_batch(ticket, request, runner)
+
+        print("Another sync is running for this project; waiting for it to finish...")
+        with file_lock(self.lock_path):
+            return self._run_batch(ticket, request, runner)
+
+    def _run_batch(self, ticket: str, request: Dict[str, Any],
+                   runner: Callable[[List[Dict[str, Any]]], int]) -> int:
+        """Drain the queue and run one sync for it. Must be called with the lock held."""
+        with file_lock(self.queue_lock_path):
+            queue = self._read_queue()
+            if ticket in queue["served"]:
+                return_code = queue["served"].pop(ticket)
+                self._write_queue(queue)
+                print("Sync request was covered by a concurrent sync.")
+                return int(return_code)
+            batch = queue["pending"]
+            # A ticket can only vanish if its runner died before recording results
+            batch.setdefault(ticket, request)
+            queue["pending"] = {}
+            self._write_queue(queue)
+
+        try:
+            return_code = runner(list(batch.values()))
+        except BaseException:
+            # Hand the other callers' requests to the next lock holder
+            with file_lock(self.queue_lock_path):
+                queue = self._read_queue()
+                for other, other_request in batch.items():
+                    if other != ticket:
+                        queue["pending"].setdefault(other, other_request)
+                self._write_queue(queue)
+            raise
+
+        with file_lock(self.queue_lock_path):
+            queue = self._read_queue()
+            for other in batch:
+                if other != ticket:
+                    queue["served"][other] = return_code
+            self._write_queue(queue)
+        return return_code
@@ -0,0 +1,242 @@
+"""
+Sync manifest for rulebook-ai managed projects.
+
+The manifest records what the last sync rendered: a fingerprint of
+every source rule file (size, mtime and git-style blob id), the output
+files written for each assistant, and which files include which shared
+fragments. It lives under ``.rulebook-ai/`` in the
+target project and lets cheap commands (``sync --changed-only``) decide what
+changed without re-reading or re-rendering the whole rule tree.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+TARGET_STATE_DIR = ".rulebook-ai"
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+class SourceChanges(NamedTuple):
+    """Relative paths of source files that differ from the recorded manifest."""
+
+    added: List[str]
+    removed: List[str]
+    modified: List[str]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.modified)
+
+    @property
+    def structural(self) -> bool:
+        """True when files were added or removed, which changes output numbering."""
+        return bool(self.added or self.removed)
+
+
+def manifest_path(project_root: Path) -> Path:
+    """Return the manifest location for a project root."""
+    return project_root / TARGET_STATE_DIR / MANIFEST_FILE
+
+
+def git_blob_id(path: Path) -> str:
+    """
+    Hash a file the way ``git hash-object`` does.
+
+    Using git's blob format keeps the recorded tree comparable with
+    ``git ls-files -s`` output for the same files.
+
+    Args:
+        path: File to hash
+
+    Returns:
+        Hex SHA-1 blob id
+    """
+    return blob_id(path.read_bytes())
+
+
+def blob_id(data: bytes) -> str:
+    """Hash file content the way ``git hash-object`` does (see git_blob_id)."""
+    digest = hashlib.sha1(f"blob {len(data)}\0".encode("ascii"))  # noqa: S324 - git object id
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def scan_tree(root: Path) -> Dict[str, List[int]]:
+    """
+    Collect a stat-level fingerprint of every rule file under a directory.
+
+    Hidden files are skipped and symlinked directories are not followed,
+    matching ``RuleManager.get_ordered_source_files``.
+
+    Args:
+        root: Directory to scan
+
+    Returns:
+        Mapping of POSIX relative path to ``[size, mtime_ns]``
+    """
+    fingerprint: Dict[str, List[int]] = {}
+    if not root.is_dir():
+        return fingerprint
+
+    stack = [(root, "")]
+    while stack:
+        directory, prefix = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                rel_path = f"{prefix}{entry.name}"
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((Path(entry.path), f"{rel_path}/"))
+                elif not entry.name.startswith('.') and entry.is_file():
+                    st = entry.stat()
+                    fingerprint[rel_path] = [st.st_size, st.st_mtime_ns]
+    return fingerprint
+
+
+def fingerprint_sources(files: Dict[str, Path],
+                        previous: Optional[Dict[str, List[Any]]] = None) -> Dict[str, List[Any]]:
+    """
+    Build manifest source entries for the files that were rendered.
+
+    Args:
+        files: Mapping of POSIX relative path to the file that was rendered
+        previous: Earlier entries whose blob ids may be reused when size and
+            mtime are unchanged, avoiding a re-read of the file
+
+    Returns:
+        Mapping of relative path to ``[size, mtime_ns, blob_id]``
+    """
+    previous = previous or {}
+    entries: Dict[str, List[Any]] = {}
+    for rel_path, path in files.items():
+        st = path.stat()
+        old = previous.get(rel_path)
+        if old is not None and old[:2] == [st.st_size, st.st_mtime_ns]:
+            entries[rel_path] = list(old[:3])
+        else:
+            entries[rel_path] = [st.st_size, st.st_mtime_ns, git_blob_id(path)]
+    return entries
+
+
+def file_fingerprint(path: Path) -> Optional[List[Any]]:
+    """
+    Fingerprint a single file that is not part of the rule tree (e.g. a config file).
+
+    Args:
+        path: File to fingerprint
+
+    Returns:
+        ``[size, mtime_ns, blob_id]``, or None if the file does not exist
+    """
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns, git_blob_id(path)]
+
+
+def file_changed(recorded: Optional[List[Any]], path: Path) -> bool:
+    """
+    Check whether a single file differs from its recorded fingerprint.
+
+    Args:
+        recorded: Entry from ``file_fingerprint``, or None if the file was absent
+        path: Current location of the file
+
+    Returns:
+        True if the file appeared, disappeared or its content changed
+    """
+    try:
+        st = path.stat()
+    except OSError:
+        return recorded is not None
+    if recorded is None:
+        return True
+    if [st.st_size, st.st_mtime_ns] == recorded[:2]:
+        return False
+    return bool(st.st_size != recorded[0] or git_blob_id(path) != recorded[2])
+
+
+def tree_digest(sources: Dict[str, List[Any]]) -> str:
+    """
+    Summarize recorded source entries as a single content digest.
+
+    Args:
+        sources: Source entries as produced by ``fingerprint_sources``
+
+    Returns:
+        Hex digest that changes whenever any path or blob id changes
+    """
+    digest = hashlib.sha1()  # noqa: S324 - content identifier, not security
+    for rel_path in sorted(sources):
+        digest.update(f"{rel_path}\0{sources[rel_path][2]}\n".encode())
+    return digest.hexdigest()
+
+
+def diff_sources(recorded: Dict[str, List[Any]], root: Path) -> SourceChanges:
+    """
+    Compare the files under ``root`` against recorded source entries.
+
+    Files whose size and mtime match the record are assumed unchanged and are
+    never opened. Only files whose stat differs are hashed, so a touched but
+    unmodified file is not reported.
+
+    Args:
+        recorded: Source entries from the manifest
+        root: Directory holding the current source files
+
+    Returns:
+        SourceChanges describing added, removed and modified files
+    """
+    current = scan_tree(root)
+    added = sorted(set(current) - set(recorded))
+    removed = sorted(set(recorded) - set(current))
+    modified = []
+    for rel_path in sorted(set(current) & set(recorded)):
+        size, mtime_ns, blob_id = recorded[rel_path][:3]
+        if current[rel_path] == [size, mtime_ns]:
+            continue
+        if current[rel_path][0] != size or git_blob_id(root / rel_path) != blob_id:
+            modified.append(rel_path)
+    return SourceChanges(added, removed, modified)
+
+
+def load_manifest(project_root: Path) -> Optional[Dict[str, Any]]:
+    """
+    Load the manifest for a project.
+
+    Args:
+        project_root: Target project root
+
+    Returns:
+        The manifest dictionary, or None if it is missing or unreadable
+    """
+    path = manifest_path(project_root)
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+        return None
+    return data
+
+
+def save_manifest(project_root: Path, data: Dict[str, Any]) -> None:
+    """
+    Atomically write the manifest for a project.
+
+    Args:
+        project_root: Target project root
+        data: Manifest contents (``version`` is filled in automatically)
+    """
+    path = manifest_path(project_root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = dict(data, version=MANIFEST_VERSION)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, path)
@@ -0,0 +1,275 @@
+"""
+Lightweight index of the memory bank.
+
+``rulebook-ai memory index`` writes ``memory/INDEX.md``: one line per memory
+file with its size, token estimate and a one-line summary, plus a link with
+an anchor to each of its sections. Assistants read the index first and open
+only the files and sections they need, instead of loading every memory file
+up front.
+
+The index is maintained incrementally. Parsed file entries are cached in
+``.rulebook-ai/memory-index.json`` together with each file's size and mtime,
+so re-indexing only reads files that changed. ``INDEX.md`` is only rewritten
+when its content changes.
+
+Large monolithic files can be sharded with ``--split-over BYTES``: a Markdown
+file over the limit is split at its ``##`` headings into
+``<name>/NN-<section>.md`` files, and the original becomes a short table of
+contents linking to the shards, so existing references keep working.
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .catalog import estimate_tokens
+
+MEMORY_INDEX_FILE = "INDEX.md"
+INDEX_CACHE_FILE = "memory-index.json"
+INDEX_CACHE_VERSION = 1
+SUMMARY_CHARS = 100
+# Headings up to this level are listed in the index
+INDEX_HEADING_LEVEL = 2
+
+_HEADING_PATTERN = re.compile(r"^(#{1,6})[ \t]+(.+?)[ \t#]*$")
+_FENCE_PATTERN = re.compile(r"^[ \t]*(```|~~~)")
+_LIST_MARKER_PATTERN = re.compile(r"^(?:[-*+>]|\d+[.)])\s+")
+
+
+def slugify(title: str) -> str:
+    """Convert a heading into a GitHub-style anchor."""
+    slug = re.sub(r"[^\w\- ]", "", title.strip().lower())
+    return slug.replace(" ", "-")
+
+
+def _summary(lines: List[str]) -> str:
+    """Return the first line of prose in a block of Markdown, shortened."""
+    in_fence = False
+    for line in lines:
+        if _FENCE_PATTERN.match(line):
+            in_fence = not in_fence
+            continue
+        text = _LIST_MARKER_PATTERN.sub("", line.strip())
+        if in_fence or not text or text.startswith(("#", "|", "---", "<!--")):
+            continue
+        if len(text) > SUMMARY_CHARS:
+            text = text[:SUMMARY_CHARS - 3].rstrip() + "..."
+        return text
+    return ""
+
+
+def parse_sections(text: str) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Split Markdown into the sections listed in the index.
+
+    Headings inside fenced code blocks are ignored.
+
+    Args:
+        text: Markdown content
+
+    Returns:
+        Tuple of (summary of the text before the first heading, sections with
+        'title', 'level', 'anchor', 'bytes' and 'summary')
+    """
+    preamble: List[str] = []
+    sections: List[Dict[str, Any]] = []
+    body: List[str] = preamble
+    anchors: Dict[str, int] = {}
+    in_fence = False
+
+    def close() -> None:
+        if sections and body is not preamble:
+            sections[-1]["bytes"] = len("\n".join(body).encode("utf-8"))
+            sections[-1]["summary"] = _summary(body[1:])
+
+    for line in text.splitlines():
+        if _FENCE_PATTERN.match(line):
+            in_fence = not in_fence
+        match = None if in_fence else _HEADING_PATTERN.match(line)
+        if match and len(match.group(1)) <= INDEX_HEADING_LEVEL:
+            close()
+            title = match.group(2)
+            anchor = slugify(title)
+            seen = anchors.get(anchor, 0)
+            anchors[anchor] = seen + 1
+            if seen:
+                anchor = f"{anchor}-{seen}"
+            sections.append({"title": title, "level": len(match.group(1)), "anchor": anchor})
+            body = [line]
+        else:
+            body.append(line)
+    close()
+    return _summary(preamble), sections
+
+
+def describe_memory_file(path: Path) -> Dict[str, Any]:
+    """
+    Build the index entry of one memory file.
+
+    Args:
+        path: Memory file
+
+    Returns:
+        Entry with 'size', 'mtime_ns', 'tokens', 'summary' and 'sections'
+    """
+    st = path.stat()
+    text = path.read_text(encoding="utf-8", errors="replace")
+    if path.suffix.lower() == ".md":
+        summary, sections = parse_sections(text)
+        summary = summary or next(
+            (section["summary"] for section in sections if section["summary"]), ""
+        )
+    else:
+        summary, sections = _summary(text.splitlines()), []
+    return {
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "tokens": estimate_tokens(st.st_size),
+        "summary": summary,
+        "sections": sections,
+    }
+
+
+def load_index_cache(state_dir: Path) -> Dict[str, Dict[str, Any]]:
+    """Load cached index entries keyed by memory-relative path (empty if unusable)."""
+    try:
+        with open(state_dir / INDEX_CACHE_FILE, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != INDEX_CACHE_VERSION:
+        return {}
+    files: Dict[str, Dict[str, Any]] = data.get("files", {})
+    return files
+
+
+def save_index_cache(state_dir: Path, entries: Dict[str, Dict[str, Any]]) -> None:
+    """Atomically write the index cache."""
+    state_dir.mkdir(parents=True, exist_ok=True)
+    path = state_dir / INDEX_CACHE_FILE
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": INDEX_CACHE_VERSION, "files": entries}, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def update_entries(
+    files: Dict[str, Path], cached: Dict[str, Dict[str, Any]],
+) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    """
+    Refresh index entries, re-reading only files whose size or mtime changed.
+
+    Args:
+        files: Memory files keyed by memory-relative path
+        cached: Entries from the previous run
+
+    Returns:
+        Tuple of (entries for every file, paths that were re-read)
+    """
+    entries: Dict[str, Dict[str, Any]] = {}
+    reread = []
+    for rel_path, path in sorted(files.items()):
+        st = path.stat()
+        entry = cached.get(rel_path)
+        if (entry is None or entry.get("size") != st.st_size
+                or entry.get("mtime_ns") != st.st_mtime_ns):
+            entry = describe_memory_file(path)
+            reread.append(rel_path)
+        entries[rel_path] = entry
+    return entries, reread
+
+
+def _format_size(size: int) -> str:
+    """Format a byte count for the index."""
+    return f"{size} B" if size < 1024 else f"{size / 1024:.1f} KB"
+
+
+def _directory(rel_path: str) -> str:
+    """Return the directory heading a memory file is listed under."""
+    return rel_path.rsplit("/", 1)[0] + "/" if "/" in rel_path else "./"
+
+
+def render_index(entries: Dict[str, Dict[str, Any]]) -> str:
+    """
+    Render INDEX.md from index entries.
+
+    Args:
+        entries: Entries keyed by memory-relative path
+
+    Returns:
+        Markdown content of the index
+    """
+    total = sum(entry["size"] for entry in entries.values())
+    lines = [
+        "# Memory Bank Index",
+        "",
+        "Generated by `rulebook-ai memory index`; do not edit by hand.",
+        f"{len(entries)} files, {_format_size(total)} (~{estimate_tokens(total)} tokens). "
+        "Read this index first, then open only the files and sections you need.",
+    ]
+    current_group = None
+    for group, rel_path in sorted((_directory(rel_path), rel_path) for rel_path in entries):
+        entry = entries[rel_path]
+        if group != current_group:
+            lines += ["", f"## {group}", ""]
+            current_group = group
+        line = (f"- [{rel_path}]({rel_path}) — {_format_size(entry['size'])}, "
+                f"~{entry['tokens']} tokens")
+        lines.append(f"{line}: {entry['summary']}" if entry["summary"] else line)
+        for section in entry["sections"]:
+            indent = "  " * section["level"]
+            line = (f"{indent}- [{section['title']}]({rel_path}#{section['anchor']}) "
+                    f"({_format_size(section['bytes'])})")
+            lines.append(f"{line}: {section['summary']}" if section["summary"] else line)
+    return "\n".join(lines) + "\n"
+
+
+def split_memory_file(path: Path) -> Optional[List[Path]]:
+    """
+    Shard a Markdown memory file at its ``##`` headings.
+
+    The shards are written to ``<stem>/NN-<anchor>.md`` next to the file, and
+    the file is replaced by its preamble followed by links to the shards.
+
+    Args:
+        path: Markdown file to split
+
+    Returns:
+        Paths of the shards, or None if the file has fewer than two ``##``
+        sections or the shard directory already exists
+    """
+    shard_dir = path.with_suffix("")
+    text = path.read_text(encoding="utf-8")
+    lines = text.splitlines(keepends=True)
+    starts = []
+    titles = []
+    in_fence = False
+    for number, line in enumerate(lines):
+        if _FENCE_PATTERN.match(line):
+            in_fence = not in_fence
+        match = None if in_fence else _HEADING_PATTERN.match(line.rstrip("\r\n"))
+        if match and len(match.group(1)) == 2:
+            starts.append(number)
+            titles.append(match.group(2))
+    if len(starts) < 2 or shard_dir.exists():
+        return None
+
+    shard_dir.mkdir()
+    shards = []
+    links = []
+    for position, start in enumerate(starts):
+        end = starts[position + 1] if position + 1 < len(starts) else len(lines)
+        title = titles[position]
+        shard = shard_dir / f"{position + 1:02d}-{slugify(title) or 'section'}.md"
+        shard.write_text("".join(lines[start:end]).rstrip("\n") + "\n", encoding="utf-8")
+        shards.append(shard)
+        links.append(f"- [{title}]({shard_dir.name}/{shard.name})\n")
+
+    preamble = "".join(lines[:starts[0]]).rstrip("\n")
+    stub = f"{preamble}\n\n" if preamble else ""
+    stub += f"This document is split into sections in `{shard_dir.name}/`:\n\n" + "".join(links)
+    path.write_text(stub, encoding="utf-8")
+    return shards
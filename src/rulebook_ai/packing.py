@@ -0,0 +1,182 @@
+"""
+Deterministic archives of rendered rulebook-ai outputs.
+
+``pack`` writes project_rules/, every assistant output recorded in the sync
+manifest and the manifest itself into one ``.tar.gz``. Entries are sorted and
+carry no timestamps, owners or host-specific modes, so the same inputs always
+produce byte-identical archives. The archive starts with an index
+(``.rulebook-ai/pack.json``) holding the input key (the manifest's tree
+digest) and the SHA-256 of every file.
+
+``unpack`` reads the archive in one sequential pass, verifying each file's
+hash while streaming it into a staging directory, and only moves files into
+place once the whole archive has checked out. A restore replaces
+project_rules/ and the assistant outputs rather than overlaying them, so files
+that are not in the archive do not survive it.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import tarfile
+from pathlib import Path
+from typing import IO, Any, Dict, List
+
+PACK_VERSION = 1
+PACK_INDEX_NAME = ".rulebook-ai/pack.json"
+CHUNK_SIZE = 1 << 16
+
+
+class PackError(Exception):
+    """Raised when an archive is malformed or fails verification."""
+
+
+def file_sha256(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _tar_info(name: str, size: int, executable: bool = False) -> tarfile.TarInfo:
+    """Build a tar header with no timestamps, owners or host-specific permissions."""
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mtime = 0
+    info.mode = 0o755 if executable else 0o644
+    info.uid = info.gid = 0
+    info.uname = info.gname = ""
+    return info
+
+
+def write_pack(root: Path, rel_paths: List[str], key: str, archive_path: Path) -> Dict[str, Any]:
+    """
+    Write a deterministic archive of files under a project root.
+
+    Args:
+        root: Project root the paths are relative to
+        rel_paths: POSIX paths of the files to include
+        key: Input key recorded in the index (and used by CI as the cache key)
+        archive_path: Archive to create; written atomically
+
+    Returns:
+        The archive index
+    """
+    rel_paths = sorted(set(rel_paths))
+    index = {
+        "version": PACK_VERSION,
+        "key": key,
+        "files": {rel_path: file_sha256(root / rel_path) for rel_path in rel_paths},
+    }
+    index_data = (json.dumps(index, indent=2, sort_keys=True) + "\n").encode("utf-8")
+
+    archive_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = archive_path.with_name(f"{archive_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as raw:
+        with gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0) as compressed:
+            with tarfile.open(fileobj=compressed, mode="w|", format=tarfile.PAX_FORMAT) as archive:
+                archive.addfile(_tar_info(PACK_INDEX_NAME, len(index_data)), io.BytesIO(index_data))
+                for rel_path in rel_paths:
+                    path = root / rel_path
+                    st = path.stat()
+                    info = _tar_info(rel_path, st.st_size, bool(st.st_mode & 0o111))
+                    with open(path, 'rb') as f:
+                        archive.addfile(info, f)
+    os.replace(tmp_path, archive_path)
+    return index
+
+
+def _check_member_name(name: str) -> None:
+    """Reject archive paths that would escape the extraction directory."""
+    path = Path(name)
+    if path.is_absolute() or ".." in path.parts or not path.parts:
+        raise PackError(f"unsafe path in archive: {name}")
+
+
+def _member_file(archive: tarfile.TarFile, member: tarfile.TarInfo) -> IO[bytes]:
+    """Open a regular file member of an archive for reading."""
+    source = archive.extractfile(member) if member.isfile() else None
+    if source is None:
+        raise PackError(f"not a regular file in archive: {member.name}")
+    return source
+
+
+def _copy_verified(source: IO[bytes], destination: Path) -> str:
+    """Copy a stream to a file and return the SHA-256 hex digest of what was copied."""
+    digest = hashlib.sha256()
+    with open(destination, 'wb') as f:
+        for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            f.write(chunk)
+    return digest.hexdigest()
+
+
+def read_pack(archive_path: Path, staging_dir: Path) -> Dict[str, Any]:
+    """
+    Stream an archive into a staging directory, verifying every file.
+
+    Args:
+        archive_path: Archive written by write_pack()
+        staging_dir: Empty directory to extract into
+
+    Returns:
+        The archive index
+
+    Raises:
+        PackError: If the archive is malformed, has unexpected entries or a
+            file does not match its recorded hash
+    """
+    try:
+        with tarfile.open(archive_path, mode="r|gz") as archive:
+            members = iter(archive)
+            first = next(members, None)
+            if first is None or first.name != PACK_INDEX_NAME or not first.isfile():
+                raise PackError("archive does not start with a rulebook-ai pack index")
+            index = json.loads(_member_file(archive, first).read().decode("utf-8"))
+            if not isinstance(index, dict) or index.get("version") != PACK_VERSION:
+                raise PackError("unsupported pack version")
+            expected: Dict[str, str] = index.get("files", {})
+            seen = set()
+
+            for member in members:
+                _check_member_name(member.name)
+                if not member.isfile() or member.name not in expected or member.name in seen:
+                    raise PackError(f"unexpected archive entry: {member.name}")
+                destination = staging_dir / member.name
+                destination.parent.mkdir(parents=True, exist_ok=True)
+                digest = _copy_verified(_member_file(archive, member), destination)
+                if digest != expected[member.name]:
+                    raise PackError(f"hash mismatch for {member.name}")
+                if member.mode & 0o111:
+                    destination.chmod(0o755)
+                seen.add(member.name)
+    except (tarfile.TarError, OSError, EOFError, ValueError) as e:
+        raise PackError(str(e)) from e
+
+    missing = sorted(set(expected) - seen)
+    if missing:
+        raise PackError(f"archive is missing {len(missing)} files, e.g. {missing[0]}")
+    return index
+
+
+def install_staged(staging_dir: Path, root: Path, rel_paths: List[str]) -> None:
+    """
+    Move verified files from the staging directory into the project.
+
+    Args:
+        staging_dir: Directory filled by read_pack()
+        root: Project root
+        rel_paths: Files to move, relative to both directories
+    """
+    for rel_path in rel_paths:
+        destination = root / rel_path
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.replace(staging_dir / rel_path, destination)
+        except OSError:
+            shutil.move(str(staging_dir / rel_path), str(destination))
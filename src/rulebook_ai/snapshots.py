@@ -0,0 +1,207 @@
+"""
+Point-in-time snapshots of the memory bank.
+
+Snapshots are stored under ``.rulebook-ai/`` in a content-addressed object
+store: each distinct file content is written once to ``objects/`` under its
+git-style blob id, and a snapshot is a small JSON record in ``snapshots/``
+mapping every memory file to ``[size, mtime_ns, blob_id]``. Files unchanged
+since the previous snapshot cost nothing but their line in the record, and
+their stat info lets the next snapshot skip re-hashing them.
+
+Records are ordered by a nanosecond sequence number rather than their
+creation time, and carry the digest of their content separately from their
+id, so returning to an earlier state adds a new record.
+
+Diffs and restores compare blob ids first and only read the contents of
+files that actually differ.
+"""
+
+import difflib
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .manifest import blob_id, tree_digest
+
+OBJECTS_DIR = "objects"
+SNAPSHOTS_DIR = "snapshots"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_ID_LENGTH = 12
+LATEST_SNAPSHOT = "latest"
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot or one of its objects cannot be found."""
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    """Write a file via a temporary sibling and rename."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def object_path(state_dir: Path, blob: str) -> Path:
+    """Return where an object is stored, fanned out by its first two hex digits."""
+    return state_dir / OBJECTS_DIR / blob[:2] / blob[2:]
+
+
+def store_object(state_dir: Path, data: bytes) -> str:
+    """
+    Add file content to the object store.
+
+    Args:
+        state_dir: The project's .rulebook-ai/ directory
+        data: File content
+
+    Returns:
+        Blob id of the content; content already in the store is not rewritten
+    """
+    blob = blob_id(data)
+    path = object_path(state_dir, blob)
+    if not path.exists():
+        _atomic_write(path, data)
+    return blob
+
+
+def read_object(state_dir: Path, blob: str) -> bytes:
+    """Read content from the object store, raising SnapshotError if it is missing."""
+    try:
+        return object_path(state_dir, blob).read_bytes()
+    except OSError as e:
+        raise SnapshotError(f"Snapshot object {blob} is missing from the store") from e
+
+
+def list_snapshots(state_dir: Path) -> List[Dict[str, Any]]:
+    """
+    Load all snapshot records, oldest first.
+
+    Args:
+        state_dir: The project's .rulebook-ai/ directory
+
+    Returns:
+        Snapshot records with 'id', 'seq', 'digest', 'created', 'message' and 'files'
+    """
+    records = []
+    for path in (state_dir / SNAPSHOTS_DIR).glob("*.json"):
+        try:
+            with open(path, encoding='utf-8') as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if isinstance(record, dict) and record.get("version") == SNAPSHOT_VERSION:
+            records.append(record)
+    return sorted(records, key=lambda record: record["seq"])
+
+
+def find_snapshot(state_dir: Path, ref: str) -> Dict[str, Any]:
+    """
+    Look up a snapshot by id, unique id prefix or 'latest'.
+
+    Args:
+        state_dir: The project's .rulebook-ai/ directory
+        ref: Snapshot reference
+
+    Returns:
+        The snapshot record
+
+    Raises:
+        SnapshotError: If no snapshot, or more than one, matches
+    """
+    records = list_snapshots(state_dir)
+    if ref == LATEST_SNAPSHOT:
+        if not records:
+            raise SnapshotError("No memory snapshots yet")
+        return records[-1]
+    matches = [record for record in records if record["id"].startswith(ref)]
+    if len(matches) != 1:
+        raise SnapshotError(f"{'Ambiguous' if matches else 'Unknown'} snapshot: {ref}")
+    return matches[0]
+
+
+def take_snapshot(state_dir: Path, files: Dict[str, List[Any]], paths: Dict[str, Path],
+                  message: str = "") -> Dict[str, Any]:
+    """
+    Record a snapshot, storing the content of files not yet in the object store.
+
+    Args:
+        state_dir: The project's .rulebook-ai/ directory
+        files: Fingerprints (``[size, mtime_ns, blob_id]``) of the files to record
+        paths: Files keyed by the same relative paths
+
+    Returns:
+        The new snapshot record, or the latest one if the content is unchanged
+        since that snapshot
+    """
+    for rel_path, entry in files.items():
+        if not object_path(state_dir, entry[2]).exists():
+            # Hash what is actually stored, in case the file changed since it was fingerprinted
+            entry[2] = store_object(state_dir, paths[rel_path].read_bytes())
+
+    digest = tree_digest(files)
+    records = list_snapshots(state_dir)
+    if records and records[-1]["digest"] == digest:
+        return records[-1]
+    # Keep the order strict even if the clock stalls or steps back
+    seq = max(time.time_ns(), records[-1]["seq"] + 1 if records else 0)
+    snapshot_id = hashlib.sha256(f"{seq}:{digest}".encode()).hexdigest()[:SNAPSHOT_ID_LENGTH]
+    record = {
+        "version": SNAPSHOT_VERSION,
+        "id": snapshot_id,
+        "seq": seq,
+        "digest": digest,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "message": message,
+        "files": files,
+    }
+    data = json.dumps(record, indent=2, sort_keys=True) + "\n"
+    _atomic_write(state_dir / SNAPSHOTS_DIR / f"{snapshot_id}.json", data.encode("utf-8"))
+    return record
+
+
+def changed_paths(old: Dict[str, List[Any]], new: Dict[str, List[Any]]) -> Dict[str, List[str]]:
+    """
+    Compare two file maps by blob id.
+
+    Args:
+        old: Fingerprints of the earlier state
+        new: Fingerprints of the later state
+
+    Returns:
+        Sorted 'added', 'removed' and 'modified' relative paths
+    """
+    return {
+        "added": sorted(set(new) - set(old)),
+        "removed": sorted(set(old) - set(new)),
+        "modified": sorted(rel_path for rel_path in set(old) & set(new)
+                           if old[rel_path][2] != new[rel_path][2]),
+    }
+
+
+def unified_diff(old_data: Optional[bytes], new_data: Optional[bytes],
+                 old_name: str, new_name: str) -> List[str]:
+    """
+    Render a unified diff of two file versions (None for a missing side).
+
+    Args:
+        old_data: Earlier content
+        new_data: Later content
+        old_name: Label of the earlier version
+        new_name: Label of the later version
+
+    Returns:
+        Diff lines, each ending with a newline
+    """
+    def lines(data: Optional[bytes]) -> List[str]:
+        return data.decode("utf-8", errors="replace").splitlines(keepends=True) if data else []
+
+    diff = []
+    for line in difflib.unified_diff(lines(old_data), lines(new_data), old_name, new_name):
+        diff.append(line if line.endswith("\n") else line + "\n")
+    return diff
@@ -0,0 +1,281 @@
+"""
+External rule set sources with a content-addressed cache.
+
+``install --rule-set-source`` accepts a directory of rule sets, an archive
+(``.tar``, ``.tar.gz``, ``.tgz``, ``.zip``), a ``file://`` URL to either, or a
+local git repository as ``git+file:///path/to/repo[@ref]``. Directories are
+used in place. Archives and git commits are unpacked once into the cache,
+under a directory named after the archive's SHA-256 digest or the commit id,
+and reused from there: installing the same pinned version again never
+re-extracts or re-clones anything.
+
+The cache lives in ``$RULEBOOK_AI_CACHE_DIR``, else
+``$XDG_CACHE_HOME/rulebook-ai``, else ``~/.cache/rulebook-ai``.
+"""
+
+import hashlib
+import os
+import shutil
+import subprocess
+import tarfile
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+CACHE_DIR_ENV = "RULEBOOK_AI_CACHE_DIR"
+SOURCES_CACHE_SUBDIR = "sources"
+ARCHIVE_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz", ".zip")
+GIT_URL_PREFIX = "git+file://"
+# Use the stdlib's safe extraction filter where available (Python 3.9.17+/3.11.4+)
+TAR_EXTRACT_OPTIONS: Dict[str, Any] = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+
+
+class SourceError(Exception):
+    """Raised when a rule set source cannot be resolved or unpacked."""
+
+
+def default_cache_dir() -> Path:
+    """Return the rulebook-ai cache directory."""
+    if os.environ.get(CACHE_DIR_ENV):
+        return Path(os.environ[CACHE_DIR_ENV])
+    xdg_cache = os.environ.get("XDG_CACHE_HOME")
+    base = Path(xdg_cache) if xdg_cache else Path.home() / ".cache"
+    return base / "rulebook-ai"
+
+
+def _file_url_path(url: str) -> Path:
+    """Convert a file:// URL into a local path."""
+    parsed = urlparse(url)
+    if parsed.netloc not in ("", "localhost"):
+        raise SourceError(f"Only local file:// URLs are supported: {url}")
+    return Path(unquote(parsed.path))
+
+
+def parse_git_spec(spec: str) -> Tuple[Path, str]:
+    """
+    Split a ``git+file://`` source into repository path and ref.
+
+    Args:
+        spec: Source such as ``git+file:///srv/rules.git@v1.2``
+
+    Returns:
+        Tuple of (repository path, ref), the ref defaulting to ``HEAD``
+    """
+    url = spec[len("git+"):]
+    path_part, sep, ref = url.rpartition("@")
+    if not sep or "/" in ref:
+        path_part, ref = url, "HEAD"
+    return _file_url_path(path_part), ref
+
+
+def _safe_members(archive: tarfile.TarFile) -> Iterator[tarfile.TarInfo]:
+    """Yield the members of a streamed tar archive, rejecting paths that escape it."""
+    for member in archive:
+        name = Path(member.name)
+        if name.is_absolute() or ".." in name.parts:
+            raise SourceError(f"Unsafe path in archive: {member.name}")
+        if member.issym() or member.islnk():
+            target = Path(member.linkname)
+            if target.is_absolute() or ".." in target.parts:
+                raise SourceError(f"Unsafe link in archive: {member.name}")
+        if member.isdev():
+            continue
+        yield member
+
+
+def _extract_tar_stream(fileobj: IO[bytes], dest: Path) -> None:
+    """Extract a tar stream member by member into dest."""
+    with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+        for member in _safe_members(archive):
+            archive.extract(member, dest, set_attrs=False, **TAR_EXTRACT_OPTIONS)
+
+
+def _extract_zip(path: Path, dest: Path) -> None:
+    """Extract a zip archive into dest, rejecting paths that escape it."""
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            name = Path(info.filename)
+            if name.is_absolute() or ".." in name.parts:
+                raise SourceError(f"Unsafe path in archive: {info.filename}")
+            archive.extract(info, dest)
+
+
+def _populate(cache_entry: Path, fill: Callable[[Path], None]) -> Path:
+    """
+    Fill a cache entry exactly once, atomically.
+
+    The content is unpacked into a temporary sibling directory and renamed
+    into place, so a concurrent or interrupted run never leaves a partial entry.
+
+    Args:
+        cache_entry: Final cache directory
+        fill: Called with the temporary directory to unpack into
+
+    Returns:
+        The cache entry path
+    """
+    if cache_entry.is_dir():
+        print(f"Using cached rule set source {cache_entry.name}")
+        return cache_entry
+    cache_entry.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=f".{cache_entry.name}.", dir=cache_entry.parent))
+    try:
+        fill(tmp_dir)
+        try:
+            os.rename(tmp_dir, cache_entry)
+        except OSError:
+            if not cache_entry.is_dir():
+                raise
+            # Another process populated the entry first
+    finally:
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    print(f"Unpacked rule set source into cache: {cache_entry}")
+    return cache_entry
+
+
+def _archive_digest(path: Path) -> str:
+    """Return the SHA-256 hex digest of an archive file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _from_archive(path: Path, cache_dir: Path) -> Path:
+    """Unpack an archive into the cache, keyed by its digest."""
+    if not path.is_file():
+        raise SourceError(f"Rule set archive not found: {path}")
+    entry = cache_dir / SOURCES_CACHE_SUBDIR / f"archive-{_archive_digest(path)}"
+
+    def fill(tmp_dir: Path) -> None:
+        try:
+            if path.name.endswith(".zip"):
+                _extract_zip(path, tmp_dir)
+            else:
+                with open(path, 'rb') as f:
+                    _extract_tar_stream(f, tmp_dir)
+        except (tarfile.TarError, zipfile.BadZipFile) as e:
+            raise SourceError(f"Unable to extract {path}: {e}") from e
+
+    return _populate(entry, fill)
+
+
+def _git(*args: str) -> str:
+    """Run a git command and return its stripped output."""
+    try:
+        # An argument list without a shell; git is taken from PATH
+        result = subprocess.run(  # noqa: S603
+            ["git", *args],  # noqa: S607
+            capture_output=True, text=True, check=False,
+        )
+    except FileNotFoundError as e:
+        raise SourceError("git is required for git+file:// rule set sources") from e
+    if result.returncode != 0:
+        raise SourceError(result.stderr.strip() or f"git {' '.join(args)} failed")
+    return result.stdout.strip()
+
+
+def _from_git(repo: Path, ref: str, cache_dir: Path) -> Path:
+    """Export a git commit into the cache, keyed by its commit id."""
+    if not repo.exists():
+        raise SourceError(f"Git repository not found: {repo}")
+    commit = _git("-C", str(repo), "rev-parse", "--verify", f"{ref}^{{commit}}")
+    entry = cache_dir / SOURCES_CACHE_SUBDIR / f"git-{commit}"
+
+    def fill(tmp_dir: Path) -> None:
+        # Stream the commit's tree as a tar instead of cloning the repository.
+        # stderr goes to a file so a chatty git cannot block on a full pipe.
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(  # noqa: S603
+                ["git", "-C", str(repo), "archive", "--format=tar", commit],  # noqa: S607
+                stdout=subprocess.PIPE, stderr=stderr,
+            )
+            if process.stdout is None:
+                raise SourceError(f"git archive {commit} produced no output stream")
+            try:
+                _extract_tar_stream(process.stdout, tmp_dir)
+            except BaseException:
+                process.kill()
+                process.wait()
+                raise
+            finally:
+                process.stdout.close()
+            if process.wait() != 0:
+                stderr.seek(0)
+                message = stderr.read().decode(errors="replace").strip()
+                raise SourceError(message or f"git archive {commit} failed")
+
+    return _populate(entry, fill)
+
+
+def resolve_rule_set_source(spec: str, cache_dir: Optional[Path] = None) -> Path:
+    """
+    Resolve a rule set source to a local directory of rule sets.
+
+    Args:
+        spec: Directory, archive, ``file://`` URL or ``git+file://`` URL
+        cache_dir: Cache directory (default: default_cache_dir())
+
+    Returns:
+        Directory containing the source's rule sets
+
+    Raises:
+        SourceError: If the source cannot be found or unpacked
+    """
+    cache_dir = cache_dir or default_cache_dir()
+    if spec.startswith(GIT_URL_PREFIX):
+        repo, ref = parse_git_spec(spec)
+        return _from_git(repo, ref, cache_dir)
+    path = _file_url_path(spec) if spec.startswith("file://") else Path(spec).expanduser()
+    if path.is_dir():
+        return path.absolute()
+    if path.name.endswith(ARCHIVE_SUFFIXES):
+        return _from_archive(path, cache_dir)
+    raise SourceError(f"Rule set source not found or not a supported archive: {spec}")
+
+
+def find_rule_set(source_dir: Path, name: str) -> Optional[Path]:
+    """
+    Locate a rule set inside a resolved source.
+
+    Archives often wrap their content in a single top-level directory, which
+    is looked through when the rule set is not found at the root.
+
+    Args:
+        source_dir: Directory returned by resolve_rule_set_source()
+        name: Rule set name
+
+    Returns:
+        The rule set directory, or None if the source does not provide it
+    """
+    candidate = source_dir / name
+    if candidate.is_dir():
+        return candidate
+    entries = [entry for entry in source_dir.iterdir() if not entry.name.startswith('.')]
+    if len(entries) == 1 and entries[0].is_dir() and (entries[0] / name).is_dir():
+        return entries[0] / name
+    return None
+
+
+def locate_rule_sets(spec: str, names: List[str], fallback_dir: Path) -> List[Path]:
+    """
+    Resolve a rule set source and locate each named rule set in it.
+
+    Args:
+        spec: Rule set source accepted by resolve_rule_set_source()
+        names: Rule set names, base first
+        fallback_dir: Directory of the bundled rule sets
+
+    Returns:
+        One directory per name; names the source does not provide fall back
+        to ``fallback_dir / name``, which may not exist
+
+    Raises:
+        SourceError: If the source cannot be resolved or unpacked
+    """
+    source_dir = resolve_rule_set_source(spec)
+    return [find_rule_set(source_dir, name) or fallback_dir / name for name in names]
@@ -0,0 +1,181 @@
+"""
+Per-assistant conditional sections in rule files.
+
+Guidance that only applies to some assistants can be wrapped in HTML-comment
+directives, which stay invisible in rendered Markdown previews:
+
+    <!-- if assistant == "cursor" -->
+    Reference files with @file.
+    <!-- elif assistant in ["cline", "roo"] -->
+    Read memory/ before starting.
+    <!-- else -->
+    Open the relevant files first.
+    <!-- endif -->
+
+Supported conditions are ``assistant == "x"``, ``assistant != "x"``,
+``assistant in [...]`` and ``assistant not in [...]``. Assistant names are
+``cursor``, ``windsurf``, ``cline``, ``roo`` and ``copilot``. Blocks nest.
+
+A source file is parsed once into a ``RuleTemplate`` and then rendered for
+each assistant without parsing it again. A directive alone on its line is
+removed with that line, so disabled blocks leave no blank lines behind.
+"""
+
+import re
+from typing import FrozenSet, List, Optional, Tuple, Union
+
+# Only comments about the assistant are directives; other comments are left alone
+DIRECTIVE_PATTERN = re.compile(
+    r"<!--\s*(?:(?P<keyword>if|elif)\s+(?P<condition>assistant\b.*?)|(?P<bare>else|endif))\s*-->",
+    re.DOTALL,
+)
+CONDITION_PATTERN = re.compile(r"^assistant\s*(?P<op>==|!=|not\s+in|in)\s*(?P<value>.+)$",
+                               re.DOTALL)
+QUOTED_PATTERN = re.compile(r"\"([^\"]*)\"|'([^']*)'")
+# Cheap pre-check so files without directives are never parsed
+DIRECTIVE_MARKER = b"<!--"
+
+# (negated, names): matches when the assistant is (or, if negated, is not) one of names
+Condition = Tuple[bool, FrozenSet[str]]
+Node = Union[str, "ConditionalBlock"]
+
+
+class TemplateError(ValueError):
+    """Raised when conditional directives are malformed or unbalanced."""
+
+
+class ConditionalBlock:
+    """An if/elif/else chain; the first branch whose condition matches is rendered."""
+
+    def __init__(self) -> None:
+        self.branches: List[Tuple[Optional[Condition], List[Node]]] = []
+
+    def select(self, assistant: Optional[str]) -> List[Node]:
+        """Return the nodes of the branch taken for an assistant."""
+        for condition, nodes in self.branches:
+            if condition is None or (assistant in condition[1]) != condition[0]:
+                return nodes
+        return []
+
+
+class RuleTemplate:
+    """A rule file compiled once and rendered per assistant."""
+
+    def __init__(self, nodes: List[Node]) -> None:
+        self.nodes = nodes
+
+    @property
+    def conditional(self) -> bool:
+        """True if the template contains any conditional block."""
+        return any(isinstance(node, ConditionalBlock) for node in self.nodes)
+
+    def render(self, assistant: Optional[str]) -> str:
+        """
+        Render the template for one assistant.
+
+        Args:
+            assistant: Assistant name, or None for assistant-neutral output
+                (every ``==``/``in`` condition is false)
+
+        Returns:
+            The rendered text
+        """
+        parts: List[str] = []
+        stack = [iter(self.nodes)]
+        while stack:
+            node = next(stack[-1], None)
+            if node is None:
+                stack.pop()
+            elif isinstance(node, str):
+                parts.append(node)
+            else:
+                stack.append(iter(node.select(assistant)))
+        return "".join(parts)
+
+
+def parse_condition(text: str) -> Condition:
+    """
+    Parse the condition of an ``if``/``elif`` directive.
+
+    Args:
+        text: Condition text, e.g. ``assistant in ["cline", "roo"]``
+
+    Returns:
+        The compiled condition
+
+    Raises:
+        TemplateError: If the condition is not supported
+    """
+    match = CONDITION_PATTERN.match(text.strip())
+    names = [a or b for a, b in QUOTED_PATTERN.findall(match.group('value'))] if match else []
+    if not match or not names:
+        raise TemplateError(f"unsupported condition '{text.strip()}'")
+    op = " ".join(match.group('op').split())
+    if op in ("==", "!=") and len(names) != 1:
+        raise TemplateError(f"'{op}' takes a single assistant name: '{text.strip()}'")
+    return op in ("!=", "not in"), frozenset(names)
+
+
+def _directive_span(text: str, start: int, end: int) -> Tuple[int, int]:
+    """Widen a directive's span to its whole line when nothing else is on that line."""
+    line_start = text.rfind("\n", 0, start) + 1
+    line_end = text.find("\n", end)
+    line_end = len(text) if line_end == -1 else line_end + 1
+    if text[line_start:start].strip() or text[end:line_end].strip():
+        return start, end
+    return line_start, line_end
+
+
+def compile_template(text: str) -> RuleTemplate:
+    """
+    Parse a rule file's conditional directives.
+
+    Args:
+        text: Rule content (with includes already resolved)
+
+    Returns:
+        The compiled template
+
+    Raises:
+        TemplateError: If directives are malformed or unbalanced
+    """
+    root: List[Node] = []
+    # Each open block: (block, nodes of its current branch, whether 'else' was seen)
+    open_blocks: List[Tuple[ConditionalBlock, List[Node], bool]] = []
+    current = root
+    position = 0
+
+    for match in DIRECTIVE_PATTERN.finditer(text):
+        start, end = _directive_span(text, match.start(), match.end())
+        if start < position:
+            start = position
+        if text[position:start]:
+            current.append(text[position:start])
+        position = end
+
+        keyword = match.group('keyword') or match.group('bare')
+        condition = match.group('condition') or ""
+        if keyword == 'if':
+            block = ConditionalBlock()
+            current.append(block)
+            current = []
+            block.branches.append((parse_condition(condition), current))
+            open_blocks.append((block, current, False))
+            continue
+        if not open_blocks:
+            raise TemplateError(f"'{keyword}' without a matching 'if'")
+        block, _, seen_else = open_blocks.pop()
+        if keyword == 'endif':
+            current = open_blocks[-1][1] if open_blocks else root
+            continue
+        if seen_else:
+            raise TemplateError(f"'{keyword}' after 'else'")
+        current = []
+        block.branches.append((parse_condition(condition) if keyword == 'elif' else None, current))
+        open_blocks.append((block, current, keyword == 'else'))
+
+    if open_blocks:
+        raise TemplateError("'if' without a matching 'endif'")
+    if text[position:]:
+        current.append(text[position:])
+    return RuleTemplate(root)
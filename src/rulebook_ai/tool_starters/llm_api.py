@@ -1,125 +1,1372 @@
 #!/usr/bin/env /workspace/tmp_windsurf/venv/bin/python3
 
-import google.generativeai as genai
-from openai import OpenAI, AzureOpenAI
-from anthropic import Anthropic
 import argparse
-import os
-from dotenv import load_dotenv
-from pathlib import Path
-import sys
+import asyncio
+import atexit
 import base64
-from typing import Optional, Union, List
+import collections
+import functools
+import hashlib
+import json
 import mimetypes
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+_env_loaded = False
 
-def load_environment():
-    """Load environment variables from .env files in order of precedence"""
+def load_environment(verbose: Optional[bool] = None) -> None:
+    """
+    Load environment variables from .env files in order of precedence.
+    
+    Args:
+        verbose (bool, optional): Report the files and key names loaded on stderr
+            (default: $LLM_API_VERBOSE)
+    """
     # Order of precedence:
     # 1. System environment variables (already loaded)
     # 2. .env.local (user-specific overrides)
     # 3. .env (project defaults)
     # 4. .env.example (example configuration)
+    global _env_loaded
+    from dotenv import load_dotenv
+    if verbose is None:
+        verbose = os.getenv('LLM_API_VERBOSE', '').lower() in ('1', 'true', 'yes', 'on')
     
     env_files = ['.env.local', '.env', '.env.example']
     env_loaded = False
     
-    print("Current working directory:", Path('.').absolute(), file=sys.stderr)
-    print("Looking for environment files:", env_files, file=sys.stderr)
+    if verbose:
+        print("Current working directory:", Path('.').absolute(), file=sys.stderr)
+        print("Looking for environment files:", env_files, file=sys.stderr)
     
     for env_file in env_files:
         env_path = Path('.') / env_file
-        print(f"Checking {env_path.absolute()}", file=sys.stderr)
         if env_path.exists():
-            print(f"Found {env_file}, loading variables...", file=sys.stderr)
             load_dotenv(dotenv_path=env_path)
             env_loaded = True
-            print(f"Loaded environment variables from {env_file}", file=sys.stderr)
-            # Print loaded keys (but not values for security)
-            with open(env_path) as f:
-                keys = [line.split('=')[0].strip() for line in f if '=' in line and not line.startswith('#')]
-                print(f"Keys loaded from {env_file}: {keys}", file=sys.stderr)
+            if verbose:
+                # Print loaded keys (but not values for security)
+                with open(env_path) as f:
+                    keys = [line.split('=')[0].strip() for line in f
+                            if '=' in line and not line.startswith('#')]
+                print(f"Loaded environment variables from {env_file}: {keys}", file=sys.stderr)
     
-    if not env_loaded:
-        print("Warning: No .env files found. Using system environment variables only.", file=sys.stderr)
-        print("Available system environment variables:", list(os.environ.keys()), file=sys.stderr)
+    if not env_loaded and verbose:
+        print("Warning: No .env files found. Using system environment variables only.",
+              file=sys.stderr)
+    _env_loaded = True
+
+def ensure_environment() -> None:
+    """Load the .env files once, the first time configuration is needed."""
+    if not _env_loaded:
+        load_environment()
 
-# Load environment variables at module import
-load_environment()
+def _env_number(name: str, default: float) -> float:
+    """
+    Read a number from the environment, loading the .env files first.
 
-def encode_image_file(image_path: str) -> tuple[str, str]:
+    Values that are not numbers fall back to the default with a warning.
+    Callers that need an integer cast the result.
+    """
+    ensure_environment()
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        print(f"Warning: Ignoring {name}={value!r} (not a number); using {default}",
+              file=sys.stderr)
+        return default
+
+def _env_flag(name: str, default: bool) -> bool:
+    """Read a boolean (1/true/yes/on) from the environment, loading the .env files first."""
+    ensure_environment()
+    value = os.getenv(name, '').strip().lower()
+    return value in ('1', 'true', 'yes', 'on') if value else default
+
+# Longest image edge each provider works with; larger images are downscaled (when
+# Pillow is installed: pip install "rulebook-ai[images]") since the provider would
+# shrink them anyway
+IMAGE_MAX_EDGE = {"anthropic": 1568, "openai": 2048, "gemini": 3072}
+DEFAULT_IMAGE_MAX_EDGE = 2048
+IMAGE_CACHE_SIZE = 32
+
+_IMAGE_SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+]
+
+# Prepared images and Gemini upload handles, keyed by content hash
+_image_payloads: "collections.OrderedDict[Tuple[str, int], Tuple[bytes, str, str]]" = (
+    collections.OrderedDict())
+_gemini_uploads: Dict[str, Any] = {}
+_image_lock = threading.Lock()
+
+def detect_image_mime(data: bytes, image_path: Optional[str] = None) -> str:
+    """
+    Determine an image's MIME type from its magic bytes, falling back to its file name.
+    
+    Args:
+        data (bytes): Image content
+        image_path (str, optional): File name to fall back on
+        
+    Returns:
+        str: MIME type (image/png if it cannot be determined)
+    """
+    for signature, mime_type in _IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return mime_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    guessed, _ = mimetypes.guess_type(image_path or "")
+    return guessed or 'image/png'  # Default to PNG if type cannot be determined
+
+def _downscale_image(data: bytes, mime_type: str, max_edge: int) -> Optional[Tuple[bytes, str]]:
+    """
+    Shrink an image to max_edge pixels on its longest side.
+    
+    Returns None, so the original image is sent, if Pillow (the "images"
+    extra) is missing, cannot decode the image, or the image already fits.
+    """
+    try:
+        from PIL import Image  # type: ignore[import-not-found]
+    except ImportError:
+        return None
+    import io
+    
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if max(image.size) <= max_edge:
+                return None
+            image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+            output = io.BytesIO()
+            if mime_type == "image/jpeg":
+                image.convert("RGB").save(output, format="JPEG", quality=90, optimize=True)
+            else:
+                # Screenshots and other lossless images stay lossless
+                mime_type = "image/png"
+                image.save(output, format="PNG", optimize=True)
+    except Exception:
+        # UnidentifiedImageError, truncated files, decompression bombs, unsupported modes...
+        return None
+    resized = output.getvalue()
+    return (resized, mime_type) if len(resized) < len(data) else None
+
+def prepare_image(image_path: str, provider: Optional[str] = None) -> Tuple[bytes, str, str]:
+    """
+    Load an image for a provider, downscaling it to the provider's maximum edge.
+    
+    Results are cached by content hash, so repeated queries with the same
+    image do not re-read, re-decode or re-encode it. Set LLM_API_IMAGE_RESIZE=0
+    to always send the original.
+    
+    Args:
+        image_path (str): Path to the image file
+        provider (str, optional): The API provider the image is sent to
+        
+    Returns:
+        tuple: (image bytes, mime_type, sha256 hex digest of the bytes)
+    """
+    with open(image_path, "rb") as image_file:
+        data = image_file.read()
+    digest = hashlib.sha256(data).hexdigest()
+    max_edge = IMAGE_MAX_EDGE.get(provider or "", DEFAULT_IMAGE_MAX_EDGE)
+    if not _env_flag('LLM_API_IMAGE_RESIZE', True):
+        max_edge = 0
+    with _image_lock:
+        if (digest, max_edge) in _image_payloads:
+            _image_payloads.move_to_end((digest, max_edge))
+            return _image_payloads[(digest, max_edge)]
+    
+    mime_type = detect_image_mime(data, image_path)
+    prepared = (data, mime_type, digest)
+    resized = _downscale_image(data, mime_type, max_edge) if max_edge else None
+    if resized is not None:
+        prepared = (resized[0], resized[1], hashlib.sha256(resized[0]).hexdigest())
+    with _image_lock:
+        _image_payloads[(digest, max_edge)] = prepared
+        while len(_image_payloads) > IMAGE_CACHE_SIZE:
+            _image_payloads.popitem(last=False)
+    return prepared
+
+def encode_image_file(image_path: str, provider: Optional[str] = None) -> tuple[str, str]:
     """
     Encode an image file to base64 and determine its MIME type.
     
     Args:
         image_path (str): Path to the image file
+        provider (str, optional): The API provider, to downscale the image for (see prepare_image)
         
     Returns:
         tuple: (base64_encoded_string, mime_type)
     """
-    mime_type, _ = mimetypes.guess_type(image_path)
-    if not mime_type:
-        mime_type = 'image/png'  # Default to PNG if type cannot be determined
+    data, mime_type, _ = prepare_image(image_path, provider)
+    encoded_string = base64.b64encode(data).decode('utf-8')
+    return encoded_string, mime_type
+
+def upload_gemini_image(client: Any, image_path: str) -> Any:
+    """
+    Upload an image to Gemini, reusing the handle of identical content uploaded before.
+    
+    Args:
+        client: The configured google.generativeai module
+        image_path (str): Path to the image file
         
-    with open(image_path, "rb") as image_file:
-        encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
+    Returns:
+        The uploaded file handle
+    """
+    import io
+    
+    data, mime_type, digest = prepare_image(image_path, "gemini")
+    with _image_lock:
+        handle = _gemini_uploads.get(digest)
+    expires = getattr(handle, "expiration_time", None)
+    if handle is not None and (expires is None or expires.timestamp() > time.time() + 60):
+        return handle
+    handle = client.upload_file(io.BytesIO(data), mime_type=mime_type,
+                                display_name=Path(image_path).name)
+    with _image_lock:
+        _gemini_uploads[digest] = handle
+    return handle
+
+# Connection pool limits set with configure_connection_pool(); other limits come
+# from $LLM_API_MAX_CONNECTIONS, $LLM_API_MAX_KEEPALIVE and $LLM_API_KEEPALIVE_EXPIRY
+POOL_LIMITS: Dict[str, Any] = {}
+
+def pool_limits() -> Dict[str, Any]:
+    """Return the connection pool limits of clients created from now on."""
+    limits = {
+        "max_connections": int(_env_number("LLM_API_MAX_CONNECTIONS", 20)),
+        "max_keepalive_connections": int(_env_number("LLM_API_MAX_KEEPALIVE", 10)),
+        "keepalive_expiry": _env_number("LLM_API_KEEPALIVE_EXPIRY", 60.0),
+    }
+    limits.update(POOL_LIMITS)
+    return limits
+DEFAULT_LOCAL_BASE_URL = "http://192.168.180.137:8006/v1"
+
+# Process-wide clients keyed by (provider, base_url, api key fingerprint, async, event loop)
+_client_registry: Dict[Tuple[str, Optional[str], str, bool, Any], Any] = {}
+_registry_lock = threading.Lock()
+
+def _httpx() -> Any:
+    """Return the HTTP library the OpenAI and Anthropic SDKs are built on."""
+    try:
+        import httpx
+    except ImportError:  # SDK builds on the httpx2 fork
+        import httpx2 as httpx  # type: ignore[import-not-found, no-redef]
+    return httpx
+
+def _key_fingerprint(api_key: Optional[str]) -> str:
+    """Identify an API key in the registry without keeping the key itself as a key."""
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+# (API key variable, base URL variable, default base URL) of each hosted provider;
+# a base URL of None means the SDK default
+_PROVIDER_SETTINGS: Dict[str, Tuple[str, Optional[str], Optional[str]]] = {
+    "openai": ("OPENAI_API_KEY", "OPENAI_BASE_URL", None),
+    "azure": ("AZURE_OPENAI_API_KEY", "AZURE_OPENAI_ENDPOINT", "https://msopenai.openai.azure.com"),
+    "deepseek": ("DEEPSEEK_API_KEY", None, "https://api.deepseek.com/v1"),
+    "siliconflow": ("SILICONFLOW_API_KEY", None, "https://api.siliconflow.cn/v1"),
+    "anthropic": ("ANTHROPIC_API_KEY", "ANTHROPIC_BASE_URL", None),
+    "gemini": ("GOOGLE_API_KEY", None, None),
+}
+
+def client_settings(provider: str) -> Tuple[str, Optional[str]]:
+    """
+    Resolve the API key and base URL of a provider from the environment.
+    
+    Args:
+        provider (str): The API provider
         
-    return encoded_string, mime_type
+    Returns:
+        tuple: (api_key, base_url); base_url is None for the SDK default
+    """
+    ensure_environment()
+    if provider == "local":
+        return "not-needed", local_endpoints()[0]
+    if provider not in _PROVIDER_SETTINGS:
+        raise ValueError(f"Unsupported provider: {provider}")
+    key_variable, url_variable, default_url = _PROVIDER_SETTINGS[provider]
+    api_key = os.getenv(key_variable)
+    if not api_key:
+        raise ValueError(f"{key_variable} not found in environment variables")
+    return api_key, os.getenv(url_variable, default_url) if url_variable else default_url
+
+def _build_client(provider: str, api_key: str, base_url: Optional[str], async_client: bool) -> Any:
+    """
+    Create an SDK client with a pooled keep-alive HTTP client. SDKs are imported on first use.
+    
+    The SDKs' own retries are turned off; RetryPolicy retries instead.
+    """
+    if provider == "gemini":
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        return genai
+    
+    httpx = _httpx()
+    limits = httpx.Limits(**pool_limits())
+    if provider == "anthropic":
+        import anthropic
+        if async_client:
+            return anthropic.AsyncAnthropic(
+                api_key=api_key, base_url=base_url, max_retries=0,
+                http_client=anthropic.DefaultAsyncHttpxClient(limits=limits))
+        return anthropic.Anthropic(api_key=api_key, base_url=base_url, max_retries=0,
+                                   http_client=anthropic.DefaultHttpxClient(limits=limits))
+    
+    import openai
+    http_client: Any = (openai.DefaultAsyncHttpxClient(limits=limits) if async_client
+                        else openai.DefaultHttpxClient(limits=limits))
+    if provider == "azure":
+        azure_class: Any = openai.AsyncAzureOpenAI if async_client else openai.AzureOpenAI
+        return azure_class(api_key=api_key, api_version="2024-08-01-preview", max_retries=0,
+                           azure_endpoint=base_url, http_client=http_client)
+    openai_class = openai.AsyncOpenAI if async_client else openai.OpenAI
+    return openai_class(api_key=api_key, base_url=base_url, max_retries=0, http_client=http_client)
+
+def get_llm_client(provider: str = "openai", async_client: bool = False,
+                   base_url: Optional[str] = None) -> Any:
+    """
+    Return the shared client of a provider, creating it on first use.
+    
+    Clients are kept per (provider, base URL, API key fingerprint) and reuse
+    their HTTP connections across calls, so only the first call pays for
+    connection setup and the TLS handshake. Asyncio clients are also kept per
+    event loop, since their connections cannot move between loops.
+    
+    Args:
+        provider (str): The API provider
+        async_client (bool): Return the asyncio client instead of the sync one
+        base_url (str, optional): Override the provider's base URL, e.g. to pick
+            one of several local endpoints
+        
+    Returns:
+        The SDK client (the configured google.generativeai module for Gemini)
+    """
+    api_key, default_base_url = client_settings(provider)
+    base_url = base_url or default_base_url
+    loop = None
+    if async_client:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+    key = (provider, base_url, _key_fingerprint(api_key), async_client, loop)
+    with _registry_lock:
+        # Drop asyncio clients left behind by loops that have finished
+        for stale in [k for k in _client_registry if k[4] is not None and k[4].is_closed()]:
+            del _client_registry[stale]
+        client = _client_registry.get(key)
+        if client is None:
+            client = _build_client(provider, api_key, base_url, async_client)
+            _client_registry[key] = client
+    return client
+
+def create_llm_client(provider: str = "openai") -> Any:
+    """Return the shared sync client of a provider (see get_llm_client)."""
+    return get_llm_client(provider)
+
+def configure_connection_pool(max_connections: Optional[int] = None,
+                              max_keepalive_connections: Optional[int] = None,
+                              keepalive_expiry: Optional[float] = None) -> None:
+    """
+    Change the connection pool limits of clients created from now on.
+    
+    Call close_llm_clients() first to apply new limits to existing providers.
+    
+    Args:
+        max_connections (int, optional): Maximum open connections per client
+        max_keepalive_connections (int, optional): Idle connections kept open per client
+        keepalive_expiry (float, optional): Seconds an idle connection is kept open
+    """
+    for name, value in (("max_connections", max_connections),
+                        ("max_keepalive_connections", max_keepalive_connections),
+                        ("keepalive_expiry", keepalive_expiry)):
+        if value is not None:
+            POOL_LIMITS[name] = value
+
+def _take_clients(async_clients: bool, loops: Optional[List[Any]] = None) -> List[Any]:
+    """Remove and return registry clients, optionally only those of the given event loops."""
+    with _registry_lock:
+        keys = [key for key in _client_registry
+                if key[3] == async_clients and (loops is None or key[4] in loops)]
+        return [_client_registry.pop(key) for key in keys]
 
-def create_llm_client(provider="openai"):
+def _close_sync_clients() -> None:
+    for client in _take_clients(async_clients=False):
+        if hasattr(client, "close"):
+            client.close()
+
+async def aclose_llm_clients() -> None:
+    """Close all shared sync clients and the asyncio clients of the running event loop."""
+    for client in _take_clients(async_clients=True, loops=[None, asyncio.get_running_loop()]):
+        if hasattr(client, "close"):
+            await client.close()
+    _close_sync_clients()
+
+def close_llm_clients() -> None:
+    """
+    Close all shared clients and their connection pools.
+    
+    Asyncio clients are closed too when no event loop is running; from
+    async code, use aclose_llm_clients() instead. Runs automatically at exit.
+    """
+    _close_sync_clients()
+    try:
+        asyncio.get_running_loop()
+        return
+    except RuntimeError:
+        pass
+    # Clients of finished loops lost their connections with the loop
+    async_clients = _take_clients(async_clients=True, loops=[None])
+    _take_clients(async_clients=True)
+    if not async_clients:
+        return
+    async def close_all() -> None:
+        for client in async_clients:
+            if hasattr(client, "close"):
+                await client.close()
+    try:
+        asyncio.run(close_all())
+    except Exception as e:
+        print(f"Warning: Unable to close async LLM clients: {e}", file=sys.stderr)
+
+atexit.register(close_llm_clients)
+
+# Local OpenAI-compatible endpoints set with configure_local_endpoints(); otherwise
+# $LOCAL_LLM_ENDPOINTS (comma-separated), else $LOCAL_LLM_BASE_URL
+LOCAL_ENDPOINTS: Optional[List[str]] = None
+EJECT_AFTER_FAILURES = 3
+EJECT_SECONDS = 30.0
+DEFAULT_HEALTH_INTERVAL = 15.0
+_local_pool = None
+
+def local_endpoints() -> List[str]:
+    """Return the base URLs of the local provider's endpoints."""
+    if LOCAL_ENDPOINTS:
+        return list(LOCAL_ENDPOINTS)
+    ensure_environment()
+    urls = [url.strip() for url in os.getenv('LOCAL_LLM_ENDPOINTS', '').split(',') if url.strip()]
+    return urls or [os.getenv('LOCAL_LLM_BASE_URL', DEFAULT_LOCAL_BASE_URL)]
+
+def configure_local_endpoints(urls: Optional[List[str]]) -> None:
+    """Set the local provider's endpoints, overriding the environment (None to go back to it)."""
+    global LOCAL_ENDPOINTS
+    LOCAL_ENDPOINTS = list(urls) if urls else None
+
+class LocalEndpoint:
+    """Load and health state of one local endpoint."""
+    
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.latencies: Deque[float] = collections.deque(maxlen=200)
+
+class EndpointPool:
+    """
+    Spreads requests over local OpenAI-compatible endpoints.
+    
+    Each request goes to the healthy endpoint with the fewest outstanding
+    requests. An endpoint is ejected for EJECT_SECONDS after
+    EJECT_AFTER_FAILURES consecutive connection errors, timeouts or 5xx
+    responses, or when a health check (GET <url>/models) fails; it is
+    re-admitted once the ejection ends or a health check passes. If every
+    endpoint is ejected, requests still go to the least loaded one.
+    """
+    
+    def __init__(self, urls: List[str]) -> None:
+        self.endpoints = [LocalEndpoint(url) for url in urls]
+        self._lock = threading.Lock()
+        self._turn = 0
+        self._health_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+    
+    def acquire(self) -> LocalEndpoint:
+        """Pick an endpoint for a request and count it as outstanding."""
+        now = time.monotonic()
+        with self._lock:
+            candidates = [e for e in self.endpoints if e.ejected_until <= now] or self.endpoints
+            # Rotate the starting point so equally loaded endpoints take turns
+            self._turn = (self._turn + 1) % len(self.endpoints)
+            order = {id(e): (i - self._turn) % len(self.endpoints)
+                     for i, e in enumerate(self.endpoints)}
+            endpoint = min(candidates, key=lambda e: (e.outstanding, order[id(e)]))
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+    
+    def release(self, endpoint: LocalEndpoint, latency: float,
+                error: Optional[Exception] = None) -> None:
+        """Finish a request, recording its latency or counting a failure against the endpoint."""
+        with self._lock:
+            endpoint.outstanding -= 1
+            if error is None:
+                endpoint.latencies.append(latency)
+                endpoint.consecutive_failures = 0
+            elif is_retryable(error):
+                # Client errors such as a bad request are not the endpoint's fault
+                endpoint.errors += 1
+                endpoint.consecutive_failures += 1
+                if endpoint.consecutive_failures >= EJECT_AFTER_FAILURES:
+                    endpoint.ejected_until = time.monotonic() + EJECT_SECONDS
+    
+    def call(self, request: Callable[[str], Any]) -> Any:
+        """Run request(base_url) on an endpoint picked by acquire()."""
+        endpoint = self.acquire()
+        start = time.perf_counter()
+        try:
+            result = request(endpoint.url)
+        except Exception as e:
+            self.release(endpoint, time.perf_counter() - start, e)
+            raise
+        self.release(endpoint, time.perf_counter() - start)
+        return result
+    
+    async def acall(self, request: Callable[[str], Awaitable[Any]]) -> Any:
+        """Asyncio version of call(); request(base_url) returns a coroutine."""
+        endpoint = self.acquire()
+        start = time.perf_counter()
+        try:
+            result = await request(endpoint.url)
+        except BaseException as e:
+            error = e if isinstance(e, Exception) else None
+            self.release(endpoint, time.perf_counter() - start, error)
+            raise
+        self.release(endpoint, time.perf_counter() - start)
+        return result
+    
+    def check_health(self, timeout: float = 2.0) -> Dict[str, bool]:
+        """
+        Probe every endpoint with GET <url>/models.
+        
+        Failing endpoints are ejected and healthy ones re-admitted.
+        
+        Returns:
+            dict: Whether each endpoint is healthy, keyed by URL
+        """
+        httpx = _httpx()
+        results = {}
+        for endpoint in self.endpoints:
+            try:
+                response = httpx.get(f"{endpoint.url.rstrip('/')}/models", timeout=timeout)
+                healthy = response.status_code == 200
+            except Exception:
+                healthy = False
+            with self._lock:
+                if healthy:
+                    endpoint.ejected_until = 0.0
+                    endpoint.consecutive_failures = 0
+                else:
+                    endpoint.ejected_until = time.monotonic() + EJECT_SECONDS
+            results[endpoint.url] = healthy
+        return results
+    
+    def start_health_checks(self, interval: float) -> None:
+        """Check endpoint health every `interval` seconds in a daemon thread."""
+        def run() -> None:
+            while not self._stop.wait(interval):
+                self.check_health()
+        
+        if self._health_thread is None:
+            self._health_thread = threading.Thread(target=run, name="llm-api-health", daemon=True)
+            self._health_thread.start()
+    
+    def stop(self) -> None:
+        """Stop the health check thread."""
+        self._stop.set()
+    
+    def stats(self) -> List[Dict[str, Any]]:
+        """Return load, error and latency figures per endpoint."""
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                "url": e.url,
+                "outstanding": e.outstanding,
+                "requests": e.requests,
+                "errors": e.errors,
+                "ejected": e.ejected_until > now,
+                "latency_p50": _percentile(sorted(e.latencies), 50),
+                "latency_p95": _percentile(sorted(e.latencies), 95),
+            } for e in self.endpoints]
+
+def local_endpoint_pool() -> EndpointPool:
+    """
+    Return the pool of the configured local endpoints, creating it on first use.
+    
+    With several endpoints, health checks run every $LOCAL_LLM_HEALTH_INTERVAL
+    seconds (default 15, 0 to disable).
+    """
+    global _local_pool
+    urls = local_endpoints()
+    with _registry_lock:
+        if _local_pool is None or [e.url for e in _local_pool.endpoints] != urls:
+            if _local_pool is not None:
+                _local_pool.stop()
+            _local_pool = EndpointPool(urls)
+            interval = _env_number('LOCAL_LLM_HEALTH_INTERVAL', DEFAULT_HEALTH_INTERVAL)
+            if len(urls) > 1 and interval > 0:
+                _local_pool.start_health_checks(interval)
+        return _local_pool
+
+PROVIDERS = ['openai', 'anthropic', 'gemini', 'local', 'deepseek', 'azure', 'siliconflow']
+OPENAI_COMPATIBLE_PROVIDERS = ["openai", "local", "deepseek", "azure", "siliconflow"]
+MAX_OUTPUT_TOKENS = 1000
+
+def default_model(provider: str) -> str:
+    """Return the model used for a provider when none is given (empty if it is unknown)."""
+    ensure_environment()
     if provider == "openai":
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY not found in environment variables")
-        return OpenAI(
-            api_key=api_key
-        )
+        return "gpt-4o"
     elif provider == "azure":
-        api_key = os.getenv('AZURE_OPENAI_API_KEY')
-        if not api_key:
-            raise ValueError("AZURE_OPENAI_API_KEY not found in environment variables")
-        return AzureOpenAI(
-            api_key=api_key,
-            api_version="2024-08-01-preview",
-            azure_endpoint="https://msopenai.openai.azure.com"
-        )
+        # Get from env with fallback
+        return os.getenv('AZURE_OPENAI_MODEL_DEPLOYMENT', 'gpt-4o-ms')
     elif provider == "deepseek":
-        api_key = os.getenv('DEEPSEEK_API_KEY')
-        if not api_key:
-            raise ValueError("DEEPSEEK_API_KEY not found in environment variables")
-        return OpenAI(
-            api_key=api_key,
-            base_url="https://api.deepseek.com/v1",
-        )
+        return "deepseek-chat"
     elif provider == "siliconflow":
-        api_key = os.getenv('SILICONFLOW_API_KEY')
-        if not api_key:
-            raise ValueError("SILICONFLOW_API_KEY not found in environment variables")
-        return OpenAI(
-            api_key=api_key,
-            base_url="https://api.siliconflow.cn/v1"
-        )
+        return "deepseek-ai/DeepSeek-R1"
     elif provider == "anthropic":
-        api_key = os.getenv('ANTHROPIC_API_KEY')
-        if not api_key:
-            raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
-        return Anthropic(
-            api_key=api_key
-        )
+        return "claude-3-7-sonnet-20250219"
     elif provider == "gemini":
-        api_key = os.getenv('GOOGLE_API_KEY')
-        if not api_key:
-            raise ValueError("GOOGLE_API_KEY not found in environment variables")
-        genai.configure(api_key=api_key)
-        return genai
+        return "gemini-2.0-flash-exp"
     elif provider == "local":
-        return OpenAI(
-            base_url="http://192.168.180.137:8006/v1",
-            api_key="not-needed"
-        )
+        return os.getenv('LOCAL_LLM_MODEL', "Qwen/Qwen2.5-32B-Instruct-AWQ")
+    return ""
+
+def sampling_params(provider: str, model: str) -> Dict[str, Any]:
+    """Return the sampling parameters sent with every request to a provider and model."""
+    if provider in OPENAI_COMPATIBLE_PROVIDERS:
+        # o1 takes a reasoning effort instead of a temperature
+        if model == "o1":
+            return {"response_format": {"type": "text"}, "reasoning_effort": "low"}
+        return {"temperature": 0.7}
+    elif provider == "anthropic":
+        return {"max_tokens": MAX_OUTPUT_TOKENS}
+    return {}
+
+def prefix_blocks(system_prefix: Union[None, str, List[str]]) -> List[str]:
+    """Return the non-empty blocks of a system prefix given as a string or a list of strings."""
+    if not system_prefix:
+        return []
+    blocks = [system_prefix] if isinstance(system_prefix, str) else list(system_prefix)
+    return [block for block in blocks if block.strip()]
+
+def read_prefix_files(paths: List[str]) -> List[str]:
+    """Read the files of a system prefix, one block per file, in the order given."""
+    blocks = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            blocks.append(f.read())
+    return blocks
+
+def _openai_request(prompt: str, model: str, provider: str, image_path: Optional[str] = None,
+                    system_prefix: Union[None, str, List[str]] = None) -> Dict[str, Any]:
+    """
+    Build chat.completions.create() arguments for OpenAI-compatible providers.
+    
+    The system prefix goes first, byte-for-byte identical across calls, so
+    OpenAI's automatic prompt caching (and prefix caching in local servers
+    such as vLLM) can reuse it.
+    """
+    messages: List[Dict[str, Any]] = [{"role": "user", "content": []}]
+    
+    # Add text content
+    messages[0]["content"].append({
+        "type": "text",
+        "text": prompt
+    })
+    
+    # Add image content if provided
+    if image_path:
+        if provider == "openai":
+            encoded_image, mime_type = encode_image_file(image_path, provider)
+            messages[0]["content"] = [
+                {"type": "text", "text": prompt},
+                {"type": "image_url",
+                 "image_url": {"url": f"data:{mime_type};base64,{encoded_image}"}},
+            ]
+    
+    blocks = prefix_blocks(system_prefix)
+    if blocks:
+        role = "developer" if model == "o1" else "system"
+        messages.insert(0, {"role": role, "content": "\n\n".join(blocks)})
+    
+    kwargs: Dict[str, Any] = {
+        "model": model,
+        "messages": messages,
+    }
+    kwargs.update(sampling_params(provider, model))
+    if blocks and provider == "openai":
+        # Route requests sharing the prefix to the same cache; sent as a raw body
+        # field because older SDK releases reject it as a keyword argument
+        prompt_cache_key = hashlib.sha256("\n\n".join(blocks).encode('utf-8')).hexdigest()[:32]
+        kwargs["extra_body"] = {"prompt_cache_key": prompt_cache_key}
+    return kwargs
+
+def _anthropic_request(prompt: str, model: str, image_path: Optional[str] = None,
+                       system_prefix: Union[None, str, List[str]] = None) -> Dict[str, Any]:
+    """
+    Build messages.create() arguments for Anthropic.
+    
+    The system prefix becomes system blocks, with an ephemeral cache_control
+    breakpoint after the last one so the whole prefix is cached.
+    """
+    messages: List[Dict[str, Any]] = [{"role": "user", "content": []}]
+    
+    # Add text content
+    messages[0]["content"].append({
+        "type": "text",
+        "text": prompt
+    })
+    
+    # Add image content if provided
+    if image_path:
+        encoded_image, mime_type = encode_image_file(image_path, "anthropic")
+        messages[0]["content"].append({
+            "type": "image",
+            "source": {
+                "type": "base64",
+                "media_type": mime_type,
+                "data": encoded_image
+            }
+        })
+    kwargs: Dict[str, Any] = {"model": model, "messages": messages}
+    blocks = prefix_blocks(system_prefix)
+    if blocks:
+        kwargs["system"] = [{"type": "text", "text": block} for block in blocks]
+        kwargs["system"][-1]["cache_control"] = {"type": "ephemeral"}
+    kwargs.update(sampling_params("anthropic", model))
+    return kwargs
+
+def _gemini_model(client: Any, model: str,
+                  system_prefix: Union[None, str, List[str]] = None) -> Any:
+    """Create a Gemini model with the system prefix as its system instruction."""
+    blocks = prefix_blocks(system_prefix)
+    if blocks:
+        return client.GenerativeModel(model, system_instruction="\n\n".join(blocks))
+    return client.GenerativeModel(model)
+
+def _gemini_parts(client: Any, prompt: str, image_path: Optional[str] = None) -> List[Any]:
+    """Build the content parts of a Gemini request."""
+    if image_path:
+        return [upload_gemini_image(client, image_path), prompt]
+    return [prompt]
+
+# Opt-in response cache (see ResponseCache); LLM_API_CACHE=1 enables it by default.
+# CACHE_PATH overrides $LLM_API_CACHE_PATH.
+CACHE_PATH: Optional[str] = None
+DEFAULT_CACHE_PATH = str(Path.home() / '.cache' / 'rulebook-ai' / 'llm_api_cache.sqlite3')
+DEFAULT_CACHE_TTL = 7 * 24 * 3600.0
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+def cache_path() -> str:
+    """Return the path of the response cache database."""
+    ensure_environment()
+    return CACHE_PATH or os.getenv('LLM_API_CACHE_PATH') or DEFAULT_CACHE_PATH
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalize line endings and surrounding whitespace, which do not change its meaning."""
+    lines = prompt.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return '\n'.join(line.rstrip() for line in lines).strip()
+
+def cache_key(prompt: str, provider: str, model: str, image_path: Optional[str] = None,
+              system_prefix: Union[None, str, List[str]] = None) -> str:
+    """
+    Compute the cache key of a request.
+    
+    Args:
+        prompt (str): The text prompt
+        provider (str): The API provider
+        model (str): The model
+        image_path (str, optional): Attached image, identified by its content hash
+        system_prefix (optional): System prefix sent before the prompt
+        
+    Returns:
+        str: Hex digest over provider, model, system prefix, normalized prompt, image hash
+            and sampling parameters
+    """
+    image_hash = None
+    if image_path:
+        with open(image_path, 'rb') as f:
+            image_hash = hashlib.sha256(f.read()).hexdigest()
+    material = json.dumps({
+        "provider": provider,
+        "model": model,
+        "prompt": normalize_prompt(prompt),
+        "system_prefix": prefix_blocks(system_prefix),
+        "image": image_hash,
+        "params": sampling_params(provider, model),
+    }, sort_keys=True)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """
+    SQLite cache of LLM responses with a TTL and a size-bounded LRU.
+    
+    Entries older than `ttl` seconds are treated as misses. Once the cached
+    responses exceed `max_bytes`, the least recently used ones are evicted.
+    Hit and miss counts are kept in the database, so they add up across runs.
+    """
+    
+    def __init__(self, path: str = None, ttl: float = None, max_bytes: int = None) -> None:
+        import sqlite3
+        self.path = path or cache_path()
+        self.ttl = _env_number('LLM_API_CACHE_TTL', DEFAULT_CACHE_TTL) if ttl is None else ttl
+        if max_bytes is None:
+            max_bytes = int(_env_number('LLM_API_CACHE_MAX_BYTES', DEFAULT_CACHE_MAX_BYTES))
+        self.max_bytes = max_bytes
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=10, isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, "
+                         "provider TEXT, model TEXT, response TEXT, size INTEGER, created REAL, "
+                         "last_used REAL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER)")
+    
+    def _count(self, name: str) -> None:
+        self._db.execute("INSERT INTO stats VALUES (?, 1) "
+                         "ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,))
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for a key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT response, created FROM responses WHERE key = ?",
+                                   (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self._count("misses")
+                return None
+            self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._count("hits")
+            response: str = row[0]
+            return response
+    
+    def put(self, key: str, response: str, provider: str = None, model: str = None) -> None:
+        """Store a response, evicting least recently used entries over the size limit."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             (key, provider, model, response, len(response.encode('utf-8')), now,
+                              now))
+            self._db.execute("DELETE FROM responses WHERE key IN (SELECT key FROM "
+                             "(SELECT key, SUM(size) OVER (ORDER BY last_used DESC, key) AS total "
+                             "FROM responses) WHERE total > ?)", (self.max_bytes,))
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return entry count, size in bytes, hits, misses and hit rate."""
+        with self._lock:
+            entries, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            counts = dict(self._db.execute("SELECT name, value FROM stats").fetchall())
+        hits, misses = counts.get("hits", 0), counts.get("misses", 0)
+        return {"path": self.path, "entries": entries, "bytes": size, "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None}
+    
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+_response_caches: Dict[str, ResponseCache] = {}
+
+def get_response_cache(path: str = None) -> ResponseCache:
+    """Return the shared ResponseCache for a database path (default: $LLM_API_CACHE_PATH)."""
+    path = path or cache_path()
+    with _registry_lock:
+        if path not in _response_caches:
+            _response_caches[path] = ResponseCache(path)
+        return _response_caches[path]
+
+def _cache_enabled(cache: Optional[bool]) -> bool:
+    """Resolve the cache setting of a call; None follows $LLM_API_CACHE."""
+    if cache is None:
+        return _env_flag('LLM_API_CACHE', False)
+    return cache
+
+# Per-call metrics log (see record_call); METRICS_PATH overrides $LLM_API_METRICS
+METRICS_PATH: Optional[str] = None
+DEFAULT_METRICS_PATH = str(Path.home() / '.cache' / 'rulebook-ai' / 'llm_api_metrics.jsonl')
+# Estimated USD per million (input, output, cached input) tokens; $LLM_API_PRICES
+# names a JSON file of {"model": [input, output, cached]} to override or extend it
+MODEL_PRICES: Dict[str, Tuple[float, float, float]] = {
+    "gpt-4o": (2.50, 10.00, 1.25),
+    "o1": (15.00, 60.00, 7.50),
+    "claude-3-7-sonnet-20250219": (3.00, 15.00, 0.30),
+    "gemini-2.0-flash-exp": (0.0, 0.0, 0.0),
+    "deepseek-chat": (0.27, 1.10, 0.07),
+}
+_metrics_lock = threading.Lock()
+
+def metrics_path() -> Optional[str]:
+    """Return the metrics log path, or None when metrics are off ($LLM_API_METRICS unset)."""
+    if METRICS_PATH:
+        return METRICS_PATH
+    ensure_environment()
+    setting = os.getenv('LLM_API_METRICS', '')
+    if setting.lower() in ('', '0', 'false', 'no', 'off'):
+        return None
+    return DEFAULT_METRICS_PATH if setting.lower() in ('1', 'true', 'yes', 'on') else setting
+
+def model_prices(model: str) -> Optional[Tuple[float, float, float]]:
+    """Return a model's (input, output, cached input) USD prices per million tokens, if known."""
+    ensure_environment()
+    prices: Dict[str, Any] = dict(MODEL_PRICES)
+    prices_file = os.getenv('LLM_API_PRICES')
+    if prices_file:
+        with open(prices_file, encoding='utf-8') as f:
+            prices.update(json.load(f))
+    if model in prices:
+        base: Optional[str] = model
+    elif not model:
+        return None
     else:
-        raise ValueError(f"Unsupported provider: {provider}")
+        # Dated snapshots (e.g. gpt-4o-2024-08-06) cost what their base model costs
+        base = max((name for name in prices if model.startswith(name + "-")), key=len,
+                   default=None)
+    if base is None:
+        return None
+    input_price, output_price, cached_price = prices[base]
+    return float(input_price), float(output_price), float(cached_price)
+
+def estimate_cost(model: str, usage: Dict[str, Optional[int]]) -> Optional[float]:
+    """Estimate the USD cost of a call from its token usage; None if the price is unknown."""
+    prices = model_prices(model)
+    input_tokens = usage.get("input_tokens")
+    if prices is None or input_tokens is None:
+        return None
+    cached = usage.get("cached_tokens") or 0
+    cost = ((input_tokens - cached) * prices[0] + (usage.get("output_tokens") or 0) * prices[1]
+            + cached * prices[2]) / 1_000_000
+    return round(cost, 8)
 
-def query_llm(prompt: str, client=None, model=None, provider="openai", image_path: Optional[str] = None) -> Optional[str]:
+def response_usage(provider: str, response: Any) -> Dict[str, Optional[int]]:
+    """
+    Extract token usage from a provider response.
+    
+    Returns:
+        dict: "input_tokens" (including cached ones), "output_tokens" and
+            "cached_tokens"; None where the provider did not report them
+    """
+    if provider == "gemini":
+        usage = getattr(response, "usage_metadata", None)
+        return {
+            "input_tokens": getattr(usage, "prompt_token_count", None),
+            "output_tokens": getattr(usage, "candidates_token_count", None),
+            "cached_tokens": getattr(usage, "cached_content_token_count", None),
+        }
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return {"input_tokens": None, "output_tokens": None, "cached_tokens": None}
+    if provider == "anthropic":
+        cache_read = getattr(usage, "cache_read_input_tokens", None)
+        input_tokens = getattr(usage, "input_tokens", None)
+        if input_tokens is not None:
+            # Anthropic reports cache reads and writes separately from the other input tokens
+            cache_write = getattr(usage, "cache_creation_input_tokens", None)
+            input_tokens += (cache_read or 0) + (cache_write or 0)
+        return {"input_tokens": input_tokens,
+                "output_tokens": getattr(usage, "output_tokens", None),
+                "cached_tokens": cache_read}
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "input_tokens": getattr(usage, "prompt_tokens", None),
+        "output_tokens": getattr(usage, "completion_tokens", None),
+        "cached_tokens": getattr(details, "cached_tokens", None),
+    }
+
+def record_call(provider: str, model: str, latency: float,
+                usage: Optional[Dict[str, Optional[int]]] = None, ttft: Optional[float] = None,
+                retries: int = 0, error: Optional[Exception] = None, cache_hit: bool = False,
+                stream: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Append the metrics of one call to the metrics log, if metrics are on.
+    
+    Args:
+        provider (str): The API provider that answered
+        model (str): The model
+        latency (float): Seconds for the whole call, retries included
+        usage (dict, optional): Token usage (see response_usage)
+        ttft (float, optional): Seconds to the first streamed token
+        retries (int): Retries needed
+        error (Exception, optional): The error the call failed with
+        cache_hit (bool): Whether the response came from the response cache
+        stream (bool): Whether the response was streamed
+        
+    Returns:
+        Optional[dict]: The record written, or None when metrics are off
+    """
+    path = metrics_path()
+    if path is None:
+        return None
+    usage = usage or {}
+    record: Dict[str, Any] = {
+        "time": round(time.time(), 3),
+        "provider": provider,
+        "model": model,
+        "status": "error" if error is not None else "ok",
+        "latency": round(latency, 4),
+        "ttft": round(ttft, 4) if ttft is not None else None,
+        "input_tokens": usage.get("input_tokens"),
+        "output_tokens": usage.get("output_tokens"),
+        "cached_tokens": usage.get("cached_tokens"),
+        "retries": retries,
+        "cost": 0.0 if cache_hit else estimate_cost(model, usage),
+        "cache_hit": cache_hit,
+        "stream": stream,
+    }
+    if error is not None:
+        record["error"] = f"{type(error).__name__}: {error}"[:500]
+    line = json.dumps(record) + "\n"
+    with _metrics_lock:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+    return record
+
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_RETRIES = 2
+# Longest Retry-After delay honoured, in seconds
+MAX_RETRY_AFTER = 120.0
+# Successful calls needed per provider and model before hedging after their p95 latency
+HEDGE_MIN_SAMPLES = 20
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429}
+RETRYABLE_ERRORS = {"APIConnectionError", "APITimeoutError", "TimeoutError", "ConnectionError",
+                    "ServiceUnavailable", "DeadlineExceeded", "InternalServerError"}
+
+# Recent successful call latencies keyed by (provider, model), for hedging
+_latency_history: Dict[Tuple[str, str], Deque[float]] = {}
+_hedge_pool: Any = None
+
+def record_latency(provider: str, model: str, seconds: float) -> None:
+    """Remember the latency of a successful call."""
+    with _registry_lock:
+        history = _latency_history.setdefault((provider, model), collections.deque(maxlen=200))
+        history.append(seconds)
+
+def latency_percentile(provider: str, model: str, percentile: float = 95) -> Optional[float]:
+    """Return a latency percentile of recent calls, or None with fewer than HEDGE_MIN_SAMPLES."""
+    with _registry_lock:
+        samples = sorted(_latency_history.get((provider, model), ()))
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return None
+    return _percentile(samples, percentile)
+
+def _percentile(ordered: List[float], percentile: float) -> Optional[float]:
+    """Return the nearest-rank percentile of sorted values (None if there are none)."""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+def is_retryable(error: Exception) -> bool:
+    """Tell whether a failed request may succeed if sent again (rate limits, overload, timeouts)."""
+    status = getattr(error, "status_code", None)
+    code = getattr(error, "code", None)
+    if status is None and isinstance(code, int):
+        status = code  # google.api_core errors
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES or status >= 500
+    return any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Return the delay in seconds a failed response asked for in its Retry-After headers."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        # Retry-After may also be an HTTP date; a malformed retry-after-ms alone is ignored
+        from email.utils import parsedate_to_datetime
+        date = headers.get("retry-after")
+        if not date:
+            return None
+        try:
+            return max(parsedate_to_datetime(date).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            return None
+    return None
+
+class RetryPolicy:
+    """
+    How llm_api retries, times out and hedges requests to one provider.
+    
+    Unset values come from the environment: LLM_API_RETRIES,
+    LLM_API_TIMEOUT (or LLM_API_TIMEOUT_<PROVIDER>) and LLM_API_HEDGE.
+    
+    Args:
+        retries (int, optional): Retries after the first attempt for retryable errors
+        timeout (float, optional): Seconds before a request is abandoned
+        backoff (float): Base of the exponential backoff in seconds
+        max_backoff (float): Longest backoff in seconds
+        hedge: Send a second identical request when the first is slower than
+            this many seconds, or than the recent p95 latency if "p95"
+    """
+    
+    def __init__(self, retries: Optional[int] = None, timeout: Optional[float] = None,
+                 backoff: float = 0.5, max_backoff: float = 30.0,
+                 hedge: Union[None, float, str] = None) -> None:
+        if retries is None:
+            retries = int(_env_number('LLM_API_RETRIES', DEFAULT_RETRIES))
+        self.retries = retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge = (os.getenv('LLM_API_HEDGE') or None) if hedge is None else hedge
+    
+    def timeout_for(self, provider: str) -> float:
+        """Return the request timeout for a provider."""
+        if self.timeout is not None:
+            return self.timeout
+        default = _env_number('LLM_API_TIMEOUT', DEFAULT_TIMEOUT)
+        return _env_number(f"LLM_API_TIMEOUT_{provider.upper()}", default)
+    
+    def backoff_delay(self, attempt: int, error: Exception) -> float:
+        """Return the wait before retry `attempt` (0-based): Retry-After, else jittered backoff."""
+        requested = retry_after(error)
+        if requested is not None:
+            return min(requested, MAX_RETRY_AFTER)
+        # Jitter only needs to spread retries out, not to be unpredictable
+        import random
+        cap = min(self.max_backoff, self.backoff * 2 ** attempt)
+        return random.uniform(0, cap)  # noqa: S311
+    
+    def hedge_delay(self, provider: str, model: str) -> Optional[float]:
+        """Return after how many seconds to hedge a request, or None not to hedge."""
+        if not self.hedge:
+            return None
+        if self.hedge == "p95":
+            return latency_percentile(provider, model)
+        return float(self.hedge)
+
+def _hedge_executor() -> Any:
+    """Return the thread pool that runs hedged sync requests."""
+    global _hedge_pool
+    with _registry_lock:
+        if _hedge_pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-api-hedge")
+    return _hedge_pool
+
+def _hedged(request: Callable[[], Any], delay: Optional[float]) -> Any:
+    """Run request(); if it takes longer than delay, race it against a second request."""
+    if delay is None:
+        return request()
+    from concurrent.futures import FIRST_COMPLETED, wait
+    
+    executor = _hedge_executor()
+    pending = {executor.submit(request)}
+    done, pending = wait(pending, timeout=delay)
+    if not done:
+        # A sync request cannot be cancelled; the slower one finishes in the background
+        pending.add(executor.submit(request))
+    while True:
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+        if not pending:
+            return future.result()  # Raises the last error
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+async def _ahedged(request: Callable[[], Awaitable[Any]], delay: Optional[float]) -> Any:
+    """Asyncio version of _hedged(); the slower request is cancelled."""
+    if delay is None:
+        return await request()
+    tasks = {asyncio.ensure_future(request())}
+    try:
+        done, tasks = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            tasks.add(asyncio.ensure_future(request()))
+        while True:
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+            if not tasks:
+                return task.result()  # Raises the last error
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def call_with_policy(request: Callable[[], Any], provider: str, model: str,
+                     policy: Optional[RetryPolicy] = None,
+                     info: Optional[Dict[str, Any]] = None) -> Any:
+    """
+    Run request() under a retry policy.
+    
+    Retryable errors are retried after a jittered backoff or the delay the
+    provider asked for; other errors, and the last retryable one, are raised.
+    
+    Args:
+        request: Callable sending one request with the policy's timeout
+        provider (str): The API provider
+        model (str): The model
+        policy (RetryPolicy, optional): The policy (default: from the environment)
+        info (dict, optional): Receives the number of "retries" made
+        
+    Returns:
+        The result of the first successful request
+    """
+    policy = policy or RetryPolicy()
+    info = {} if info is None else info
+    for attempt in range(policy.retries + 1):
+        info["retries"] = attempt
+        start = time.perf_counter()
+        try:
+            result = _hedged(request, policy.hedge_delay(provider, model))
+        except Exception as e:
+            if attempt >= policy.retries or not is_retryable(e):
+                raise
+            time.sleep(policy.backoff_delay(attempt, e))
+            continue
+        record_latency(provider, model, time.perf_counter() - start)
+        return result
+
+async def acall_with_policy(request: Callable[[], Awaitable[Any]], provider: str, model: str,
+                            policy: Optional[RetryPolicy] = None,
+                            info: Optional[Dict[str, Any]] = None) -> Any:
+    """Asyncio version of call_with_policy(); request() returns a coroutine."""
+    policy = policy or RetryPolicy()
+    info = {} if info is None else info
+    for attempt in range(policy.retries + 1):
+        info["retries"] = attempt
+        start = time.perf_counter()
+        try:
+            result = await _ahedged(request, policy.hedge_delay(provider, model))
+        except Exception as e:
+            if attempt >= policy.retries or not is_retryable(e):
+                raise
+            await asyncio.sleep(policy.backoff_delay(attempt, e))
+            continue
+        record_latency(provider, model, time.perf_counter() - start)
+        return result
+
+def failover_chain(provider: str, model: Optional[str],
+                   failover: Optional[List[str]] = None) -> List[Tuple[str, str]]:
+    """
+    Return the (provider, model) pairs to try in order.
+    
+    Args:
+        provider (str): The primary provider
+        model (str, optional): The primary provider's model
+        failover (list, optional): Providers to fall back on, with their default
+            models (default: comma-separated $LLM_API_FAILOVER)
+    """
+    if failover is None:
+        ensure_environment()
+        failover = [name.strip() for name in os.getenv('LLM_API_FAILOVER', '').split(',')
+                    if name.strip()]
+    chain = [(provider, model or default_model(provider))]
+    for fallback in failover:
+        if fallback not in [name for name, _ in chain]:
+            chain.append((fallback, default_model(fallback)))
+    return chain
+
+def _request_once(client: Any, prompt: str, model: str, provider: str, image_path: Optional[str],
+                  timeout: float, system_prefix: Union[None, str, List[str]] = None
+                  ) -> Tuple[str, Dict[str, Optional[int]]]:
+    """Send one request with a sync client, raising on errors; return (text, token usage)."""
+    if provider in OPENAI_COMPATIBLE_PROVIDERS:
+        kwargs = _openai_request(prompt, model, provider, image_path, system_prefix)
+        response = client.chat.completions.create(timeout=timeout, **kwargs)
+        return response.choices[0].message.content, response_usage(provider, response)
+        
+    elif provider == "anthropic":
+        kwargs = _anthropic_request(prompt, model, image_path, system_prefix)
+        response = client.messages.create(timeout=timeout, **kwargs)
+        return response.content[0].text, response_usage(provider, response)
+        
+    elif provider == "gemini":
+        chat_session = _gemini_model(client, model, system_prefix).start_chat(
+            history=[{
+                "role": "user",
+                "parts": _gemini_parts(client, prompt, image_path)
+            }]
+        )
+        response = chat_session.send_message(prompt, request_options={"timeout": timeout})
+        return response.text, response_usage(provider, response)
+    raise ValueError(f"Unsupported provider: {provider}")
+
+def _send(client: Any, prompt: str, model: str, provider: str, image_path: Optional[str],
+          timeout: float, system_prefix: Union[None, str, List[str]] = None
+          ) -> Tuple[str, Dict[str, Optional[int]]]:
+    """Send one request with the given client, the provider's shared one or a local endpoint's."""
+    if client is not None:
+        return _request_once(client, prompt, model, provider, image_path, timeout, system_prefix)
+    if provider == "local":
+        result: Tuple[str, Dict[str, Optional[int]]] = local_endpoint_pool().call(
+            lambda url: _request_once(get_llm_client(provider, base_url=url), prompt, model,
+                                      provider, image_path, timeout, system_prefix))
+        return result
+    return _request_once(get_llm_client(provider), prompt, model, provider, image_path, timeout,
+                         system_prefix)
+
+def _query_chain(prompt: str, client: Any, chain: List[Tuple[str, str]],
+                 image_path: Optional[str], policy: RetryPolicy,
+                 system_prefix: Union[None, str, List[str]] = None
+                 ) -> Tuple[str, str, str, Dict[str, Optional[int]]]:
+    """
+    Query each provider of a failover chain until one succeeds.
+    
+    Returns:
+        tuple: (response, provider, model, usage); the last provider's error is raised
+    """
+    for position, (provider, model) in enumerate(chain):
+        info: Dict[str, Any] = {"retries": 0}
+        start = time.perf_counter()
+        try:
+            provider_client = client if position == 0 else None
+            timeout = policy.timeout_for(provider)
+            request = functools.partial(_send, provider_client, prompt, model, provider,
+                                        image_path, timeout, system_prefix)
+            response, usage = call_with_policy(request, provider, model, policy, info)
+            record_call(provider, model, time.perf_counter() - start, usage,
+                        retries=info["retries"])
+            return response, provider, model, usage
+        except Exception as e:
+            record_call(provider, model, time.perf_counter() - start, retries=info["retries"],
+                        error=e)
+            if position + 1 == len(chain):
+                raise
+            print(f"Warning: {provider} failed ({e}); failing over to {chain[position + 1][0]}",
+                  file=sys.stderr)
+    raise ValueError("Empty failover chain")
+
+def query_llm(prompt: str, client: Any = None, model: Optional[str] = None,
+              provider: str = "openai", image_path: Optional[str] = None,
+              cache: Optional[bool] = None, refresh: bool = False,
+              policy: Optional[RetryPolicy] = None, failover: Optional[List[str]] = None,
+              system_prefix: Union[None, str, List[str]] = None,
+              usage: Optional[Dict[str, Any]] = None) -> Optional[str]:
     """
     Query an LLM with a prompt and optional image attachment.
     
@@ -129,144 +1376,863 @@ def query_llm(prompt: str, client=None, model=None, provider="openai", image_pat
         model (str, optional): The model to use
         provider (str): The API provider to use
         image_path (str, optional): Path to an image file to attach
+        cache (bool, optional): Use the response cache (default: $LLM_API_CACHE)
+        refresh (bool): Skip cached responses but store the new one
+        policy (RetryPolicy, optional): Timeouts, retries and hedging (default: from the
+            environment)
+        failover (list, optional): Providers to try in order if `provider` fails (default:
+            $LLM_API_FAILOVER)
+        system_prefix (str or list, optional): Stable content, such as rules and memory files, sent
+            before the prompt in the provider's prompt-cache layout
+        usage (dict, optional): Receives "input_tokens", "output_tokens" and "cached_tokens" (input
+            tokens read from the provider's prompt cache) of the call
         
     Returns:
         Optional[str]: The LLM's response or None if there was an error
     """
+    # Set default model
+    if model is None:
+        model = default_model(provider)
+    
+    # Cache lookups happen before any client, and therefore any SDK, is loaded
+    key = None
+    if _cache_enabled(cache):
+        key = cache_key(prompt, provider, model, image_path, system_prefix)
+        cached = None if refresh else get_response_cache().get(key)
+        if cached is not None:
+            record_call(provider, model, 0.0, cache_hit=True)
+            return cached
+    
     if client is None:
-        client = create_llm_client(provider)
+        client_settings(provider)  # Fail early on a missing API key
     
     try:
-        # Set default model
-        if model is None:
-            if provider == "openai":
-                model = "gpt-4o"
-            elif provider == "azure":
-                model = os.getenv('AZURE_OPENAI_MODEL_DEPLOYMENT', 'gpt-4o-ms')  # Get from env with fallback
-            elif provider == "deepseek":
-                model = "deepseek-chat"
-            elif provider == "siliconflow":
-                model = "deepseek-ai/DeepSeek-R1"
-            elif provider == "anthropic":
-                model = "claude-3-7-sonnet-20250219"
-            elif provider == "gemini":
-                model = "gemini-2.0-flash-exp"
-            elif provider == "local":
-                model = "Qwen/Qwen2.5-32B-Instruct-AWQ"
+        chain = failover_chain(provider, model, failover)
+        response, served_by, _, call_usage = _query_chain(prompt, client, chain, image_path,
+                                                          policy or RetryPolicy(), system_prefix)
+    except Exception as e:
+        print(f"Error querying LLM: {e}", file=sys.stderr)
+        return None
+    if usage is not None:
+        usage.update(call_usage)
+    # Responses from a fallback provider are not cached under the primary's key
+    if key is not None and response is not None and served_by == provider:
+        get_response_cache().put(key, response, provider, model)
+    return response
+
+class LLMStream:
+    """
+    Iterator over the text deltas of a streamed response.
+    
+    Once iteration starts, `ttft` holds the seconds until the first delta
+    arrived; after it ends, `total_time` holds the seconds for the whole
+    response and `text` the complete response. A provider error is raised
+    from the iteration. Of the retry policy, only the timeout applies: a
+    partly received stream cannot be retried or hedged transparently.
+    """
+    
+    def __init__(self, prompt: str, client: Any = None, model: Optional[str] = None,
+                 provider: str = "openai", image_path: Optional[str] = None,
+                 cache: Optional[bool] = None, refresh: bool = False,
+                 system_prefix: Union[None, str, List[str]] = None,
+                 policy: Optional[RetryPolicy] = None) -> None:
+        self.prompt = prompt
+        self.policy = policy or RetryPolicy()
+        self.system_prefix = system_prefix
+        self.client = client
+        self.provider = provider
+        self.model = model or default_model(provider)
+        self.image_path = image_path
+        self.use_cache = _cache_enabled(cache)
+        self.refresh = refresh
+        self.cached = False
+        self.ttft: Optional[float] = None
+        self.total_time: Optional[float] = None
+        self.text = ""
+        self.usage: Dict[str, Optional[int]] = {}
+    
+    def _deltas(self) -> Iterator[str]:
+        """Yield text deltas, from a pooled endpoint for the local provider."""
+        if self.client is not None or self.provider != "local":
+            yield from self._provider_deltas(self.client or get_llm_client(self.provider))
+            return
+        pool = local_endpoint_pool()
+        endpoint = pool.acquire()
+        start = time.perf_counter()
+        try:
+            yield from self._provider_deltas(get_llm_client(self.provider, base_url=endpoint.url))
+        except Exception as e:
+            pool.release(endpoint, time.perf_counter() - start, e)
+            raise
+        except BaseException:
+            pool.release(endpoint, time.perf_counter() - start)
+            raise
+        pool.release(endpoint, time.perf_counter() - start)
+    
+    def _provider_deltas(self, client: Any) -> Iterator[str]:
+        """Yield text deltas from the provider's streaming API."""
+        timeout = self.policy.timeout_for(self.provider)
+        if self.provider in OPENAI_COMPATIBLE_PROVIDERS:
+            yield from self._openai_deltas(client, timeout)
+        elif self.provider == "anthropic":
+            kwargs = _anthropic_request(self.prompt, self.model, self.image_path,
+                                        self.system_prefix)
+            with client.messages.stream(timeout=timeout, **kwargs) as stream:
+                yield from stream.text_stream
+                self.usage = response_usage(self.provider, stream.get_final_message())
+        elif self.provider == "gemini":
+            yield from self._gemini_deltas(client, timeout)
+        else:
+            raise ValueError(f"Unsupported provider: {self.provider}")
+    
+    def _openai_deltas(self, client: Any, timeout: float) -> Iterator[str]:
+        kwargs = _openai_request(self.prompt, self.model, self.provider, self.image_path,
+                                 self.system_prefix)
+        if self.provider == "openai":
+            kwargs["stream_options"] = {"include_usage": True}
+        for chunk in client.chat.completions.create(stream=True, timeout=timeout, **kwargs):
+            if getattr(chunk, "usage", None):
+                self.usage = response_usage(self.provider, chunk)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
+    def _gemini_deltas(self, client: Any, timeout: float) -> Iterator[str]:
+        parts = _gemini_parts(client, self.prompt, self.image_path)
+        chat_session = _gemini_model(client, self.model, self.system_prefix).start_chat(
+            history=[{"role": "user", "parts": parts}]
+        )
+        for chunk in chat_session.send_message(self.prompt, stream=True,
+                                               request_options={"timeout": timeout}):
+            if getattr(chunk, "usage_metadata", None):
+                self.usage = response_usage(self.provider, chunk)
+            if chunk.text:
+                yield chunk.text
+    
+    def __iter__(self) -> Iterator[str]:
+        start = time.perf_counter()
+        key = None
+        deltas = None
+        if self.use_cache:
+            key = cache_key(self.prompt, self.provider, self.model, self.image_path,
+                            self.system_prefix)
+            cached = None if self.refresh else get_response_cache().get(key)
+            if cached is not None:
+                self.cached = True
+                deltas = [cached]
+        parts: List[str] = []
+        try:
+            for delta in deltas if deltas is not None else self._deltas():
+                if self.ttft is None:
+                    self.ttft = time.perf_counter() - start
+                parts.append(delta)
+                yield delta
+        except Exception as e:
+            record_call(self.provider, self.model, time.perf_counter() - start, ttft=self.ttft,
+                        error=e, stream=True)
+            raise
+        self.total_time = time.perf_counter() - start
+        record_call(self.provider, self.model, self.total_time, self.usage, ttft=self.ttft,
+                    cache_hit=self.cached, stream=True)
+        self.text = "".join(parts)
+        if key is not None and not self.cached:
+            get_response_cache().put(key, self.text, self.provider, self.model)
+
+def stream_llm(prompt: str, client: Any = None, model: Optional[str] = None,
+               provider: str = "openai", image_path: Optional[str] = None,
+               cache: Optional[bool] = None, refresh: bool = False,
+               system_prefix: Union[None, str, List[str]] = None,
+               policy: Optional[RetryPolicy] = None) -> LLMStream:
+    """
+    Query an LLM and stream the response as it is generated.
+    
+    Args:
+        prompt (str): The text prompt to send
+        client: The LLM client instance
+        model (str, optional): The model to use
+        provider (str): The API provider to use
+        image_path (str, optional): Path to an image file to attach
+        cache (bool, optional): Use the response cache (default: $LLM_API_CACHE); a hit is
+            yielded whole
+        refresh (bool): Skip cached responses but store the new one
+        system_prefix (str or list, optional): Stable content sent before the prompt (see
+            query_llm)
+        policy (RetryPolicy, optional): Source of the request timeout (default: from the
+            environment)
         
-        if provider in ["openai", "local", "deepseek", "azure", "siliconflow"]:
-            messages = [{"role": "user", "content": []}]
-            
-            # Add text content
-            messages[0]["content"].append({
-                "type": "text",
-                "text": prompt
-            })
-            
-            # Add image content if provided
-            if image_path:
-                if provider == "openai":
-                    encoded_image, mime_type = encode_image_file(image_path)
-                    messages[0]["content"] = [
-                        {"type": "text", "text": prompt},
-                        {"type": "image_url", "image_url": {"url": f"data:{mime_type};base64,{encoded_image}"}}
-                    ]
-            
-            kwargs = {
-                "model": model,
-                "messages": messages,
-                "temperature": 0.7,
-            }
-            
-            # Add o1-specific parameters
-            if model == "o1":
-                kwargs["response_format"] = {"type": "text"}
-                kwargs["reasoning_effort"] = "low"
-                del kwargs["temperature"]
-            
-            response = client.chat.completions.create(**kwargs)
-            return response.choices[0].message.content
-            
-        elif provider == "anthropic":
-            messages = [{"role": "user", "content": []}]
-            
-            # Add text content
-            messages[0]["content"].append({
-                "type": "text",
-                "text": prompt
-            })
-            
-            # Add image content if provided
-            if image_path:
-                encoded_image, mime_type = encode_image_file(image_path)
-                messages[0]["content"].append({
-                    "type": "image",
-                    "source": {
-                        "type": "base64",
-                        "media_type": mime_type,
-                        "data": encoded_image
-                    }
-                })
-            
-            response = client.messages.create(
-                model=model,
-                max_tokens=1000,
-                messages=messages
-            )
-            return response.content[0].text
-            
-        elif provider == "gemini":
-            model = client.GenerativeModel(model)
-            if image_path:
-                file = genai.upload_file(image_path, mime_type="image/png")
-                chat_session = model.start_chat(
-                    history=[{
-                        "role": "user",
-                        "parts": [file, prompt]
-                    }]
-                )
-            else:
-                chat_session = model.start_chat(
-                    history=[{
-                        "role": "user",
-                        "parts": [prompt]
-                    }]
-                )
-            response = chat_session.send_message(prompt)
-            return response.text
-            
+    Returns:
+        LLMStream: Iterable of text deltas that records time to first token, total time and
+            token usage
+    """
+    return LLMStream(prompt, client, model, provider, image_path, cache, refresh, system_prefix,
+                     policy)
+
+async def _arequest_once(prompt: str, model: str, provider: str, image_path: Optional[str],
+                         timeout: float, system_prefix: Union[None, str, List[str]] = None,
+                         base_url: Optional[str] = None) -> Tuple[str, Dict[str, Optional[int]]]:
+    """Send one request with the provider's asyncio client; return (text, token usage)."""
+    if provider == "local" and base_url is None:
+        result: Tuple[str, Dict[str, Optional[int]]] = await local_endpoint_pool().acall(
+            lambda url: _arequest_once(prompt, model, provider, image_path, timeout,
+                                       system_prefix, base_url=url))
+        return result
+    client = get_llm_client(provider, async_client=True, base_url=base_url)
+    if provider in OPENAI_COMPATIBLE_PROVIDERS:
+        kwargs = _openai_request(prompt, model, provider, image_path, system_prefix)
+        response = await client.chat.completions.create(timeout=timeout, **kwargs)
+        return response.choices[0].message.content, response_usage(provider, response)
+    elif provider == "anthropic":
+        kwargs = _anthropic_request(prompt, model, image_path, system_prefix)
+        response = await client.messages.create(timeout=timeout, **kwargs)
+        return response.content[0].text, response_usage(provider, response)
+    elif provider == "gemini":
+        response = await _gemini_model(client, model, system_prefix).generate_content_async(
+            _gemini_parts(client, prompt, image_path), request_options={"timeout": timeout})
+        return response.text, response_usage(provider, response)
+    raise ValueError(f"Unsupported provider: {provider}")
+
+async def _aquery(prompt: str, model: Optional[str], provider: str,
+                  image_path: Optional[str] = None, policy: Optional[RetryPolicy] = None,
+                  failover: Optional[List[str]] = None,
+                  system_prefix: Union[None, str, List[str]] = None
+                  ) -> Tuple[str, str, str, Dict[str, Optional[int]]]:
+    """Asyncio version of _query_chain()."""
+    policy = policy or RetryPolicy()
+    chain = failover_chain(provider, model, failover)
+    for position, (provider, chain_model) in enumerate(chain):
+        info: Dict[str, Any] = {"retries": 0}
+        start = time.perf_counter()
+        try:
+            timeout = policy.timeout_for(provider)
+            request = functools.partial(_arequest_once, prompt, chain_model, provider, image_path,
+                                        timeout, system_prefix)
+            response, usage = await acall_with_policy(request, provider, chain_model, policy, info)
+            record_call(provider, chain_model, time.perf_counter() - start, usage,
+                        retries=info["retries"])
+            return response, provider, chain_model, usage
+        except Exception as e:
+            record_call(provider, chain_model, time.perf_counter() - start,
+                        retries=info["retries"], error=e)
+            if position + 1 == len(chain):
+                raise
+            print(f"Warning: {provider} failed ({e}); failing over to {chain[position + 1][0]}",
+                  file=sys.stderr)
+    raise ValueError("Empty failover chain")
+
+async def query_llm_async(prompt: str, model: Optional[str] = None, provider: str = "openai",
+                          image_path: Optional[str] = None, cache: Optional[bool] = None,
+                          refresh: bool = False, policy: Optional[RetryPolicy] = None,
+                          failover: Optional[List[str]] = None,
+                          system_prefix: Union[None, str, List[str]] = None,
+                          usage: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """
+    Asyncio version of query_llm(), using the provider's pooled async client.
+    
+    Args:
+        prompt (str): The text prompt to send
+        model (str, optional): The model to use
+        provider (str): The API provider to use
+        image_path (str, optional): Path to an image file to attach
+        cache (bool, optional): Use the response cache (default: $LLM_API_CACHE)
+        refresh (bool): Skip cached responses but store the new one
+        policy (RetryPolicy, optional): Timeouts, retries and hedging (default: from the
+            environment)
+        failover (list, optional): Providers to try in order if `provider` fails (default:
+            $LLM_API_FAILOVER)
+        system_prefix (str or list, optional): Stable content sent before the prompt (see
+            query_llm)
+        usage (dict, optional): Receives the token usage of the call (see query_llm)
+        
+    Returns:
+        Optional[str]: The LLM's response or None if there was an error
+    """
+    model = model or default_model(provider)
+    key = None
+    if _cache_enabled(cache):
+        key = cache_key(prompt, provider, model, image_path, system_prefix)
+        cached = None if refresh else get_response_cache().get(key)
+        if cached is not None:
+            record_call(provider, model, 0.0, cache_hit=True)
+            return cached
+    try:
+        response, served_by, _, call_usage = await _aquery(prompt, model, provider, image_path,
+                                                           policy, failover, system_prefix)
     except Exception as e:
         print(f"Error querying LLM: {e}", file=sys.stderr)
         return None
+    if usage is not None:
+        usage.update(call_usage)
+    if key is not None and response is not None and served_by == provider:
+        get_response_cache().put(key, response, provider, model)
+    return response
+
+class RateLimiter:
+    """
+    Sliding-window limit on requests and tokens per minute for one provider.
+    
+    Token use is estimated before each request (see estimate_request_tokens),
+    so the limit holds even while responses are still outstanding.
+    """
+    
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None,
+                 window: float = 60.0) -> None:
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window
+        self._events: Deque[Tuple[float, int]] = collections.deque()
+        self._tokens = 0
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self, tokens: int = 0) -> None:
+        """Wait until a request of the given estimated size fits in the window."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self._events and self._events[0][0] <= now - self.window:
+                    self._tokens -= self._events.popleft()[1]
+                fits_requests = self.rpm is None or len(self._events) < self.rpm
+                fits_tokens = (self.tpm is None or not self._events
+                               or self._tokens + tokens <= self.tpm)
+                if fits_requests and fits_tokens:
+                    self._events.append((now, tokens))
+                    self._tokens += tokens
+                    return
+                await asyncio.sleep(max(self._events[0][0] + self.window - now, 0.001))
+
+def estimate_request_tokens(prompt: str) -> int:
+    """Estimate a request's tokens: ~4 characters per prompt token plus the output limit."""
+    return len(prompt) // 4 + MAX_OUTPUT_TOKENS
+
+def _batch_item(index: int, item: Union[str, Dict[str, Any]], provider: str,
+                model: Optional[str]) -> Dict[str, Any]:
+    """Normalize a batch entry into a dict with index, id, prompt, provider, model and image."""
+    if isinstance(item, str):
+        item = {"prompt": item}
+    item_provider = item.get("provider", provider)
+    return {
+        "index": index,
+        "id": item.get("id", index),
+        "prompt": item["prompt"],
+        "provider": item_provider,
+        "model": (item.get("model") or (model if item_provider == provider else None)
+                  or default_model(item_provider)),
+        "image": item.get("image"),
+    }
+
+async def iter_llm_batch(prompts: Iterable[Union[str, Dict[str, Any]]], provider: str = "openai",
+                         model: Optional[str] = None, concurrency: int = 8,
+                         rpm: Optional[int] = None, tpm: Optional[int] = None,
+                         ordered: bool = False, cache: Optional[bool] = None,
+                         refresh: bool = False, policy: Optional[RetryPolicy] = None,
+                         failover: Optional[List[str]] = None,
+                         system_prefix: Union[None, str, List[str]] = None
+                         ) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Query many prompts concurrently, yielding results as they become available.
+    
+    At most `concurrency` requests are in flight. Each provider gets its own
+    requests-per-minute and tokens-per-minute limiter. Cached responses are
+    returned without waiting for either.
+    
+    Args:
+        prompts: Prompt strings, or dicts with "prompt" and optional "id", "provider",
+            "model" and "image"
+        provider (str): Provider for entries that do not name one
+        model (str, optional): Model for entries that do not name one
+        concurrency (int): Maximum requests in flight
+        rpm (int, optional): Requests per minute per provider (default: $LLM_API_RPM)
+        tpm (int, optional): Estimated tokens per minute per provider (default: $LLM_API_TPM)
+        ordered (bool): Yield results in input order instead of completion order
+        cache (bool, optional): Use the response cache (default: $LLM_API_CACHE)
+        refresh (bool): Skip cached responses but store the new ones
+        policy (RetryPolicy, optional): Timeouts, retries and hedging (default: from the
+            environment)
+        failover (list, optional): Providers to try in order if an entry's provider fails
+        system_prefix (str or list, optional): Stable content sent before every prompt, so the
+            provider can serve it from its prompt cache (see query_llm)
+        
+    Yields:
+        dict: "index", "id", "provider" and "model" that answered, "response"
+            (None on error), "error" (None on success), "cached", "latency" in seconds
+            and "usage" (token usage, None for cached or failed entries)
+    """
+    rpm = rpm or int(_env_number('LLM_API_RPM', 0)) or None
+    tpm = tpm or int(_env_number('LLM_API_TPM', 0)) or None
+    semaphore = asyncio.Semaphore(concurrency)
+    limiters: Dict[str, RateLimiter] = {}
+    response_cache = get_response_cache() if _cache_enabled(cache) else None
+    policy = policy or RetryPolicy()
+    
+    async def query(item: Dict[str, Any], result: Dict[str, Any]) -> float:
+        """Query the providers for an entry into its result; return when the request started."""
+        limiter = limiters.setdefault(item["provider"], RateLimiter(rpm, tpm))
+        async with semaphore:
+            await limiter.acquire(estimate_request_tokens(item["prompt"]))
+            start = time.perf_counter()
+            try:
+                response, result["provider"], result["model"], result["usage"] = await _aquery(
+                    item["prompt"], item["model"], item["provider"], item["image"], policy,
+                    failover, system_prefix)
+                result["response"] = response
+            except Exception as e:
+                result["error"] = f"{type(e).__name__}: {e}"
+        return start
+    
+    async def run(item: Dict[str, Any]) -> Dict[str, Any]:
+        result = {"index": item["index"], "id": item["id"], "provider": item["provider"],
+                  "model": item["model"], "response": None, "error": None, "cached": False,
+                  "usage": None}
+        start = time.perf_counter()
+        key = None
+        if response_cache is not None:
+            key = cache_key(item["prompt"], item["provider"], item["model"], item["image"],
+                            system_prefix)
+            result["response"] = None if refresh else response_cache.get(key)
+            result["cached"] = result["response"] is not None
+            if result["cached"]:
+                record_call(item["provider"], item["model"], time.perf_counter() - start,
+                            cache_hit=True)
+        if not result["cached"]:
+            start = await query(item, result)
+            if (response_cache is not None and key is not None and result["response"] is not None
+                    and result["provider"] == item["provider"]):
+                response_cache.put(key, result["response"], item["provider"], item["model"])
+        result["latency"] = round(time.perf_counter() - start, 4)
+        return result
+    
+    tasks = [asyncio.ensure_future(run(_batch_item(i, item, provider, model)))
+             for i, item in enumerate(prompts)]
+    try:
+        for next_done in tasks if ordered else asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def query_llm_batch(prompts: Iterable[Union[str, Dict[str, Any]]], provider: str = "openai",
+                          model: Optional[str] = None, concurrency: int = 8,
+                          rpm: Optional[int] = None, tpm: Optional[int] = None,
+                          cache: Optional[bool] = None, refresh: bool = False,
+                          policy: Optional[RetryPolicy] = None,
+                          failover: Optional[List[str]] = None,
+                          system_prefix: Union[None, str, List[str]] = None
+                          ) -> List[Dict[str, Any]]:
+    """
+    Query many prompts concurrently and return the results in input order.
+    
+    See iter_llm_batch() for the arguments and the result format.
+    """
+    results = iter_llm_batch(prompts, provider, model, concurrency, rpm, tpm, ordered=True,
+                             cache=cache, refresh=refresh, policy=policy, failover=failover,
+                             system_prefix=system_prefix)
+    return [result async for result in results]
+
+def read_prompts(path: str) -> List[Dict[str, Any]]:
+    """
+    Read batch prompts from a JSONL file, or from stdin if path is '-'.
+    
+    Each line is a JSON string or an object with a "prompt" key.
+    """
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        prompts: List[Dict[str, Any]] = []
+        for number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"prompt": item}
+            if not isinstance(item, dict) or "prompt" not in item:
+                raise ValueError(
+                    f"{path}:{number}: expected a string or an object with a \"prompt\" key")
+            prompts.append(item)
+        return prompts
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+async def _run_batch_cli(args: argparse.Namespace) -> int:
+    """Stream batch results to stdout as JSONL; return the number of failed prompts."""
+    failures = 0
+    try:
+        results = iter_llm_batch(read_prompts(args.prompts_file), args.provider, args.model,
+                                 args.concurrency, args.rpm, args.tpm, ordered=args.ordered,
+                                 cache=args.cache, refresh=args.refresh, policy=_cli_policy(args),
+                                 failover=args.failover, system_prefix=args.system_prefix)
+        async for result in results:
+            failures += result["error"] is not None
+            print(json.dumps(result, ensure_ascii=False), flush=True)
+    finally:
+        await aclose_llm_clients()
+    return failures
+
+# SDK module each provider imports on first use
+PROVIDER_SDK_MODULES: Dict[str, str] = {"anthropic": "anthropic", "gemini": "google.generativeai"}
+
+_IMPORT_BENCHMARK_PROBE = """
+import importlib, importlib.util, json, sys, time
+timings = {}
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location("_llm_api_probe", sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+timings["module"] = time.perf_counter() - start
+start = time.perf_counter()
+module.ensure_environment()
+timings["environment"] = time.perf_counter() - start
+start = time.perf_counter()
+importlib.import_module(sys.argv[2])
+timings["sdk"] = time.perf_counter() - start
+print(json.dumps(timings))
+"""
+
+def benchmark_imports(providers: Optional[List[str]] = None,
+                      runs: int = 3) -> Dict[str, Dict[str, float]]:
+    """
+    Measure start-up cost in fresh interpreters: importing this module, loading
+    the .env files and importing each provider's SDK.
+    
+    Args:
+        providers (list, optional): Providers to measure (default: one per SDK)
+        runs (int): Interpreters started per provider; the median is reported
+        
+    Returns:
+        dict: Seconds for "module", "environment", "sdk" and "total" per provider
+    """
+    import statistics
+    import subprocess
+    
+    providers = providers or ["openai", "anthropic", "gemini"]
+    results: Dict[str, Dict[str, float]] = {}
+    for provider in providers:
+        samples = []
+        for _ in range(runs):
+            # An argument list without a shell, running this interpreter
+            output = subprocess.run(  # noqa: S603
+                [sys.executable, "-c", _IMPORT_BENCHMARK_PROBE, os.path.abspath(__file__),
+                 PROVIDER_SDK_MODULES.get(provider, "openai")],
+                capture_output=True, text=True, check=True,
+            )
+            samples.append(json.loads(output.stdout.strip().splitlines()[-1]))
+        timings = {phase: round(statistics.median(sample[phase] for sample in samples), 4)
+                   for phase in ("module", "environment", "sdk")}
+        timings["total"] = round(sum(timings.values()), 4)
+        results[provider] = timings
+    return results
+
+STATS_PERCENTILES = (50, 90, 95, 99)
+
+def read_metrics(path: Optional[str] = None, since: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Load call records from the metrics log, skipping unreadable lines.
+    
+    Args:
+        path (str, optional): Metrics log (default: metrics_path())
+        since (float, optional): Only records from this Unix time on
+    """
+    path = path or metrics_path() or DEFAULT_METRICS_PATH
+    records: List[Dict[str, Any]] = []
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict) and (since is None or record.get("time", 0) >= since):
+                    records.append(record)
+    except FileNotFoundError:
+        pass
+    return records
+
+def summarize_metrics(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Aggregate call records per provider and model.
+    
+    Latency percentiles cover successful calls that reached the provider;
+    response cache hits are counted separately.
+    
+    Returns:
+        list: One summary per (provider, model), busiest first
+    """
+    groups: Dict[Tuple[Optional[str], Optional[str]], List[Dict[str, Any]]] = {}
+    for record in records:
+        groups.setdefault((record.get("provider"), record.get("model")), []).append(record)
+    
+    summaries: List[Dict[str, Any]] = []
+    for (provider, model), calls in groups.items():
+        served = [c for c in calls if c.get("status") == "ok" and not c.get("cache_hit")]
+        latencies = sorted(c["latency"] for c in served)
+        ttfts = sorted(c["ttft"] for c in served if c.get("ttft") is not None)
+        costs = [c["cost"] for c in calls if c.get("cost") is not None]
+        summary: Dict[str, Any] = {
+            "provider": provider,
+            "model": model,
+            "calls": len(calls),
+            "errors": sum(c.get("status") == "error" for c in calls),
+            "cache_hits": sum(bool(c.get("cache_hit")) for c in calls),
+            "retries": sum(c.get("retries") or 0 for c in calls),
+            "latency": {f"p{p}": _percentile(latencies, p) for p in STATS_PERCENTILES},
+            "ttft": {f"p{p}": _percentile(ttfts, p) for p in STATS_PERCENTILES},
+            "cost": round(sum(costs), 6) if costs else None,
+        }
+        for kind in ("input_tokens", "output_tokens", "cached_tokens"):
+            summary[kind] = sum(c.get(kind) or 0 for c in calls)
+        summaries.append(summary)
+    return sorted(summaries, key=lambda summary: (-summary["calls"], str(summary["provider"]),
+                                                  str(summary["model"])))
+
+def prometheus_metrics(summaries: List[Dict[str, Any]]) -> str:
+    """Render metric summaries in the Prometheus text exposition format."""
+    def labels(summary: Dict[str, Any], **extra: str) -> str:
+        values = {"provider": summary["provider"], "model": summary["model"], **extra}
+        pairs = []
+        for name, value in values.items():
+            value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+            pairs.append(f'{name}="{value}"')
+        return "{" + ",".join(pairs) + "}"
+    
+    lines = [
+        "# HELP llm_api_calls_total LLM calls by outcome.",
+        "# TYPE llm_api_calls_total counter",
+    ]
+    for summary in summaries:
+        lines.append(f"llm_api_calls_total{labels(summary, status='ok')} "
+                     f"{summary['calls'] - summary['errors'] - summary['cache_hits']}")
+        lines.append(f"llm_api_calls_total{labels(summary, status='error')} {summary['errors']}")
+        lines.append(f"llm_api_calls_total{labels(summary, status='cache_hit')} "
+                     f"{summary['cache_hits']}")
+    lines += ["# HELP llm_api_retries_total Retries made by LLM calls.",
+              "# TYPE llm_api_retries_total counter"]
+    lines += [f"llm_api_retries_total{labels(summary)} {summary['retries']}"
+              for summary in summaries]
+    lines += ["# HELP llm_api_tokens_total Tokens used by LLM calls.",
+              "# TYPE llm_api_tokens_total counter"]
+    for summary in summaries:
+        for kind in ("input", "output", "cached"):
+            lines.append(f"llm_api_tokens_total{labels(summary, kind=kind)} "
+                         f"{summary[kind + '_tokens']}")
+    lines += ["# HELP llm_api_cost_usd_total Estimated cost of LLM calls in USD.",
+              "# TYPE llm_api_cost_usd_total counter"]
+    lines += [f"llm_api_cost_usd_total{labels(summary)} {summary['cost']}"
+              for summary in summaries if summary["cost"] is not None]
+    for metric, key, description in (
+            ("llm_api_latency_seconds", "latency", "Latency of LLM calls."),
+            ("llm_api_ttft_seconds", "ttft", "Time to first streamed token.")):
+        lines += [f"# HELP {metric} {description}", f"# TYPE {metric} summary"]
+        for summary in summaries:
+            for name, value in summary[key].items():
+                if value is not None:
+                    quantile = str(int(name[1:]) / 100)
+                    lines.append(f"{metric}{labels(summary, quantile=quantile)} {value}")
+    return "\n".join(lines) + "\n"
+
+def write_prometheus_textfile(path: str, summaries: List[Dict[str, Any]]) -> None:
+    """Atomically write metric summaries for the node_exporter textfile collector."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(prometheus_metrics(summaries))
+    os.replace(tmp_path, path)
 
-def main():
-    parser = argparse.ArgumentParser(description='Query an LLM with a prompt')
-    parser.add_argument('--prompt', type=str, help='The prompt to send to the LLM', required=True)
-    parser.add_argument('--provider', choices=['openai','anthropic','gemini','local','deepseek','azure','siliconflow'], default='openai', help='The API provider to use')
-    parser.add_argument('--model', type=str, help='The model to use (default depends on provider)')
+def _format_seconds(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.3f}"
+
+def stats_main(argv: List[str]) -> int:
+    """Run `llm_api.py stats`: summarize the metrics log per provider and model."""
+    parser = argparse.ArgumentParser(
+        prog='llm_api.py stats', description='Summarize LLM call metrics per provider and model')
+    parser.add_argument('--metrics', type=str, help='Metrics log (default: $LLM_API_METRICS)')
+    parser.add_argument('--since', type=float, metavar='HOURS',
+                        help='Only calls from the last HOURS hours')
+    parser.add_argument('--json', action='store_true', help='Print the summary as JSON')
+    parser.add_argument('--prometheus', type=str, metavar='FILE',
+                        help='Also write the summary to FILE for the Prometheus textfile collector')
+    args = parser.parse_args(argv)
+    
+    since = time.time() - args.since * 3600 if args.since else None
+    summaries = summarize_metrics(read_metrics(args.metrics, since))
+    if args.prometheus:
+        write_prometheus_textfile(args.prometheus, summaries)
+    if args.json:
+        print(json.dumps(summaries, indent=2))
+        return 0
+    if not summaries:
+        print("No LLM calls recorded. Set LLM_API_METRICS=1 (or pass --metrics) to record them.")
+        return 0
+    print(f"{'provider':<12} {'model':<30} {'calls':>6} {'err':>4} {'hits':>5} "
+          f"{'p50':>7} {'p95':>7} {'p99':>7} {'ttft50':>7} {'in tok':>9} {'out tok':>8} "
+          f"{'cost $':>9}")
+    for summary in summaries:
+        cost = "-" if summary["cost"] is None else f"{summary['cost']:.4f}"
+        latency = summary['latency']
+        print(f"{str(summary['provider']):<12} {str(summary['model'])[:30]:<30} "
+              f"{summary['calls']:>6} {summary['errors']:>4} {summary['cache_hits']:>5} "
+              f"{_format_seconds(latency['p50']):>7} {_format_seconds(latency['p95']):>7} "
+              f"{_format_seconds(latency['p99']):>7} {_format_seconds(summary['ttft']['p50']):>7} "
+              f"{summary['input_tokens']:>9} {summary['output_tokens']:>8} {cost:>9}")
+    return 0
+
+def _cli_policy(args: argparse.Namespace) -> RetryPolicy:
+    """Build the retry policy of a CLI invocation."""
+    return RetryPolicy(retries=args.retries, timeout=args.timeout, hedge=args.hedge)
+
+def _report_prompt_cache(usage: Optional[Dict[str, Any]]) -> None:
+    """Report on stderr how much of a call's input was read from the provider's prompt cache."""
+    if usage and usage.get("input_tokens"):
+        print(f"Prompt cache: {usage.get('cached_tokens') or 0} of {usage['input_tokens']} input "
+              f"tokens read from cache", file=sys.stderr)
+
+def _cli_parser() -> argparse.ArgumentParser:
+    """Build the parser of the query command line."""
+    parser = argparse.ArgumentParser(
+        description='Query an LLM with a prompt',
+        epilog='Run "llm_api.py stats" to summarize recorded call metrics.')
+    prompt_group = parser.add_mutually_exclusive_group(required=True)
+    prompt_group.add_argument('--prompt', type=str, help='The prompt to send to the LLM')
+    prompt_group.add_argument('--prompts-file', type=str,
+                              help='JSONL file of prompts to query concurrently ("-" for stdin); '
+                                   'results are written to stdout as JSONL')
+    prompt_group.add_argument('--cache-stats', action='store_true',
+                              help='Print response cache statistics as JSON')
+    prompt_group.add_argument('--benchmark-imports', action='store_true',
+                              help='Measure module, .env and SDK import times '
+                                   '(use --provider to pick one SDK)')
+    parser.add_argument('--provider', choices=PROVIDERS,
+                        help='The API provider to use (default: openai)')
+    parser.add_argument('--model', type=str,
+                        help='The model to use (default depends on provider)')
     parser.add_argument('--image', type=str, help='Path to an image file to attach to the prompt')
-    args = parser.parse_args()
+    parser.add_argument('--cache-prefix', nargs='+', metavar='FILE',
+                        help='Files (such as rules and memory) sent before the prompt, in order, '
+                             'for the provider to cache')
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='Batch requests in flight (default: 8)')
+    parser.add_argument('--rpm', type=int, help='Batch requests per minute per provider')
+    parser.add_argument('--tpm', type=int, help='Batch estimated tokens per minute per provider')
+    parser.add_argument('--ordered', action='store_true', help='Write batch results in input order')
+    cache_group = parser.add_mutually_exclusive_group()
+    cache_group.add_argument('--cache', dest='cache', action='store_true', default=None,
+                             help='Reuse cached responses to identical requests '
+                                  '(default: $LLM_API_CACHE)')
+    cache_group.add_argument('--no-cache', dest='cache', action='store_false',
+                             help='Do not use the response cache')
+    parser.add_argument('--stream', action='store_true',
+                        help='Print the response as it is generated; timings are reported on '
+                             'stderr')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Query the provider even if a response is cached, and cache the new '
+                             'response')
+    parser.add_argument('--timeout', type=float,
+                        help='Seconds before a request is abandoned '
+                             '(default: $LLM_API_TIMEOUT or 60)')
+    parser.add_argument('--retries', type=int,
+                        help='Retries for rate limits, overload and timeouts (default: 2)')
+    parser.add_argument('--hedge', nargs='?', const='p95', metavar='SECONDS',
+                        help='Send a duplicate request when the first is slower than SECONDS '
+                             '(default: the recent p95 latency)')
+    parser.add_argument('--failover', type=_comma_list, metavar='PROVIDER,...',
+                        help='Providers to try in order if --provider fails')
+    parser.add_argument('--local-endpoints', type=_comma_list, metavar='URL,...',
+                        help='Base URLs of local endpoints to balance across '
+                             '(default: $LOCAL_LLM_ENDPOINTS)')
+    parser.add_argument('--metrics', nargs='?', const=DEFAULT_METRICS_PATH, metavar='FILE',
+                        help='Append per-call metrics to FILE (default: $LLM_API_METRICS)')
+    parser.add_argument('--verbose', action='store_true',
+                        help='Report the .env files and keys loaded on stderr')
+    return parser
 
-    if not args.model:
-        if args.provider == 'openai':
-            args.model = "gpt-4o" 
-        elif args.provider == "deepseek":
-            args.model = "deepseek-chat"
-        elif args.provider == "siliconflow":
-            args.model = "deepseek-ai/DeepSeek-R1"
-        elif args.provider == 'anthropic':
-            args.model = "claude-3-7-sonnet-20250219"
-        elif args.provider == 'gemini':
-            args.model = "gemini-2.0-flash-exp"
-        elif args.provider == 'azure':
-            args.model = os.getenv('AZURE_OPENAI_MODEL_DEPLOYMENT', 'gpt-4o-ms')  # Get from env with fallback
-
-    client = create_llm_client(args.provider)
-    response = query_llm(args.prompt, client, model=args.model, provider=args.provider, image_path=args.image)
+def _comma_list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+def _apply_cli_settings(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    """Validate the arguments and apply the global settings they make."""
+    if args.stream and (args.retries is not None or args.hedge or args.failover):
+        parser.error("--retries, --hedge and --failover cannot be used with --stream "
+                     "(only --timeout applies)")
+    if args.verbose:
+        load_environment(verbose=True)
+    if args.metrics:
+        global METRICS_PATH
+        METRICS_PATH = args.metrics
+    if args.local_endpoints:
+        configure_local_endpoints(args.local_endpoints)
+    if args.refresh and args.cache is None:
+        args.cache = True
+    args.system_prefix = None
+    if args.cache_prefix:
+        try:
+            args.system_prefix = read_prefix_files(args.cache_prefix)
+        except OSError as e:
+            print(f"Error: Could not read prefix file: {e}", file=sys.stderr)
+            sys.exit(1)
+
+def _print_import_benchmark(provider: Optional[str]) -> None:
+    """Print the start-up cost of one provider's SDK, or of every SDK."""
+    providers = [provider] if provider else None
+    for name, timings in benchmark_imports(providers).items():
+        print(f"{name:<10} module {timings['module']:.3f}s  env {timings['environment']:.3f}s  "
+              f"sdk {timings['sdk']:.3f}s  total {timings['total']:.3f}s")
+
+def _stream_cli(args: argparse.Namespace) -> None:
+    """Print a response as it is generated, with its timings on stderr."""
+    stream = stream_llm(args.prompt, model=args.model, provider=args.provider,
+                        image_path=args.image, cache=args.cache, refresh=args.refresh,
+                        system_prefix=args.system_prefix, policy=_cli_policy(args))
+    try:
+        for delta in stream:
+            print(delta, end="", flush=True)
+    except Exception as e:
+        print(f"\nError querying LLM: {e}", file=sys.stderr)
+        sys.exit(1)
+    print()
+    if stream.ttft is not None:
+        print(f"time to first token: {stream.ttft:.3f}s, total: {stream.total_time:.3f}s"
+              f"{' (cached)' if stream.cached else ''}", file=sys.stderr)
+    if args.system_prefix:
+        _report_prompt_cache(stream.usage)
+
+def _query_cli(args: argparse.Namespace) -> None:
+    """Print the response to a single prompt."""
+    usage: Dict[str, Any] = {}
+    response = query_llm(args.prompt, model=args.model, provider=args.provider,
+                         image_path=args.image, cache=args.cache, refresh=args.refresh,
+                         policy=_cli_policy(args), failover=args.failover,
+                         system_prefix=args.system_prefix, usage=usage)
+    if args.system_prefix:
+        _report_prompt_cache(usage)
     if response:
         print(response)
     else:
         print("Failed to get response from LLM")
 
+def main() -> None:
+    if sys.argv[1:2] == ['stats']:
+        sys.exit(stats_main(sys.argv[2:]))
+    
+    parser = _cli_parser()
+    args = parser.parse_args()
+    _apply_cli_settings(parser, args)
+
+    if args.benchmark_imports:
+        _print_import_benchmark(args.provider)
+        return
+
+    if args.cache_stats:
+        print(json.dumps(get_response_cache().stats(), indent=2))
+        return
+
+    args.provider = args.provider or 'openai'
+
+    if args.prompts_file:
+        failures = asyncio.run(_run_batch_cli(args))
+        sys.exit(1 if failures else 0)
+
+    if not args.model:
+        args.model = default_model(args.provider)
+
+    if args.stream:
+        _stream_cli(args)
+    else:
+        _query_cli(args)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
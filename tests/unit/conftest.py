@@ -63,3 +63,207 @@ def mock_rule_manager_env(temp_dir):
         f.write("API_KEY=your-api-key-here")
     
     return project_root
+
+
+class StubLLMServer:
+    """
+    Local OpenAI/Anthropic-compatible HTTP server for testing llm_api.
+    
+    Successful responses echo the last user message. Queue entries in
+    ``responses`` (dicts with optional 'status', 'headers', 'delay', 'body')
+    to inject errors and latency into the next requests. ``max_in_flight``
+    records the most POST requests handled at once. Repeated system prefixes
+    are reported as prompt-cache reads, like the real providers do.
+    """
+
+    PREFIX_TOKENS = 8
+
+    def __init__(self):
+        import collections
+        import threading
+        from http.server import ThreadingHTTPServer
+
+        self.responses = collections.deque()
+        self.delay = 0.0
+        self.requests = []
+        self.connections = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.prefixes = set()
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_port}/v1"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def _handler(self):
+        import json
+        import time
+        from http.server import BaseHTTPRequestHandler
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, payload, headers=None, content_type="application/json"):
+                data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                with server.lock:
+                    server.requests.append((self.path, None))
+                    scripted = server.responses.popleft() if server.responses else {}
+                time.sleep(scripted.get("delay", 0.0))
+                status = scripted.get("status", 200)
+                self._send(status, {"object": "list", "data": [{"id": "stub-model"}]})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with server.lock:
+                    server.connections.add(self.client_address)
+                    server.requests.append((self.path, body))
+                    scripted = server.responses.popleft() if server.responses else {}
+                    prefix = server.cacheable_prefix(self.path, body)
+                    cached = prefix in server.prefixes if prefix else None
+                    if prefix:
+                        server.prefixes.add(prefix)
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    time.sleep(scripted.get("delay", server.delay))
+                finally:
+                    with server.lock:
+                        server.in_flight -= 1
+                status = scripted.get("status", 200)
+                if status != 200:
+                    error = {"error": {"message": f"stub error {status}", "type": "stub_error"}}
+                    self._send(status, scripted.get("body", error), scripted.get("headers"))
+                    return
+                text = f"echo: {server.last_user_text(body)}"
+                if self.path.endswith("/messages") and body.get("stream"):
+                    self._send(200, server.anthropic_stream(body, text), content_type="text/event-stream")
+                elif self.path.endswith("/messages"):
+                    self._send(200, scripted.get("body", server.anthropic_message(body, text, cached)))
+                elif body.get("stream"):
+                    self._send(200, server.openai_stream(body, text), content_type="text/event-stream")
+                else:
+                    self._send(200, scripted.get("body", server.openai_completion(body, text, cached)))
+
+        return Handler
+
+    @staticmethod
+    def last_user_text(body):
+        """Return the text of the last user message of a request."""
+        content = [m for m in body.get("messages", []) if m.get("role") == "user"][-1]["content"]
+        if isinstance(content, str):
+            return content
+        return "".join(part.get("text", "") for part in content if part.get("type") == "text")
+
+    @staticmethod
+    def cacheable_prefix(path, body):
+        """Return the prefix a provider would cache for a request, or None."""
+        if path.endswith("/messages"):
+            system = body.get("system")
+            if isinstance(system, list) and system and "cache_control" in system[-1]:
+                return "".join(block["text"] for block in system)
+            return None
+        messages = body.get("messages", [])
+        if messages and messages[0].get("role") in ("system", "developer"):
+            return messages[0]["content"]
+        return None
+
+    @staticmethod
+    def openai_completion(body, text, cached=None):
+        usage = {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+        if cached is not None:
+            usage["prompt_tokens_details"] = {"cached_tokens": StubLLMServer.PREFIX_TOKENS if cached else 0}
+        return {
+            "id": "chatcmpl-stub", "object": "chat.completion", "created": 0,
+            "model": body.get("model", "stub-model"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": text}}],
+            "usage": usage,
+        }
+
+    @staticmethod
+    def openai_stream(body, text):
+        import json
+
+        chunks = []
+        for i in range(0, len(text), 4):
+            chunks.append({
+                "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": 0,
+                "model": body.get("model", "stub-model"),
+                "choices": [{"index": 0, "delta": {"content": text[i:i + 4]}, "finish_reason": None}],
+            })
+        events = "".join(f"data: {json.dumps(chunk)}\n\n" for chunk in chunks)
+        return (events + "data: [DONE]\n\n").encode()
+
+    @staticmethod
+    def anthropic_message(body, text, cached=None):
+        usage = {"input_tokens": 10, "output_tokens": 5}
+        if cached is not None:
+            # Anthropic counts cache reads and writes apart from the other input tokens
+            usage["input_tokens"] -= StubLLMServer.PREFIX_TOKENS
+            usage["cache_read_input_tokens" if cached else "cache_creation_input_tokens"] = StubLLMServer.PREFIX_TOKENS
+        return {
+            "id": "msg_stub", "type": "message", "role": "assistant",
+            "model": body.get("model", "stub-model"), "stop_reason": "end_turn",
+            "content": [{"type": "text", "text": text}],
+            "usage": usage,
+        }
+
+    @staticmethod
+    def anthropic_stream(body, text):
+        import json
+
+        message = StubLLMServer.anthropic_message(body, "")
+        message["content"] = []
+        events = [("message_start", {"type": "message_start", "message": message}),
+                  ("content_block_start", {"type": "content_block_start", "index": 0,
+                                           "content_block": {"type": "text", "text": ""}})]
+        for i in range(0, len(text), 4):
+            events.append(("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                   "delta": {"type": "text_delta", "text": text[i:i + 4]}}))
+        events += [("content_block_stop", {"type": "content_block_stop", "index": 0}),
+                   ("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn"},
+                                      "usage": {"output_tokens": 5}}),
+                   ("message_stop", {"type": "message_stop"})]
+        return "".join(f"event: {name}\ndata: {json.dumps(data)}\n\n" for name, data in events).encode()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def llm_stub_server():
+    """Run a local OpenAI/Anthropic-compatible stub server for the duration of a test."""
+    server = StubLLMServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def make_llm_stub_server():
+    """Start additional stub servers on demand; all are stopped after the test."""
+    servers = []
+
+    def make():
+        servers.append(StubLLMServer())
+        return servers[-1]
+
+    yield make
+    for server in servers:
+        server.close()
@@ -0,0 +1,91 @@
+"""Unit tests for the prebuilt rule set catalog and `list-rules --json`."""
+
+import json
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from rulebook_ai import cli, sources
+from rulebook_ai.catalog import load_cached_catalog, load_catalog
+from rulebook_ai.core import RuleManager
+
+
+@pytest.fixture
+def local_rule_sets(temp_dir, monkeypatch):
+    """Point a RuleManager at a writable copy of two small rule sets, with a private user cache."""
+    monkeypatch.setenv(sources.CACHE_DIR_ENV, str(Path(temp_dir) / "cache"))
+    rule_sets = Path(temp_dir) / "rule_sets"
+    (rule_sets / "alpha" / "01-rules").mkdir(parents=True)
+    (rule_sets / "alpha" / "01-rules" / "01-meta.md").write_text("x" * 10)
+    (rule_sets / "alpha" / "02-rules-architect").mkdir()
+    (rule_sets / "alpha" / "02-rules-architect" / "01-plan.md").write_text("y" * 6)
+    (rule_sets / "alpha" / "memory_starters").mkdir()
+    (rule_sets / "alpha" / "memory_starters" / "notes.md").write_text("not a rule")
+    manager = RuleManager(project_root=temp_dir)
+    manager.source_rules_dir = rule_sets
+    return manager, rule_sets
+
+
+def test_shipped_catalog_is_current():
+    manager = RuleManager()
+    shipped = load_catalog(manager.source_rules_dir)
+    assert shipped is not None, "run 'rulebook-ai list-rules --refresh' to build the catalog"
+    assert shipped == {
+        name: manager.describe_rule_set(manager.source_rules_dir / name)
+        for name in shipped
+    }
+
+
+def test_describe_rule_set(local_rule_sets):
+    manager, rule_sets = local_rule_sets
+    assert manager.describe_rule_set(rule_sets / "alpha") == {
+        "files": 2,
+        "bytes": 16,
+        "tokens": 4,
+        "modes": ["architect"],
+        "memory_starters": True,
+        "tool_starters": False,
+    }
+
+
+def test_catalog_is_reused_and_extended_for_new_sets(local_rule_sets, monkeypatch):
+    manager, rule_sets = local_rule_sets
+    assert list(manager.rule_set_catalog()) == ["alpha"]
+    assert load_catalog(rule_sets) is None
+    assert set(load_cached_catalog(rule_sets)) == {"alpha"}
+
+    shutil.copytree(rule_sets / "alpha", rule_sets / "beta")
+    described = []
+    original = manager.describe_rule_set
+    monkeypatch.setattr(manager, "describe_rule_set",
+                        lambda path: described.append(path.name) or original(path))
+
+    assert manager.list_rules() == ["alpha", "beta"]
+    assert described == ["beta"]
+    assert set(load_cached_catalog(rule_sets)) == {"alpha", "beta"}
+    assert load_catalog(rule_sets) is None
+
+
+def test_edited_sets_are_described_again(local_rule_sets):
+    manager, rule_sets = local_rule_sets
+    assert manager.rule_set_catalog(refresh=True)["alpha"]["files"] == 2
+    assert load_catalog(rule_sets)["alpha"]["files"] == 2
+
+    rules_dir = rule_sets / "alpha" / "01-rules"
+    (rules_dir / "02-style.md").write_text("z" * 8)
+    future = (rule_sets / "catalog.json").stat().st_mtime_ns + 10**9
+    os.utime(rules_dir, ns=(future, future))
+
+    assert manager.rule_set_catalog()["alpha"]["files"] == 3
+    assert load_catalog(rule_sets)["alpha"]["files"] == 2
+
+
+def test_list_rules_json(local_rule_sets, monkeypatch, capsys):
+    manager, _ = local_rule_sets
+    monkeypatch.setattr(cli, "RuleManager", lambda: manager)
+
+    assert cli.main(["list-rules", "--json"]) == 0
+    output = json.loads(capsys.readouterr().out)
+    assert output["rule_sets"]["alpha"]["modes"] == ["architect"]
@@ -0,0 +1,91 @@
+"""Unit tests for per-assistant conditional sections in rule files."""
+
+from pathlib import Path
+
+import pytest
+
+from rulebook_ai import templates
+from rulebook_ai.core import RuleManager
+from rulebook_ai.templates import TemplateError, compile_template
+
+RULE = """# Workflow
+<!-- if assistant == "cursor" -->
+Reference files with @file.
+<!-- elif assistant in ["cline", "roo"] -->
+Read memory/ first.
+<!-- else -->
+Open the relevant files.
+<!-- endif -->
+Done. <!-- if assistant != "copilot" -->(IDE)<!-- endif -->
+<!-- a normal comment -->
+"""
+
+
+@pytest.fixture
+def project(temp_dir):
+    """Create project_rules/ with one conditional rule."""
+    project_root = Path(temp_dir)
+    (project_root / "project_rules").mkdir()
+    (project_root / "project_rules" / "01-workflow.md").write_text(RULE)
+    return RuleManager(project_root=str(project_root)), project_root
+
+
+def test_render_selects_branch_per_assistant():
+    template = compile_template(RULE)
+    assert template.render("cursor") == (
+        "# Workflow\nReference files with @file.\nDone. (IDE)\n<!-- a normal comment -->\n"
+    )
+    assert "Read memory/ first." in template.render("roo")
+    assert template.render("copilot") == (
+        "# Workflow\nOpen the relevant files.\nDone. \n<!-- a normal comment -->\n"
+    )
+
+
+@pytest.mark.parametrize("text", [
+    "<!-- if assistant == \"cursor\" -->open",
+    "<!-- endif -->",
+    "<!-- if assistant ~ \"cursor\" -->x<!-- endif -->",
+    "<!-- if assistant == \"a\" -->x<!-- else -->y<!-- elif assistant == \"b\" -->z<!-- endif -->",
+])
+def test_malformed_directives_raise(text):
+    with pytest.raises(TemplateError):
+        compile_template(text)
+
+
+def test_sync_renders_each_assistant_from_one_compile(project, monkeypatch):
+    manager, project_root = project
+    compiled = []
+
+    def counting_compile(text):
+        compiled.append(text)
+        return compile_template(text)
+
+    monkeypatch.setattr(templates, "compile_template", counting_compile)
+    assert manager.sync(assistants=['cursor', 'cline']) == 0
+
+    assert len(compiled) == 1
+    cursor_text = (project_root / ".cursor" / "rules" / "01-workflow.mdc").read_text()
+    cline_text = (project_root / ".clinerules" / "01-workflow").read_text()
+    copilot_text = (project_root / ".github" / "copilot-instructions.md").read_text()
+    assert "@file" in cursor_text and "memory/" not in cursor_text
+    assert "memory/" in cline_text and "@file" not in cline_text
+    assert "Open the relevant files." in copilot_text and "(IDE)" not in copilot_text
+
+
+def test_edited_source_is_recompiled(project):
+    manager, project_root = project
+    assert manager.sync(assistants=['cline']) == 0
+    (project_root / "project_rules" / "01-workflow.md").write_text(
+        RULE.replace("Read memory/ first.", "Read memory/ and tasks/ first.")
+    )
+    assert manager.sync(assistants=['cline']) == 0
+    assert "tasks/" in (project_root / ".clinerules" / "01-workflow").read_text()
+
+
+def test_malformed_rule_is_reported_not_written(project, capsys):
+    manager, project_root = project
+    (project_root / "project_rules" / "02-broken.md").write_text("<!-- if assistant == \"cline\" -->x")
+    assert manager.sync(assistants=['cline'], include_copilot=False) == 0
+
+    assert not (project_root / ".clinerules" / "02-broken").exists()
+    assert "Error rendering" in capsys.readouterr().out
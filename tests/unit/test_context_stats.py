@@ -0,0 +1,71 @@
+"""Unit tests for the `stats` context-cost profiler."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from rulebook_ai import cli
+from rulebook_ai.context_cost import ALWAYS, ON_DEMAND, SCOPED, approximate_tokens, loading_class
+from rulebook_ai.core import RuleManager
+
+SHARED = "Shared guidance paragraph that is long enough to be reported when two rule files repeat it."
+
+
+@pytest.fixture
+def installed_project(temp_dir):
+    """Sync a small project for Cursor, Cline and RooCode."""
+    project_root = Path(temp_dir)
+    rules_dir = project_root / "project_rules"
+    (rules_dir / "01-rules").mkdir(parents=True)
+    (rules_dir / "01-rules" / "01-always.md").write_text(
+        f"---\nalwaysApply: true\n---\nAlways on.\n\n{SHARED}\n")
+    (rules_dir / "01-rules" / "02-python.md").write_text(
+        f'---\nglobs: "**/*.py"\n---\nPython only.\n\n{SHARED}\n')
+    (rules_dir / "02-rules-code").mkdir()
+    (rules_dir / "02-rules-code" / "01-code.md").write_text("Code mode rule.\n")
+
+    manager = RuleManager(project_root=str(project_root))
+    assert manager.sync(assistants=['cursor', 'cline', 'roo'], include_copilot=False) == 0
+    return manager
+
+
+def test_approximate_tokens():
+    assert approximate_tokens("") == 0
+    assert approximate_tokens("the cat sat") == 3
+    assert approximate_tokens("internationalization") == 4
+    assert approximate_tokens("**bold**") == 3
+
+
+def test_loading_classes_follow_assistant_rules():
+    assert loading_class('cursor', 'a.mdc', "---\nalwaysApply: true\n---\nx") == ALWAYS
+    assert loading_class('cursor', 'a.mdc', "---\nglobs: *.py\n---\nx") == SCOPED
+    assert loading_class('cursor', 'a.mdc', "no frontmatter") == ON_DEMAND
+    assert loading_class('windsurf', 'a.md', "no frontmatter") == ALWAYS
+    assert loading_class('windsurf', 'a.md', "---\ntrigger: model_decision\n---\nx") == ON_DEMAND
+    assert loading_class('copilot', '.github/instructions/py.instructions.md', "x") == SCOPED
+    assert loading_class('roo', '.roo/rules-code/01-code.md', "x", mode="code") == SCOPED
+
+
+def test_context_stats_per_assistant_and_mode(installed_project):
+    report = installed_project.context_stats()
+    assistants = report["assistants"]
+
+    assert assistants["cursor"]["always"]["files"] == 1
+    assert assistants["cursor"]["scoped"]["files"] == 1
+    assert assistants["cline"]["always"]["files"] == 3
+    roo = assistants["roo"]
+    assert set(roo["modes"]) == {"default", "code"}
+    assert roo["modes"]["code"]["tokens"] > roo["modes"]["default"]["tokens"]
+    assert roo["load_tokens"] == roo["modes"]["code"]["tokens"]
+    assert {d["assistant"] for d in report["duplicates"]} == {"cursor", "cline", "roo"}
+    assert report["heaviest"][0]["tokens"] >= report["heaviest"][-1]["tokens"]
+
+
+def test_stats_fail_over_budget(installed_project, monkeypatch, capsys):
+    monkeypatch.setattr(cli, "RuleManager", lambda: installed_project)
+
+    assert cli.main(["stats", "--json", "--fail-over", "100000"]) == 0
+    assert json.loads(capsys.readouterr().out)["over_budget"] == []
+    assert cli.main(["stats", "--fail-over", "5"]) == 1
+    assert "Over the 5-token budget: cursor, cline, roo" in capsys.readouterr().out
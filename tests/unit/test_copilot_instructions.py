@@ -0,0 +1,118 @@
+"""Unit tests for compact, path-scoped GitHub Copilot instructions."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from rulebook_ai.core import RuleManager
+from rulebook_ai.frontmatter import parse_globs, split_frontmatter
+
+
+@pytest.fixture
+def project(temp_dir):
+    """Create a project with always-on and path-scoped rules."""
+    project_root = Path(temp_dir)
+    rules_dir = project_root / "project_rules"
+    (rules_dir / "01-rules").mkdir(parents=True)
+    (rules_dir / "01-rules" / "01-meta.md").write_text(
+        "---\ndescription: Always on\nglobs:\nalwaysApply: true\n---\n\n# Meta\nAlways apply this."
+    )
+    (rules_dir / "02-rules-code").mkdir()
+    (rules_dir / "02-rules-code" / "01-python.md").write_text(
+        '---\nglobs: ["**/*.py", "**/*.pyi"]\n---\n\nUse type hints.'
+    )
+    return RuleManager(project_root=str(project_root)), project_root
+
+
+def test_split_frontmatter_and_globs():
+    fields, body = split_frontmatter("---\nglobs: src/*.py, tests/*.py\n---\nBody\n")
+    assert body == "Body\n"
+    assert parse_globs(fields["globs"]) == ["src/*.py", "tests/*.py"]
+    assert split_frontmatter("No frontmatter") == ({}, "No frontmatter")
+    assert parse_globs("") == parse_globs("[]") == []
+
+
+def test_core_file_is_compact(project):
+    manager, project_root = project
+    assert manager.sync(assistants=['cline']) == 0
+
+    core = (project_root / ".github" / "copilot-instructions.md").read_text()
+    assert core == "# Meta\nAlways apply this.\n"
+    assert "---" not in core and "01-meta.md" not in core
+
+
+def test_globbed_rule_becomes_scoped_instruction_file(project):
+    manager, project_root = project
+    assert manager.sync(assistants=['cline']) == 0
+
+    scoped = project_root / ".github" / "instructions" / "rules-code-python.instructions.md"
+    assert scoped.read_text() == '---\napplyTo: "**/*.py,**/*.pyi"\n---\n\nUse type hints.\n'
+
+
+def test_config_apply_to_scopes_directory(project):
+    manager, project_root = project
+    (project_root / "project_rules" / ".rulebook.json").write_text(
+        json.dumps({"copilot": {"apply_to": {"01-rules": ["docs/**"]}}})
+    )
+    assert manager.sync(assistants=['cline']) == 0
+
+    instructions_dir = project_root / ".github" / "instructions"
+    assert (instructions_dir / "rules-meta.instructions.md").read_text().startswith(
+        '---\napplyTo: "docs/**"\n---'
+    )
+    assert (project_root / ".github" / "copilot-instructions.md").read_text() == "\n"
+
+
+def test_colliding_scoped_names_keep_their_prefixes(project):
+    manager, project_root = project
+    rules_dir = project_root / "project_rules"
+    (rules_dir / "rules-code").mkdir()
+    (rules_dir / "rules-code" / "python.md").write_text('---\nglobs: "**/*.py"\n---\n\nSecond set.')
+    assert manager.sync(assistants=['cline']) == 0
+
+    instructions_dir = project_root / ".github" / "instructions"
+    assert sorted(p.name for p in instructions_dir.iterdir()) == [
+        "02-rules-code-01-python.instructions.md", "rules-code-python.instructions.md",
+    ]
+    assert (instructions_dir / "rules-code-python.instructions.md").read_text().endswith("Second set.\n")
+
+
+@pytest.mark.parametrize("config", [{"copilot": "docs/**"}, {"copilot": {"apply_to": ["docs/**"]}},
+                                    {"copilot": {"apply_to": {"01-rules": 3}}}])
+def test_malformed_copilot_config_is_reported(project, config, capsys):
+    manager, project_root = project
+    (project_root / "project_rules" / ".rulebook.json").write_text(json.dumps(config))
+    assert manager.sync(assistants=['cline']) == 0
+
+    assert "Warning: Ignoring rule set config \"copilot" in capsys.readouterr().out
+    assert (project_root / ".github" / "copilot-instructions.md").read_text() == "# Meta\nAlways apply this.\n"
+
+
+def test_budget_warn_and_fail(project, capsys):
+    manager, project_root = project
+    core_file = project_root / ".github" / "copilot-instructions.md"
+
+    assert manager.sync(assistants=['cline'], copilot_budget=5) == 0
+    assert "over the 5-byte budget" in capsys.readouterr().out
+    assert core_file.exists()
+
+    core_file.unlink()
+    assert manager.sync(assistants=['cline'], copilot_budget=5, copilot_budget_action='fail') == 1
+    assert not core_file.exists()
+
+
+def test_stale_scoped_files_are_removed(project):
+    manager, project_root = project
+    assert manager.sync(assistants=['cline']) == 0
+    scoped = project_root / ".github" / "instructions" / "rules-code-python.instructions.md"
+    handwritten = project_root / ".github" / "instructions" / "mine.instructions.md"
+    handwritten.write_text("Kept")
+
+    (project_root / "project_rules" / "02-rules-code" / "01-python.md").unlink()
+    assert manager.sync(assistants=['cline']) == 0
+    assert not scoped.exists()
+    assert handwritten.exists()
+
+    assert manager.clean_rules() == 0
+    assert handwritten.exists()
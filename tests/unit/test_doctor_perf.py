@@ -0,0 +1,57 @@
+"""Unit tests for `doctor --perf` diagnostics."""
+
+from pathlib import Path
+
+from rulebook_ai import cli
+from rulebook_ai.core import RuleManager
+from rulebook_ai.diagnostics import evaluate, installed_versions
+
+
+def test_installed_versions_single_pass():
+    versions = installed_versions(["PyTest", "no-such-package-xyz"])
+    assert versions["PyTest"] is not None
+    assert versions["no-such-package-xyz"] is None
+
+
+def test_evaluate_marks_checks_over_threshold():
+    report = {
+        "filesystem": {"stat": {"median": 0.01, "max": 0.2}},
+        "imports": {"slow.py": {"seconds": 2.5, "error": None},
+                    "broken.py": {"seconds": 0.1, "error": "ImportError: x"}},
+        "render": {"cline": 0.01},
+        "rule_tree": {"tokens": 50},
+    }
+    statuses = {check["name"]: check["status"] for check in evaluate(report)}
+    assert statuses == {
+        "fs.stat_ms": "ok",
+        "import slow.py": "warn",
+        "import broken.py": "warn",
+        "render cline": "ok",
+        "rule tree tokens": "ok",
+    }
+
+
+def test_perf_report_does_not_touch_project(temp_dir):
+    project_root = Path(temp_dir) / "project"
+    (project_root / "project_rules").mkdir(parents=True)
+    (project_root / "project_rules" / "01-first.md").write_text("First rule")
+    tools = Path(temp_dir) / "tools"
+    tools.mkdir()
+    (tools / "fast_tool.py").write_text("VALUE = 1\n")
+    (tools / "broken_tool.py").write_text("import no_such_module_xyz\n")
+
+    manager = RuleManager(project_root=str(project_root))
+    manager.source_tools_dir = tools
+    report = manager.perf_report(assistants=['cline', 'copilot'])
+
+    assert sorted(path.name for path in project_root.iterdir()) == ["project_rules"]
+    assert report["rule_tree"]["files"] == 1
+    assert set(report["render"]) == {"cline", "copilot"}
+    assert report["imports"]["fast_tool.py"]["error"] is None
+    assert "ModuleNotFoundError" in report["imports"]["broken_tool.py"]["error"]
+    assert set(report["filesystem"]) == {"stat", "create", "rename"}
+
+
+def test_doctor_json_requires_perf(capsys):
+    assert cli.main(["doctor", "--json"]) == 1
+    assert "--perf" in capsys.readouterr().out
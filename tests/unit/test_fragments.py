@@ -0,0 +1,92 @@
+"""Unit tests for shared rule fragments and incremental re-rendering."""
+
+from pathlib import Path
+
+import pytest
+
+from rulebook_ai.core import RuleManager
+from rulebook_ai.fragments import IncludeError, dependents, expand_includes
+from rulebook_ai.manifest import load_manifest
+
+
+@pytest.fixture
+def project(temp_dir):
+    """Create project_rules/ with two rules sharing a fragment and one plain rule."""
+    project_root = Path(temp_dir)
+    rules_dir = project_root / "project_rules"
+    (rules_dir / "shared").mkdir(parents=True)
+    (rules_dir / "shared" / "memory-files.md").write_text("Read memory/docs first.\n")
+    (rules_dir / "shared" / "outer.md").write_text("Outer\n{{> shared/memory-files}}\n")
+    (rules_dir / "01-rules").mkdir()
+    (rules_dir / "01-rules" / "01-plan.md").write_text("Plan\n{{> shared/memory-files}}\n")
+    (rules_dir / "01-rules" / "02-code.md").write_text("Code\n{{> shared/outer }}\n")
+    (rules_dir / "01-rules" / "03-debug.md").write_text("Debug\n")
+
+    manager = RuleManager(project_root=str(project_root))
+    assert manager.sync(assistants=['cline']) == 0
+    return manager, project_root
+
+
+def test_expand_includes_resolves_nested_fragments(temp_dir):
+    root = Path(temp_dir)
+    (root / "a.md").write_text("A {{> b}}")
+    (root / "b.md").write_text("B\n")
+    files = {"a.md": root / "a.md", "b.md": root / "b.md"}
+
+    assert expand_includes("x {{> a}} y", files) == ("x A B y", ["a.md", "b.md"])
+    with pytest.raises(IncludeError, match="not found"):
+        expand_includes("{{> missing}}", files)
+
+    (root / "b.md").write_text("{{> a}}")
+    with pytest.raises(IncludeError, match="cycle"):
+        expand_includes("{{> a}}", files)
+
+
+def test_dependents_follow_nested_includes():
+    graph = {"r1.md": ["shared/x.md"], "r2.md": ["shared/y.md"], "shared/y.md": ["shared/x.md"]}
+    assert dependents(graph, ["shared/x.md"]) == {"r1.md", "r2.md", "shared/y.md"}
+    assert dependents(graph, ["shared/z.md"]) == set()
+
+
+def test_includes_are_rendered_and_fragments_not_output(project):
+    _, project_root = project
+    cline_dir = project_root / ".clinerules"
+
+    assert sorted(p.name for p in cline_dir.iterdir()) == ["01-plan", "02-code", "03-debug"]
+    assert (cline_dir / "01-plan").read_text() == "Plan\nRead memory/docs first.\n"
+    assert (cline_dir / "02-code").read_text() == "Code\nOuter\nRead memory/docs first.\n"
+    assert "{{>" not in (project_root / ".github" / "copilot-instructions.md").read_text()
+
+    includes = load_manifest(project_root)["includes"]
+    assert includes["01-rules/02-code.md"] == ["shared/outer.md"]
+
+
+def test_fragment_edit_rerenders_only_dependents(project, monkeypatch):
+    manager, project_root = project
+    written = []
+    original = manager.write_rule_output
+
+    def recording_write(source_path, destination, files, assistant=None):
+        written.append(Path(destination).name)
+        return original(source_path, destination, files, assistant)
+
+    monkeypatch.setattr(manager, "write_rule_output", recording_write)
+    (project_root / "project_rules" / "shared" / "outer.md").write_text("Outer v2\n")
+
+    assert manager.sync(assistants=['cline'], changed_only=True) == 0
+    assert written == ["02-code"]
+    assert (project_root / ".clinerules" / "02-code").read_text() == "Code\nOuter v2\n"
+
+
+def test_rule_included_by_another_rule_rerenders_it(project):
+    manager, project_root = project
+    rules_dir = project_root / "project_rules" / "01-rules"
+    (rules_dir / "04-review.md").write_text("Review\n{{> 01-rules/03-debug}}\n")
+    assert manager.sync(assistants=['cline']) == 0
+    assert (project_root / ".clinerules" / "04-review").read_text() == "Review\nDebug\n"
+
+    (rules_dir / "03-debug.md").write_text("Debug v2\n")
+    assert manager.sync(assistants=['cline'], changed_only=True) == 0
+    assert (project_root / ".clinerules" / "03-debug").read_text() == "Debug v2\n"
+    assert (project_root / ".clinerules" / "04-review").read_text() == "Review\nDebug v2\n"
+    assert manager.status()["up_to_date"] is True
@@ -0,0 +1,89 @@
+"""Unit tests for layered (base + overlay) rule set installs."""
+
+from pathlib import Path
+
+import pytest
+
+from rulebook_ai import cli
+from rulebook_ai.core import RuleManager
+
+
+@pytest.fixture
+def layered_env(temp_dir, monkeypatch):
+    """Create a base and an overlay rule set plus an empty target project."""
+    root = Path(temp_dir)
+    rule_sets = root / "rule_sets"
+    base = rule_sets / "base"
+    (base / "01-rules").mkdir(parents=True)
+    (base / "01-rules" / "01-meta.md").write_text("Base meta")
+    (base / "01-rules" / "02-style.md").write_text("Base style")
+    (base / "memory_starters" / "docs").mkdir(parents=True)
+    (base / "memory_starters" / "docs" / "architecture.md").write_text("Base architecture")
+    overlay = rule_sets / "security"
+    (overlay / "01-rules").mkdir(parents=True)
+    (overlay / "01-rules" / "02-style.md").write_text("Overlay style")
+    (overlay / "01-rules" / "03-security.md").write_text("Overlay security")
+    (overlay / "memory_starters" / "docs").mkdir(parents=True)
+    (overlay / "memory_starters" / "docs" / "threat_model.md").write_text("Threats")
+    (overlay / ".rulebook.json").write_text('{"roo_modes": {"01-rules": "code"}}')
+
+    target = root / "target"
+    target.mkdir()
+    manager = RuleManager(project_root=str(target))
+    manager.source_rules_dir = rule_sets
+    return manager, target
+
+
+def test_overlay_wins_by_relative_path(layered_env):
+    manager, target = layered_env
+    assert manager.install(rule_set=["base", "security"], assistants=['cursor', 'roo']) == 0
+
+    rules = target / "project_rules" / "01-rules"
+    assert sorted(p.name for p in rules.iterdir()) == ["01-meta.md", "02-style.md", "03-security.md"]
+    assert (rules / "02-style.md").read_text() == "Overlay style"
+    assert (target / "project_rules" / ".rulebook.json").exists()
+    assert not (target / "project_rules" / "memory_starters").exists()
+
+    cursor_dir = target / ".cursor" / "rules"
+    assert sorted(p.name for p in cursor_dir.iterdir()) == ["01-meta.mdc", "02-style.mdc", "03-security.mdc"]
+    assert (cursor_dir / "02-style.mdc").read_text() == "Overlay style"
+    # The overlay's config applies to the merged rules
+    assert (target / ".roo" / "rules-code" / "03-security.md").exists()
+
+
+def test_memory_starters_are_merged(layered_env):
+    manager, target = layered_env
+    assert manager.install(rule_set=["base", "security"], assistants=[]) == 0
+
+    docs = target / "memory" / "docs"
+    assert sorted(p.name for p in docs.iterdir()) == ["architecture.md", "threat_model.md"]
+
+
+def test_each_output_written_once(layered_env, monkeypatch):
+    manager, target = layered_env
+    written = []
+    original = manager.copy_file
+
+    def recording_copy(source, destination):
+        written.append(Path(destination))
+        return original(source, destination)
+
+    monkeypatch.setattr(manager, "copy_file", recording_copy)
+    assert manager.install(rule_set=["base", "security"], assistants=['cline']) == 0
+    assert len(written) == len(set(written))
+
+
+def test_layered_install_is_up_to_date(layered_env):
+    manager, target = layered_env
+    assert manager.install(rule_set=["base", "security"], assistants=['windsurf']) == 0
+    assert manager.status()["up_to_date"] is True
+
+
+def test_cli_repeated_rule_set_and_missing_layer(layered_env, monkeypatch):
+    manager, target = layered_env
+    monkeypatch.setattr(cli, "RuleManager", lambda: manager)
+
+    assert cli.main(["install", "-r", "base", "-r", "nope", "-p", str(target)]) == 1
+    assert not (target / "project_rules").exists()
+    assert cli.main(["install", "-r", "base", "-r", "security", "-p", str(target), "--cline"]) == 0
+    assert (target / ".clinerules" / "03-security").read_text() == "Overlay security"
@@ -0,0 +1,84 @@
+"""Unit tests for concurrent batch querying in the llm_api tool starter."""
+
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from rulebook_ai.tool_starters import llm_api
+
+SRC_DIR = Path(__file__).parent.parent.parent / "src"
+
+
+@pytest.fixture
+def local_provider(llm_stub_server, monkeypatch):
+    """Point the 'local' provider at the stub server and start from an empty registry."""
+    monkeypatch.setenv("LOCAL_LLM_BASE_URL", llm_stub_server.base_url)
+    llm_api.close_llm_clients()
+    yield llm_stub_server
+    llm_api.close_llm_clients()
+
+
+def test_batch_respects_concurrency_and_keeps_input_order(local_provider):
+    local_provider.delay = 0.05
+    prompts = [f"p{i}" for i in range(10)] + [{"id": "named", "prompt": "last"}]
+
+    results = asyncio.run(llm_api.query_llm_batch(prompts, provider="local", model="stub", concurrency=3))
+
+    assert [r["response"] for r in results] == [f"echo: p{i}" for i in range(10)] + ["echo: last"]
+    assert [r["index"] for r in results] == list(range(11))
+    assert results[-1]["id"] == "named"
+    assert all(r["error"] is None and r["latency"] >= 0.05 for r in results)
+    assert local_provider.max_in_flight == 3
+
+
+def test_batch_reports_errors_per_prompt(local_provider):
+    local_provider.responses.append({"status": 400})
+
+    async def run():
+        results = [r async for r in llm_api.iter_llm_batch(["bad", "good"], provider="local",
+                                                           model="stub", concurrency=1)]
+        await llm_api.aclose_llm_clients()
+        return results
+
+    results = sorted(asyncio.run(run()), key=lambda r: r["index"])
+    assert results[0]["response"] is None and "400" in results[0]["error"]
+    assert results[1]["response"] == "echo: good"
+
+
+def test_rate_limiter_waits_for_the_window():
+    async def run():
+        limiter = llm_api.RateLimiter(rpm=2, window=0.2)
+        start = time.monotonic()
+        for _ in range(3):
+            await limiter.acquire()
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) >= 0.19
+
+    async def run_tokens():
+        limiter = llm_api.RateLimiter(tpm=100, window=0.2)
+        start = time.monotonic()
+        await limiter.acquire(80)
+        await limiter.acquire(80)
+        return time.monotonic() - start
+
+    assert asyncio.run(run_tokens()) >= 0.19
+
+
+def test_cli_streams_jsonl_from_stdin(local_provider, temp_dir):
+    env = {"PATH": "", "LOCAL_LLM_BASE_URL": local_provider.base_url, "PYTHONPATH": str(SRC_DIR)}
+    stdin = "\n".join([json.dumps("one"), json.dumps({"prompt": "two", "id": "b"}), ""])
+    result = subprocess.run(
+        [sys.executable, "-m", "rulebook_ai.tool_starters.llm_api", "--provider", "local",
+         "--model", "stub", "--prompts-file", "-", "--ordered"],
+        input=stdin, capture_output=True, text=True, cwd=temp_dir, env=env, timeout=60,
+    )
+
+    assert result.returncode == 0, result.stderr
+    lines = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [(r["id"], r["response"]) for r in lines] == [(0, "echo: one"), ("b", "echo: two")]
@@ -0,0 +1,95 @@
+"""Unit tests for the response cache of the llm_api tool starter."""
+
+import asyncio
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from rulebook_ai.tool_starters import llm_api
+
+SRC_DIR = Path(__file__).parent.parent.parent / "src"
+
+
+@pytest.fixture
+def cached_local(llm_stub_server, temp_dir, monkeypatch):
+    """Point 'local' at the stub server and the response cache at a temporary database."""
+    monkeypatch.setenv("LOCAL_LLM_BASE_URL", llm_stub_server.base_url)
+    monkeypatch.setattr(llm_api, "CACHE_PATH", str(Path(temp_dir) / "cache.sqlite3"))
+    llm_api.close_llm_clients()
+    yield llm_stub_server
+    llm_api.close_llm_clients()
+    llm_api._response_caches.pop(llm_api.CACHE_PATH).close()
+
+
+def test_cache_key_normalizes_prompt_and_tracks_inputs(temp_dir):
+    key = llm_api.cache_key("Summarize\r\nthis  \n", "openai", "gpt-4o")
+    assert key == llm_api.cache_key("  Summarize\nthis", "openai", "gpt-4o")
+    assert key != llm_api.cache_key("Summarize\nthis", "openai", "o1")
+    assert key != llm_api.cache_key("Summarize\nthis", "local", "gpt-4o")
+
+    image = Path(temp_dir) / "shot.png"
+    image.write_bytes(b"one")
+    with_image = llm_api.cache_key("Summarize\nthis", "openai", "gpt-4o", str(image))
+    image.write_bytes(b"two")
+    assert with_image != llm_api.cache_key("Summarize\nthis", "openai", "gpt-4o", str(image))
+
+
+def test_cache_is_opt_in_and_refreshable(cached_local):
+    assert llm_api.query_llm("hello", provider="local", model="stub") == "echo: hello"
+    assert llm_api.query_llm("hello", provider="local", model="stub", cache=True) == "echo: hello"
+    assert llm_api.query_llm("hello ", provider="local", model="stub", cache=True) == "echo: hello"
+    assert len(cached_local.requests) == 2
+
+    assert llm_api.query_llm("hello", provider="local", model="stub", cache=True, refresh=True) == "echo: hello"
+    assert len(cached_local.requests) == 3
+
+    stats = llm_api.get_response_cache().stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_errors_are_not_cached(cached_local):
+    cached_local.responses.append({"status": 400})
+    assert llm_api.query_llm("retry me", provider="local", model="stub", cache=True) is None
+    assert llm_api.query_llm("retry me", provider="local", model="stub", cache=True) == "echo: retry me"
+    assert llm_api.get_response_cache().stats()["entries"] == 1
+
+
+def test_batch_uses_cache(cached_local):
+    llm_api.query_llm("a", provider="local", model="stub", cache=True)
+    results = asyncio.run(llm_api.query_llm_batch(["a", "b"], provider="local", model="stub", cache=True))
+    assert [(r["response"], r["cached"]) for r in results] == [("echo: a", True), ("echo: b", False)]
+    assert len(cached_local.requests) == 2
+
+
+def test_ttl_and_lru_eviction(temp_dir, monkeypatch):
+    cache = llm_api.ResponseCache(str(Path(temp_dir) / "lru.sqlite3"), ttl=60, max_bytes=10)
+    cache.put("a", "aaaa")
+    cache.put("b", "bbbb")
+    assert cache.get("a") == "aaaa"
+    cache.put("c", "cccc")
+    assert cache.get("b") is None
+    assert cache.get("a") == "aaaa" and cache.get("c") == "cccc"
+
+    now = time.time()
+    monkeypatch.setattr(llm_api.time, "time", lambda: now + 61)
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 1
+    cache.close()
+
+
+def test_cache_hit_does_not_import_sdks(cached_local):
+    assert llm_api.query_llm("warm", provider="local", model="stub", cache=True) == "echo: warm"
+    script = (
+        "import sys\n"
+        "from rulebook_ai.tool_starters import llm_api\n"
+        f"llm_api.CACHE_PATH = {llm_api.CACHE_PATH!r}\n"
+        "print(llm_api.query_llm('warm', provider='local', model='stub', cache=True))\n"
+        "print(sorted(m for m in ('openai', 'anthropic', 'google.generativeai') if m in sys.modules))\n"
+    )
+    env = {"PATH": "", "LOCAL_LLM_BASE_URL": "http://127.0.0.1:9/v1", "PYTHONPATH": str(SRC_DIR)}
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                            cwd=str(Path(llm_api.CACHE_PATH).parent), env=env, timeout=60)
+    assert result.stdout.splitlines() == ["echo: warm", "[]"], result.stderr
@@ -0,0 +1,63 @@
+"""Unit tests for the pooled client registry of the llm_api tool starter."""
+
+import asyncio
+
+import pytest
+
+from rulebook_ai.tool_starters import llm_api
+
+
+@pytest.fixture
+def local_provider(llm_stub_server, monkeypatch):
+    """Point the 'local' provider at the stub server and start from an empty registry."""
+    monkeypatch.setenv("LOCAL_LLM_BASE_URL", llm_stub_server.base_url)
+    llm_api.close_llm_clients()
+    yield llm_stub_server
+    llm_api.close_llm_clients()
+
+
+def test_clients_are_shared_per_provider_url_and_key(monkeypatch):
+    llm_api.close_llm_clients()
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-one")
+    first = llm_api.get_llm_client("openai")
+    assert llm_api.create_llm_client("openai") is first
+    assert llm_api.get_llm_client("openai", async_client=True) is not first
+
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-two")
+    assert llm_api.get_llm_client("openai") is not first
+    assert not any("sk-" in str(key) for key in llm_api._client_registry)
+
+    llm_api.close_llm_clients()
+    assert llm_api._client_registry == {}
+    assert first._client.is_closed
+
+
+def test_sequential_queries_reuse_one_connection(local_provider):
+    for i in range(3):
+        assert llm_api.query_llm(f"hi {i}", provider="local", model="stub") == f"echo: hi {i}"
+    assert len(local_provider.requests) == 3
+    assert len(local_provider.connections) == 1
+
+
+def test_async_client_is_pooled_and_closed(local_provider):
+    async def run():
+        client = llm_api.get_llm_client("local", async_client=True)
+        assert llm_api.get_llm_client("local", async_client=True) is client
+        response = await client.chat.completions.create(
+            model="stub", messages=[{"role": "user", "content": "async"}])
+        await llm_api.aclose_llm_clients()
+        return client, response
+
+    client, response = asyncio.run(run())
+    assert response.choices[0].message.content == "echo: async"
+    assert client._client.is_closed
+    assert llm_api._client_registry == {}
+
+
+def test_pool_limits_apply_to_new_clients(local_provider, monkeypatch):
+    monkeypatch.setattr(llm_api, "POOL_LIMITS", dict(llm_api.POOL_LIMITS))
+    llm_api.configure_connection_pool(max_connections=2, keepalive_expiry=5)
+    client = llm_api.get_llm_client("local")
+    pool = client._client._transport._pool
+    assert pool._max_connections == 2
+    assert pool._keepalive_expiry == 5
@@ -0,0 +1,97 @@
+"""Unit tests for image preparation in the llm_api tool starter."""
+
+import base64
+import io
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+from rulebook_ai.tool_starters import llm_api
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+
+@pytest.fixture(autouse=True)
+def empty_image_caches():
+    llm_api._image_payloads.clear()
+    llm_api._gemini_uploads.clear()
+    yield
+    llm_api._image_payloads.clear()
+    llm_api._gemini_uploads.clear()
+
+
+def test_mime_type_comes_from_magic_bytes(temp_dir):
+    misnamed = Path(temp_dir) / "shot.jpg"
+    misnamed.write_bytes(PNG_HEADER + b"rest")
+    assert llm_api.encode_image_file(str(misnamed)) == (
+        base64.b64encode(PNG_HEADER + b"rest").decode(), "image/png")
+
+    assert llm_api.detect_image_mime(b"\xff\xd8\xff\xe0data") == "image/jpeg"
+    assert llm_api.detect_image_mime(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "image/webp"
+    assert llm_api.detect_image_mime(b"????", "photo.gif") == "image/gif"
+    assert llm_api.detect_image_mime(b"????") == "image/png"
+
+
+def test_prepared_images_are_cached_by_content(temp_dir, monkeypatch):
+    calls = []
+    monkeypatch.setattr(llm_api, "_downscale_image", lambda data, mime, edge: calls.append(edge))
+    first = Path(temp_dir) / "a.png"
+    second = Path(temp_dir) / "b.png"
+    first.write_bytes(PNG_HEADER + b"same")
+    second.write_bytes(PNG_HEADER + b"same")
+
+    llm_api.prepare_image(str(first), "anthropic")
+    llm_api.prepare_image(str(second), "anthropic")
+    llm_api.prepare_image(str(first), "gemini")
+    assert calls == [1568, 3072]
+
+    for value in ("0", "off", "false"):
+        monkeypatch.setenv("LLM_API_IMAGE_RESIZE", value)
+        llm_api.prepare_image(str(first), "openai")
+    assert calls == [1568, 3072]
+
+
+def test_gemini_uploads_are_reused(temp_dir):
+    class FakeGenai:
+        uploads = []
+
+        def upload_file(self, data, mime_type=None, display_name=None):
+            self.uploads.append((data.read(), mime_type, display_name))
+            return object()
+
+    client = FakeGenai()
+    image = Path(temp_dir) / "shot.jpeg"
+    image.write_bytes(b"\xff\xd8\xffjpeg")
+    handle = llm_api.upload_gemini_image(client, str(image))
+    assert llm_api._gemini_parts(client, "describe", str(image)) == [handle, "describe"]
+    assert client.uploads == [(b"\xff\xd8\xffjpeg", "image/jpeg", "shot.jpeg")]
+
+
+def test_large_images_are_downscaled(temp_dir):
+    Image = pytest.importorskip("PIL.Image")
+    path = Path(temp_dir) / "screenshot.png"
+    Image.new("RGB", (3840, 2160), "white").save(path)
+
+    data, mime_type, _ = llm_api.prepare_image(str(path), "anthropic")
+    with Image.open(io.BytesIO(data)) as resized:
+        assert max(resized.size) == 1568
+    assert mime_type == "image/png"
+
+
+def test_undecodable_images_are_sent_unchanged(temp_dir, monkeypatch):
+    class FakeImage:
+        LANCZOS = 1
+
+        @staticmethod
+        def open(stream):
+            raise OSError("cannot identify image file")
+
+    monkeypatch.setitem(sys.modules, "PIL", types.SimpleNamespace(Image=FakeImage))
+    path = Path(temp_dir) / "broken.png"
+    path.write_bytes(b"\x89PNG\r\n\x1a\n" + b"\x00" * 64)
+
+    data, mime_type, _ = llm_api.prepare_image(str(path), "anthropic")
+    assert data == path.read_bytes()
+    assert mime_type == "image/png"
@@ -0,0 +1,97 @@
+"""Unit tests for load balancing across local endpoints in the llm_api tool starter."""
+
+import asyncio
+
+import pytest
+
+from rulebook_ai.tool_starters import llm_api
+
+
+@pytest.fixture
+def two_endpoints(make_llm_stub_server, monkeypatch):
+    """Serve the 'local' provider from two stub servers, without background health checks."""
+    first, second = make_llm_stub_server(), make_llm_stub_server()
+    monkeypatch.setenv("LOCAL_LLM_ENDPOINTS", f"{first.base_url},{second.base_url}")
+    monkeypatch.setenv("LOCAL_LLM_HEALTH_INTERVAL", "0")
+    llm_api.close_llm_clients()
+    yield first, second
+    llm_api.close_llm_clients()
+    llm_api._local_pool = None
+
+
+def query(prompt, retries=0):
+    return llm_api.query_llm(prompt, provider="local", model="stub", failover=[],
+                             policy=llm_api.RetryPolicy(retries=retries, backoff=0))
+
+
+def test_endpoints_come_from_the_environment(monkeypatch):
+    monkeypatch.setattr(llm_api, "LOCAL_ENDPOINTS", None)
+    monkeypatch.setenv("LOCAL_LLM_ENDPOINTS", " http://a/v1, http://b/v1 ")
+    assert llm_api.local_endpoints() == ["http://a/v1", "http://b/v1"]
+    monkeypatch.delenv("LOCAL_LLM_ENDPOINTS")
+    monkeypatch.setenv("LOCAL_LLM_BASE_URL", "http://single/v1")
+    assert llm_api.local_endpoints() == ["http://single/v1"]
+    llm_api.configure_local_endpoints(["http://c/v1"])
+    assert llm_api.local_endpoints() == ["http://c/v1"]
+    llm_api.configure_local_endpoints(None)
+
+
+def test_least_outstanding_endpoint_is_chosen():
+    pool = llm_api.EndpointPool(["http://a/v1", "http://b/v1"])
+    first = pool.acquire()
+    second = pool.acquire()
+    assert first is not second
+    pool.release(first, 0.1)
+    assert pool.acquire() is first
+
+
+def test_failing_endpoints_are_ejected():
+    pool = llm_api.EndpointPool(["http://a/v1", "http://b/v1"])
+    bad = pool.endpoints[0]
+    for _ in range(llm_api.EJECT_AFTER_FAILURES):
+        pool.acquire()
+        pool.release(bad, 1.0, ValueError("bad request"))
+    assert not pool.stats()[0]["ejected"]
+
+    for _ in range(llm_api.EJECT_AFTER_FAILURES):
+        pool.acquire()
+        pool.release(bad, 1.0, TimeoutError())
+    assert pool.stats()[0]["ejected"]
+    assert all(pool.acquire() is pool.endpoints[1] for _ in range(3))
+
+
+def test_sequential_queries_alternate_and_retries_switch_endpoints(two_endpoints):
+    first, second = two_endpoints
+    assert [query(f"q{i}") for i in range(4)] == [f"echo: q{i}" for i in range(4)]
+    assert len(first.requests) == len(second.requests) == 2
+
+    first.responses.append({"status": 503})
+    second.responses.append({"status": 503})
+    assert query("retry", retries=1) is None
+    stats = llm_api.local_endpoint_pool().stats()
+    assert [s["requests"] for s in stats] == [3, 3]
+    assert [s["errors"] for s in stats] == [1, 1]
+    assert all(s["latency_p50"] is not None for s in stats)
+
+
+def test_health_checks_eject_and_readmit(two_endpoints):
+    first, second = two_endpoints
+    pool = llm_api.local_endpoint_pool()
+    first.responses.append({"status": 503})
+    assert pool.check_health(timeout=5) == {first.base_url: False, second.base_url: True}
+    assert [s["ejected"] for s in pool.stats()] == [True, False]
+    assert [query(f"q{i}") for i in range(2)] == ["echo: q0", "echo: q1"]
+    assert len(second.requests) == 3
+
+    assert pool.check_health(timeout=5) == {first.base_url: True, second.base_url: True}
+    assert not any(s["ejected"] for s in pool.stats())
+
+
+def test_concurrent_batch_spreads_load(two_endpoints):
+    first, second = two_endpoints
+    first.delay = second.delay = 0.1
+    results = asyncio.run(llm_api.query_llm_batch([f"p{i}" for i in range(8)], provider="local",
+                                                  model="stub", concurrency=4))
+    assert all(r["error"] is None for r in results)
+    assert len(first.requests) == len(second.requests) == 4
+    assert first.max_in_flight == second.max_in_flight == 2
@@ -0,0 +1,85 @@
+"""Unit tests for per-call metrics in the llm_api tool starter."""
+
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from rulebook_ai.tool_starters import llm_api
+
+
+@pytest.fixture
+def metrics_log(llm_stub_server, temp_dir, monkeypatch):
+    """Point 'local' at the stub server and record metrics to a temporary log."""
+    path = Path(temp_dir) / "metrics.jsonl"
+    monkeypatch.setenv("LOCAL_LLM_BASE_URL", llm_stub_server.base_url)
+    monkeypatch.setattr(llm_api, "METRICS_PATH", str(path))
+    llm_api.close_llm_clients()
+    yield llm_stub_server, path
+    llm_api.close_llm_clients()
+
+
+def records(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_calls_are_recorded(metrics_log):
+    server, path = metrics_log
+    policy = llm_api.RetryPolicy(retries=1, backoff=0)
+    server.responses.extend([{"status": 503}, {}, {"status": 400}])
+    assert llm_api.query_llm("one", provider="local", model="stub", policy=policy, failover=[]) == "echo: one"
+    assert llm_api.query_llm("two", provider="local", model="stub", policy=policy, failover=[]) is None
+    assert "".join(llm_api.stream_llm("three", provider="local", model="stub")) == "echo: three"
+
+    ok, error, streamed = records(path)
+    assert (ok["provider"], ok["model"], ok["status"], ok["retries"]) == ("local", "stub", "ok", 1)
+    assert (ok["input_tokens"], ok["output_tokens"], ok["cost"]) == (10, 5, None)
+    assert ok["latency"] > 0 and ok["ttft"] is None
+    assert error["status"] == "error" and "400" in error["error"]
+    assert streamed["stream"] and 0 <= streamed["ttft"] <= streamed["latency"]
+
+
+def test_metrics_are_off_by_default(monkeypatch):
+    monkeypatch.setattr(llm_api, "METRICS_PATH", None)
+    monkeypatch.delenv("LLM_API_METRICS", raising=False)
+    assert llm_api.record_call("local", "stub", 0.1) is None
+
+
+def test_usage_and_cost():
+    usage = llm_api.response_usage("anthropic", SimpleNamespace(usage=SimpleNamespace(
+        input_tokens=100, output_tokens=20, cache_read_input_tokens=900, cache_creation_input_tokens=None)))
+    assert usage == {"input_tokens": 1000, "output_tokens": 20, "cached_tokens": 900}
+
+    usage = llm_api.response_usage("openai", SimpleNamespace(usage=SimpleNamespace(
+        prompt_tokens=1_000_000, completion_tokens=100_000,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=500_000))))
+    assert usage == {"input_tokens": 1_000_000, "output_tokens": 100_000, "cached_tokens": 500_000}
+    # 500k uncached at $2.50/M, 500k cached at $1.25/M, 100k output at $10/M
+    assert llm_api.estimate_cost("gpt-4o-2024-08-06", usage) == pytest.approx(1.25 + 0.625 + 1.0)
+    assert llm_api.estimate_cost("my-local-model", usage) is None
+
+
+def test_stats_summary_and_prometheus_export(temp_dir, capsys):
+    log = Path(temp_dir) / "metrics.jsonl"
+    lines = [{"provider": "openai", "model": "gpt-4o", "status": "ok", "latency": i / 10, "ttft": None,
+              "input_tokens": 100, "output_tokens": 10, "cached_tokens": 0, "retries": 0, "cost": 0.001,
+              "cache_hit": False, "time": 1} for i in range(1, 11)]
+    lines.append({"provider": "local", "model": "qwen", "status": "error", "latency": 1.0, "retries": 2,
+                  "cost": None, "cache_hit": False, "time": 1})
+    log.write_text("\n".join(json.dumps(line) for line in lines) + "\nnot json\n")
+
+    summaries = llm_api.summarize_metrics(llm_api.read_metrics(str(log)))
+    openai = summaries[0]
+    assert (openai["provider"], openai["calls"], openai["input_tokens"]) == ("openai", 10, 1000)
+    assert openai["latency"]["p50"] == 0.6 and openai["latency"]["p99"] == 1.0
+    assert openai["cost"] == pytest.approx(0.01)
+    assert summaries[1]["errors"] == 1 and summaries[1]["latency"]["p50"] is None
+
+    textfile = Path(temp_dir) / "llm_api.prom"
+    assert llm_api.stats_main(["--metrics", str(log), "--prometheus", str(textfile)]) == 0
+    assert "gpt-4o" in capsys.readouterr().out
+    exported = textfile.read_text()
+    assert 'llm_api_calls_total{provider="local",model="qwen",status="error"} 1' in exported
+    assert 'llm_api_latency_seconds{provider="openai",model="gpt-4o",quantile="0.95"} 1.0' in exported
+    assert 'llm_api_retries_total{provider="local",model="qwen"} 2' in exported
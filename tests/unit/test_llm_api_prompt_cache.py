@@ -0,0 +1,104 @@
+"""Unit tests for provider prompt caching of system prefixes in the llm_api tool starter."""
+
+import asyncio
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from rulebook_ai.tool_starters import llm_api
+
+SRC_DIR = Path(__file__).parent.parent.parent / "src"
+
+RULES = ["# Rules\n\nAlways write tests.\n", "# Memory\n\nThe API uses SQLite.\n"]
+
+
+@pytest.fixture
+def stub_providers(llm_stub_server, monkeypatch):
+    """Point 'local' and 'anthropic' at the stub server and start from an empty registry."""
+    monkeypatch.setenv("LOCAL_LLM_BASE_URL", llm_stub_server.base_url)
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-stub")
+    monkeypatch.setenv("ANTHROPIC_BASE_URL", llm_stub_server.base_url[:-len("/v1")])
+    llm_api.close_llm_clients()
+    yield llm_stub_server
+    llm_api.close_llm_clients()
+
+
+def test_openai_layout_puts_the_prefix_first():
+    kwargs = llm_api._openai_request("question", "gpt-4o", "openai", system_prefix=RULES)
+    assert kwargs["messages"][0] == {"role": "system", "content": "\n\n".join(RULES)}
+    assert kwargs["messages"][1]["role"] == "user"
+    assert kwargs["extra_body"]["prompt_cache_key"] == llm_api._openai_request(
+        "other question", "gpt-4o", "openai", system_prefix=RULES)["extra_body"]["prompt_cache_key"]
+
+    assert "extra_body" not in llm_api._openai_request("question", "stub", "local", system_prefix=RULES)
+    assert llm_api._openai_request("question", "o1", "openai", system_prefix=RULES)["messages"][0]["role"] == "developer"
+    assert len(llm_api._openai_request("question", "gpt-4o", "openai", system_prefix=["", " "])["messages"]) == 1
+
+
+def test_anthropic_layout_marks_the_last_block():
+    system = llm_api._anthropic_request("question", "claude", system_prefix=RULES)["system"]
+    assert [block["text"] for block in system] == RULES
+    assert "cache_control" not in system[0]
+    assert system[-1]["cache_control"] == {"type": "ephemeral"}
+
+
+def test_response_cache_key_depends_on_the_prefix():
+    plain = llm_api.cache_key("question", "openai", "gpt-4o")
+    assert llm_api.cache_key("question", "openai", "gpt-4o", system_prefix=[]) == plain
+    assert llm_api.cache_key("question", "openai", "gpt-4o", system_prefix=RULES) != plain
+    assert llm_api.cache_key("question", "openai", "gpt-4o", system_prefix=RULES[:1]) != \
+        llm_api.cache_key("question", "openai", "gpt-4o", system_prefix=RULES)
+
+
+@pytest.mark.parametrize("provider", ["local", "anthropic"])
+def test_repeated_prefix_reports_cached_tokens(stub_providers, provider):
+    usages = [{}, {}]
+    for usage in usages:
+        assert llm_api.query_llm("question", provider=provider, model="stub",
+                                 system_prefix=RULES, usage=usage) == "echo: question"
+
+    assert usages[0]["input_tokens"] == usages[1]["input_tokens"] == 10
+    assert not usages[0]["cached_tokens"]
+    assert usages[1]["cached_tokens"] == stub_providers.PREFIX_TOKENS
+
+
+def test_prompt_cache_key_is_sent_in_the_body(stub_providers, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-stub")
+    client = llm_api.get_llm_client("local")
+    assert llm_api.query_llm("question", client=client, provider="openai", model="gpt-4o",
+                             system_prefix=RULES) == "echo: question"
+
+    body = stub_providers.requests[-1][1]
+    assert len(body["prompt_cache_key"]) == 32
+    assert body["messages"][0]["role"] == "system"
+
+
+def test_batch_shares_the_prefix(stub_providers):
+    results = asyncio.run(llm_api.query_llm_batch(["one", "two"], provider="local", model="stub",
+                                                  concurrency=1, system_prefix=RULES))
+
+    assert [r["response"] for r in results] == ["echo: one", "echo: two"]
+    assert results[1]["usage"]["cached_tokens"] == stub_providers.PREFIX_TOKENS
+    assert all(body["messages"][0]["content"] == "\n\n".join(RULES) for _, body in stub_providers.requests)
+
+
+def test_cli_cache_prefix_reports_cache_reads(stub_providers, temp_dir):
+    for i, text in enumerate(RULES):
+        (Path(temp_dir) / f"rules{i}.md").write_text(text)
+    env = {"PATH": "", "LOCAL_LLM_BASE_URL": stub_providers.base_url, "PYTHONPATH": str(SRC_DIR)}
+    command = [sys.executable, "-m", "rulebook_ai.tool_starters.llm_api", "--provider", "local", "--model", "stub",
+               "--prompt", "hello", "--cache-prefix", "rules0.md", "rules1.md"]
+    results = [subprocess.run(command, capture_output=True, text=True, cwd=temp_dir, env=env, timeout=60)
+               for _ in range(2)]
+
+    assert all(result.stdout.strip() == "echo: hello" for result in results)
+    assert "Prompt cache: 0 of 10 input tokens" in results[0].stderr
+    assert "Prompt cache: 8 of 10 input tokens" in results[1].stderr
+    assert stub_providers.requests[0][1]["messages"][0]["content"] == "\n\n".join(RULES)
+
+    missing = subprocess.run(command[:-2] + ["missing.md"], capture_output=True, text=True,
+                             cwd=temp_dir, env=env, timeout=60)
+    assert missing.returncode == 1
+    assert "Error: Could not read prefix file" in missing.stderr
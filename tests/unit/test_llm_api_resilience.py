@@ -0,0 +1,118 @@
+"""Unit tests for retries, timeouts, hedging and failover in the llm_api tool starter."""
+
+import asyncio
+import time
+from email.utils import formatdate
+
+import pytest
+
+from rulebook_ai.tool_starters import llm_api
+
+
+@pytest.fixture
+def local_provider(llm_stub_server, monkeypatch):
+    """Point the 'local' provider at the stub server and start from an empty registry."""
+    monkeypatch.setenv("LOCAL_LLM_BASE_URL", llm_stub_server.base_url)
+    llm_api.close_llm_clients()
+    yield llm_stub_server
+    llm_api.close_llm_clients()
+    llm_api._latency_history.clear()
+
+
+def query(prompt, policy, **kwargs):
+    return llm_api.query_llm(prompt, provider="local", model="stub", policy=policy, failover=[], **kwargs)
+
+
+def test_rate_limits_are_retried_after_the_requested_delay(local_provider):
+    local_provider.responses.append({"status": 429, "headers": {"Retry-After": "0.3"}})
+    start = time.monotonic()
+    assert query("again", llm_api.RetryPolicy(retries=2, backoff=0)) == "echo: again"
+    assert time.monotonic() - start >= 0.3
+    assert len(local_provider.requests) == 2
+
+
+def test_client_errors_are_not_retried_and_retries_are_bounded(local_provider, capsys):
+    local_provider.responses.append({"status": 400})
+    assert query("bad", llm_api.RetryPolicy(retries=2, backoff=0)) is None
+    assert len(local_provider.requests) == 1
+
+    local_provider.responses.extend([{"status": 503}] * 3)
+    assert query("down", llm_api.RetryPolicy(retries=2, backoff=0)) is None
+    assert len(local_provider.requests) == 4
+    assert "Error querying LLM" in capsys.readouterr().err
+
+
+def test_timeouts_are_retried(local_provider):
+    local_provider.responses.append({"delay": 2.0})
+    start = time.monotonic()
+    assert query("slow", llm_api.RetryPolicy(retries=1, timeout=0.3, backoff=0)) == "echo: slow"
+    assert time.monotonic() - start < 1.5
+
+
+def test_slow_requests_are_hedged(local_provider):
+    local_provider.responses.append({"delay": 2.0})
+    start = time.monotonic()
+    assert query("hedge", llm_api.RetryPolicy(retries=0, hedge=0.1)) == "echo: hedge"
+    assert time.monotonic() - start < 1.5
+    assert len(local_provider.requests) == 2
+
+
+def test_p95_hedging_waits_for_enough_samples():
+    policy = llm_api.RetryPolicy(hedge="p95")
+    try:
+        for _ in range(llm_api.HEDGE_MIN_SAMPLES - 1):
+            llm_api.record_latency("local", "p95-model", 0.1)
+        assert policy.hedge_delay("local", "p95-model") is None
+        llm_api.record_latency("local", "p95-model", 0.5)
+        assert policy.hedge_delay("local", "p95-model") == 0.5
+    finally:
+        llm_api._latency_history.clear()
+
+
+def test_failover_to_next_provider(local_provider, make_llm_stub_server, monkeypatch, capsys):
+    primary = make_llm_stub_server()
+    primary.responses.append({"status": 500})
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-stub")
+    monkeypatch.setenv("OPENAI_BASE_URL", primary.base_url)
+
+    response = llm_api.query_llm("fail over", provider="openai", model="stub",
+                                 policy=llm_api.RetryPolicy(retries=0), failover=["local"])
+    assert response == "echo: fail over"
+    assert len(primary.requests) == 1 and len(local_provider.requests) == 1
+    assert "failing over to local" in capsys.readouterr().err
+
+
+def test_batch_retries_and_fails_over(local_provider, make_llm_stub_server, monkeypatch):
+    primary = make_llm_stub_server()
+    primary.responses.extend([{"status": 503}, {"status": 400}])
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-stub")
+    monkeypatch.setenv("OPENAI_BASE_URL", primary.base_url)
+
+    results = asyncio.run(llm_api.query_llm_batch(
+        ["first", "second"], provider="openai", model="stub", concurrency=1,
+        policy=llm_api.RetryPolicy(retries=1, backoff=0), failover=["local"]))
+    assert [(r["provider"], r["response"]) for r in results] == [
+        ("local", "echo: first"), ("openai", "echo: second")]
+    assert len(primary.requests) == 3
+
+
+def test_numeric_settings_tolerate_bad_values(monkeypatch, capsys):
+    monkeypatch.setenv("LLM_API_RETRIES", "2.5")
+    assert llm_api.RetryPolicy().retries == 2
+    monkeypatch.setenv("LLM_API_RETRIES", "many")
+    assert llm_api.RetryPolicy().retries == llm_api.DEFAULT_RETRIES
+    assert "LLM_API_RETRIES='many'" in capsys.readouterr().err
+
+
+def test_retry_after_headers():
+    class Error(Exception):
+        def __init__(self, headers):
+            self.response = type("Response", (), {"headers": headers})()
+
+    assert llm_api.retry_after(Error({"retry-after-ms": "250"})) == 0.25
+    assert llm_api.retry_after(Error({"retry-after": "3"})) == 3.0
+    assert 5 < llm_api.retry_after(Error({"retry-after": formatdate(time.time() + 10, usegmt=True)})) <= 10
+    assert llm_api.retry_after(Error({})) is None
+    assert llm_api.retry_after(Error({"retry-after-ms": "soon"})) is None
+    assert not llm_api.is_retryable(ValueError("bad prompt"))
+    assert llm_api.is_retryable(TimeoutError())
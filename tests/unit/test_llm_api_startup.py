@@ -0,0 +1,44 @@
+"""Unit tests for the start-up cost of the llm_api tool starter."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+from rulebook_ai.tool_starters import llm_api
+
+SRC_DIR = Path(__file__).parent.parent.parent / "src"
+
+
+def test_import_is_quiet_and_loads_environment_lazily(temp_dir):
+    (Path(temp_dir) / ".env").write_text("LOCAL_LLM_BASE_URL=http://127.0.0.1:1234/v1\n")
+    script = (
+        "import sys\n"
+        "from rulebook_ai.tool_starters import llm_api\n"
+        "print(sorted(m for m in ('dotenv', 'openai', 'anthropic', 'google.generativeai') if m in sys.modules))\n"
+        "print(llm_api.client_settings('local')[1])\n"
+        "print(sorted(m for m in ('openai', 'anthropic', 'google.generativeai') if m in sys.modules))\n"
+    )
+    env = {"PATH": "", "PYTHONPATH": str(SRC_DIR)}
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                            cwd=temp_dir, env=env, timeout=60)
+
+    assert result.stderr == ""
+    assert result.stdout.splitlines() == ["[]", "http://127.0.0.1:1234/v1", "[]"]
+
+
+def test_verbose_environment_loading_lists_key_names_only(temp_dir, monkeypatch, capsys):
+    (Path(temp_dir) / ".env.local").write_text("LLM_API_TEST_SECRET=hunter2\n")
+    monkeypatch.chdir(temp_dir)
+    monkeypatch.delenv("LLM_API_TEST_SECRET", raising=False)
+    llm_api.load_environment(verbose=True)
+
+    err = capsys.readouterr().err
+    assert "LLM_API_TEST_SECRET" in err
+    assert "hunter2" not in err
+    monkeypatch.delenv("LLM_API_TEST_SECRET")
+
+
+def test_benchmark_imports_reports_each_phase():
+    timings = llm_api.benchmark_imports(["local"], runs=1)["local"]
+    assert set(timings) == {"module", "environment", "sdk", "total"}
+    assert timings["total"] >= timings["sdk"] > 0
@@ -0,0 +1,84 @@
+"""Unit tests for streamed responses in the llm_api tool starter."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from rulebook_ai.tool_starters import llm_api
+
+SRC_DIR = Path(__file__).parent.parent.parent / "src"
+
+
+@pytest.fixture
+def stub_providers(llm_stub_server, monkeypatch):
+    """Point 'local' and 'anthropic' at the stub server and start from an empty registry."""
+    monkeypatch.setenv("LOCAL_LLM_BASE_URL", llm_stub_server.base_url)
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-stub")
+    monkeypatch.setenv("ANTHROPIC_BASE_URL", llm_stub_server.base_url[:-len("/v1")])
+    llm_api.close_llm_clients()
+    yield llm_stub_server
+    llm_api.close_llm_clients()
+
+
+@pytest.mark.parametrize("provider", ["local", "anthropic"])
+def test_stream_yields_deltas_and_records_timings(stub_providers, provider):
+    stream = llm_api.stream_llm("stream this please", provider=provider, model="stub")
+    deltas = list(stream)
+
+    assert len(deltas) > 1
+    assert "".join(deltas) == stream.text == "echo: stream this please"
+    assert 0 <= stream.ttft <= stream.total_time
+    assert stub_providers.requests[-1][1]["stream"] is True
+
+
+def test_stream_errors_are_raised(stub_providers):
+    stub_providers.responses.append({"status": 400})
+    with pytest.raises(Exception, match="400"):
+        list(llm_api.stream_llm("fail", provider="local", model="stub"))
+
+
+def test_stream_uses_cache(stub_providers, temp_dir, monkeypatch):
+    monkeypatch.setattr(llm_api, "CACHE_PATH", str(Path(temp_dir) / "cache.sqlite3"))
+    first = llm_api.stream_llm("cache me", provider="local", model="stub", cache=True)
+    assert "".join(first) == "echo: cache me"
+
+    second = llm_api.stream_llm("cache me", provider="local", model="stub", cache=True)
+    assert list(second) == ["echo: cache me"]
+    assert second.cached
+    assert len(stub_providers.requests) == 1
+    llm_api._response_caches.pop(llm_api.CACHE_PATH).close()
+
+
+def test_cli_stream(stub_providers, temp_dir):
+    env = {"PATH": "", "LOCAL_LLM_BASE_URL": stub_providers.base_url, "PYTHONPATH": str(SRC_DIR)}
+    result = subprocess.run(
+        [sys.executable, "-m", "rulebook_ai.tool_starters.llm_api", "--provider", "local",
+         "--model", "stub", "--prompt", "streamed", "--stream"],
+        capture_output=True, text=True, cwd=temp_dir, env=env, timeout=60,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == "echo: streamed\n"
+    assert "time to first token:" in result.stderr
+
+
+def test_stream_honours_the_policy_timeout(stub_providers):
+    stub_providers.responses.append({"delay": 1.0})
+    with pytest.raises(Exception, match="(?i)time"):
+        list(llm_api.stream_llm("slow", provider="local", model="stub",
+                                policy=llm_api.RetryPolicy(timeout=0.2)))
+
+
+def test_cli_stream_rejects_retry_flags(stub_providers, temp_dir):
+    env = {"PATH": "", "LOCAL_LLM_BASE_URL": stub_providers.base_url, "PYTHONPATH": str(SRC_DIR)}
+    result = subprocess.run(
+        [sys.executable, "-m", "rulebook_ai.tool_starters.llm_api", "--provider", "local",
+         "--model", "stub", "--prompt", "streamed", "--stream", "--retries", "3"],
+        capture_output=True, text=True, cwd=temp_dir, env=env, timeout=60,
+    )
+
+    assert result.returncode == 2
+    assert "cannot be used with --stream" in result.stderr
+    assert stub_providers.requests == []
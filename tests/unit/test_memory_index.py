@@ -0,0 +1,82 @@
+"""Unit tests for `memory index` and memory-bank sharding."""
+
+from pathlib import Path
+
+import pytest
+
+from rulebook_ai import memory_index
+from rulebook_ai.core import RuleManager
+from rulebook_ai.memory_index import parse_sections
+
+ARCHITECTURE = """# Architecture
+
+Overview of the system.
+
+## Storage
+
+Data lives in **SQLite** tables.
+
+```
+## not a heading
+```
+
+## API
+
+- REST endpoints for clients.
+"""
+
+
+@pytest.fixture
+def memory_project(temp_dir):
+    """Create a project with a small memory bank."""
+    project_root = Path(temp_dir)
+    (project_root / "memory" / "docs").mkdir(parents=True)
+    (project_root / "memory" / "tasks").mkdir()
+    (project_root / "memory" / "docs" / "architecture.md").write_text(ARCHITECTURE)
+    (project_root / "memory" / "tasks" / "active_context.md").write_text("# Active\n\nWorking on the API.\n")
+    return RuleManager(project_root=str(project_root)), project_root
+
+
+def test_parse_sections_skips_code_fences():
+    summary, sections = parse_sections(ARCHITECTURE)
+    assert summary == ""
+    assert [(s["title"], s["anchor"]) for s in sections] == [
+        ("Architecture", "architecture"), ("Storage", "storage"), ("API", "api"),
+    ]
+    assert sections[1]["summary"] == "Data lives in **SQLite** tables."
+    assert sections[2]["summary"] == "REST endpoints for clients."
+
+
+def test_index_is_incremental(memory_project, monkeypatch):
+    manager, project_root = memory_project
+    assert manager.index_memory() == 0
+    index = (project_root / "memory" / "INDEX.md").read_text()
+    assert "[docs/architecture.md](docs/architecture.md)" in index
+    assert "(docs/architecture.md#storage)" in index
+    assert "INDEX.md](" not in index
+
+    described = []
+    original = memory_index.describe_memory_file
+    monkeypatch.setattr(memory_index, "describe_memory_file",
+                        lambda path: described.append(path.name) or original(path))
+    (project_root / "memory" / "tasks" / "active_context.md").write_text("# Active\n\nShipping it.\n")
+    assert manager.index_memory() == 0
+    assert described == ["active_context.md"]
+    assert "Shipping it." in (project_root / "memory" / "INDEX.md").read_text()
+
+
+def test_split_over_shards_large_files(memory_project):
+    manager, project_root = memory_project
+    assert manager.index_memory(split_over=100) == 0
+
+    docs = project_root / "memory" / "docs"
+    assert sorted(p.name for p in (docs / "architecture").iterdir()) == ["01-storage.md", "02-api.md"]
+    assert "## not a heading" in (docs / "architecture" / "01-storage.md").read_text()
+    stub = (docs / "architecture.md").read_text()
+    assert stub.startswith("# Architecture\n\nOverview of the system.")
+    assert "[API](architecture/02-api.md)" in stub
+    assert "(docs/architecture/02-api.md)" in (project_root / "memory" / "INDEX.md").read_text()
+
+
+def test_index_requires_memory_bank(temp_dir):
+    assert RuleManager(project_root=temp_dir).index_memory() == 1
@@ -0,0 +1,105 @@
+"""Unit tests for `memory snapshot|diff|restore`."""
+
+from pathlib import Path
+
+import pytest
+
+from rulebook_ai import manifest
+from rulebook_ai.core import RuleManager
+from rulebook_ai.snapshots import OBJECTS_DIR, find_snapshot
+
+
+@pytest.fixture
+def memory_project(temp_dir):
+    """Create a project with a small memory bank."""
+    project_root = Path(temp_dir)
+    (project_root / "memory" / "tasks").mkdir(parents=True)
+    (project_root / "memory" / "tasks" / "active_context.md").write_text("Working on the API.\n")
+    (project_root / "memory" / "tasks" / "tasks_plan.md").write_text("- [ ] API\n")
+    return RuleManager(project_root=str(project_root)), project_root
+
+
+def stored_objects(project_root):
+    return [p for p in (project_root / ".rulebook-ai" / OBJECTS_DIR).rglob("*") if p.is_file()]
+
+
+def test_snapshots_deduplicate_unchanged_files(memory_project, monkeypatch):
+    manager, project_root = memory_project
+    assert manager.snapshot_memory(message="start") == 0
+    assert len(stored_objects(project_root)) == 2
+
+    hashed = []
+    original = manifest.git_blob_id
+    monkeypatch.setattr(manifest, "git_blob_id", lambda path: hashed.append(path.name) or original(path))
+    (project_root / "memory" / "tasks" / "active_context.md").write_text("Shipping the API.\n")
+    assert manager.snapshot_memory() == 0
+
+    assert hashed == ["active_context.md"]
+    assert len(stored_objects(project_root)) == 3
+    assert [s["message"] for s in manager.memory_snapshots()] == ["start", ""]
+    assert manager.snapshot_memory() == 0
+    assert len(manager.memory_snapshots()) == 2
+
+
+def test_diff_reads_only_changed_files(memory_project, capsys):
+    manager, project_root = memory_project
+    assert manager.snapshot_memory() == 0
+    first = manager.memory_snapshots()[0]["id"]
+    (project_root / "memory" / "tasks" / "active_context.md").write_text("Shipping the API.\n")
+    (project_root / "memory" / "notes.md").write_text("New note\n")
+    capsys.readouterr()
+
+    assert manager.diff_memory(name_only=True) == 0
+    assert capsys.readouterr().out.splitlines() == ["A notes.md", "M tasks/active_context.md"]
+
+    assert manager.snapshot_memory() == 0
+    capsys.readouterr()
+    assert manager.diff_memory(first, "latest") == 0
+    out = capsys.readouterr().out
+    assert "-Working on the API." in out
+    assert "+Shipping the API." in out
+    assert "tasks_plan.md" not in out
+
+
+def test_restore_round_trip(memory_project):
+    manager, project_root = memory_project
+    memory_dir = project_root / "memory"
+    assert manager.snapshot_memory() == 0
+    first = manager.memory_snapshots()[0]["id"]
+
+    (memory_dir / "tasks" / "active_context.md").write_text("Agent rewrote this.\n")
+    (memory_dir / "tasks" / "tasks_plan.md").unlink()
+    (memory_dir / "scratch" / "deep").mkdir(parents=True)
+    (memory_dir / "scratch" / "deep" / "notes.md").write_text("temp")
+
+    assert manager.restore_memory(first[:6]) == 0
+    assert (memory_dir / "tasks" / "active_context.md").read_text() == "Working on the API.\n"
+    assert (memory_dir / "tasks" / "tasks_plan.md").read_text() == "- [ ] API\n"
+    assert not (memory_dir / "scratch").exists()
+
+    backup = manager.memory_snapshots()[-1]
+    assert backup["message"] == f"before restoring {first}"
+    assert manager.restore_memory(backup["id"]) == 0
+    assert (memory_dir / "scratch" / "deep" / "notes.md").read_text() == "temp"
+
+
+def test_history_keeps_order_and_repeated_states(memory_project):
+    manager, project_root = memory_project
+    context = project_root / "memory" / "tasks" / "active_context.md"
+    for message, text in [("a", "Working on the API.\n"), ("b", "Shipping the API.\n"),
+                          ("a again", "Working on the API.\n"), ("c", "Done.\n")]:
+        context.write_text(text)
+        assert manager.snapshot_memory(message=message) == 0
+
+    snapshots = manager.memory_snapshots()
+    assert [s["message"] for s in snapshots] == ["a", "b", "a again", "c"]
+    assert snapshots[0]["digest"] == snapshots[2]["digest"]
+    assert len({s["id"] for s in snapshots}) == 4
+    assert manager.diff_memory(snapshots[-1]["id"][:8], name_only=True) == 0
+    assert find_snapshot(project_root / ".rulebook-ai", "latest")["message"] == "c"
+
+
+def test_unknown_snapshot(memory_project):
+    manager, _ = memory_project
+    assert manager.diff_memory() == 1
+    assert manager.restore_memory("deadbeef") == 1
@@ -0,0 +1,114 @@
+"""Unit tests for `pack`/`unpack` archives of rendered outputs."""
+
+import io
+import tarfile
+from pathlib import Path
+
+import pytest
+
+from rulebook_ai.core import RuleManager
+from rulebook_ai.packing import PACK_INDEX_NAME
+
+
+@pytest.fixture
+def synced_project(temp_dir):
+    """Create a synced project and return (manager, project_root, archive dir)."""
+    project_root = Path(temp_dir) / "project"
+    rules_dir = project_root / "project_rules"
+    rules_dir.mkdir(parents=True)
+    (rules_dir / "01-first.md").write_text("First rule")
+    (rules_dir / "02-second.md").write_text("Second rule")
+
+    manager = RuleManager(project_root=str(project_root))
+    assert manager.sync(assistants=['cursor', 'cline']) == 0
+    archives = Path(temp_dir) / "archives"
+    archives.mkdir()
+    return manager, project_root, archives
+
+
+def test_pack_is_deterministic(synced_project):
+    manager, project_root, archives = synced_project
+    assert manager.pack(output=str(archives / "a.tar.gz")) == 0
+    (project_root / "project_rules" / "01-first.md").touch()
+    assert manager.pack(output=str(archives / "b.tar.gz")) == 0
+
+    assert (archives / "a.tar.gz").read_bytes() == (archives / "b.tar.gz").read_bytes()
+
+
+def test_pack_requires_up_to_date_outputs(synced_project):
+    manager, project_root, archives = synced_project
+    (project_root / "project_rules" / "01-first.md").write_text("Edited")
+
+    assert manager.pack(output=str(archives / "a.tar.gz")) == 1
+    assert not (archives / "a.tar.gz").exists()
+
+
+def test_unpack_round_trip(synced_project, temp_dir):
+    manager, project_root, archives = synced_project
+    archive = archives / "rules.tar.gz"
+    assert manager.pack(output=str(archive)) == 0
+
+    restored = Path(temp_dir) / "restored"
+    restored.mkdir()
+    restore_manager = RuleManager(project_root=str(restored))
+    assert restore_manager.unpack(str(archive)) == 0
+
+    assert (restored / ".clinerules" / "01-first").read_text() == \
+        (project_root / ".clinerules" / "01-first").read_text()
+    assert restore_manager.status()["up_to_date"] is True
+    assert restore_manager.pack_key() == manager.pack_key()
+    assert not list((restored / ".rulebook-ai").glob("unpack-*"))
+
+
+def test_unpack_rejects_tampered_archive(synced_project, temp_dir):
+    manager, _, archives = synced_project
+    archive = archives / "rules.tar.gz"
+    assert manager.pack(output=str(archive)) == 0
+
+    tampered = archives / "tampered.tar.gz"
+    with tarfile.open(archive, "r:gz") as src, \
+            tarfile.open(tampered, "w:gz") as dst:
+        for member in src.getmembers():
+            data = src.extractfile(member).read()
+            if member.name == ".clinerules/01-first":
+                data = data.replace(b"First", b"Evil!")
+            dst.addfile(member, io.BytesIO(data))
+
+    restored = Path(temp_dir) / "restored"
+    restored.mkdir()
+    assert RuleManager(project_root=str(restored)).unpack(str(tampered)) == 1
+    assert not (restored / "project_rules").exists()
+    assert not (restored / ".clinerules").exists()
+
+
+def test_unpack_refuses_different_rules_without_force(synced_project, temp_dir):
+    manager, project_root, archives = synced_project
+    archive = archives / "rules.tar.gz"
+    assert manager.pack(output=str(archive)) == 0
+    assert tarfile.open(archive, "r:gz").getnames()[0] == PACK_INDEX_NAME
+
+    (project_root / "project_rules" / "02-second.md").write_text("Local edit")
+    assert manager.unpack(str(archive)) == 1
+    assert (project_root / "project_rules" / "02-second.md").read_text() == "Local edit"
+
+    assert manager.unpack(str(archive), force=True) == 0
+    assert (project_root / "project_rules" / "02-second.md").read_text() == "Second rule"
+    assert manager.status()["up_to_date"] is True
+
+
+def test_unpack_removes_files_not_in_the_archive(synced_project):
+    manager, project_root, archives = synced_project
+    archive = archives / "rules.tar.gz"
+    assert manager.pack(output=str(archive)) == 0
+
+    (project_root / "project_rules" / "03-extra.md").write_text("Extra rule")
+    assert manager.sync(assistants=['cursor', 'cline']) == 0
+    assert (project_root / ".clinerules" / "03-extra").is_file()
+
+    assert manager.unpack(str(archive), force=True) == 0
+    assert sorted(p.name for p in (project_root / "project_rules").iterdir()) == \
+        ["01-first.md", "02-second.md"]
+    assert not (project_root / ".clinerules" / "03-extra").exists()
+    assert not (project_root / ".cursor" / "rules" / "03-extra.mdc").exists()
+    assert manager.status()["up_to_date"] is True
+
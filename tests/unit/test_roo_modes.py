@@ -0,0 +1,104 @@
+"""Unit tests for mode-split RooCode output (.roo/rules-{mode}/)."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from rulebook_ai.core import RuleManager
+
+
+@pytest.fixture
+def project(temp_dir):
+    """Create a project whose project_rules/ follows the bundled rule set layout."""
+    project_root = Path(temp_dir)
+    rules_dir = project_root / "project_rules"
+    for rel_path in [
+        "01-rules/00-meta-rules.md",
+        "02-rules-architect/01-plan_v1.md",
+        "03-rules-code/01-code_v1.md",
+        "04-rules-debug/01-debug_v1.md",
+        "05-notes/01-notes.md",
+    ]:
+        (rules_dir / rel_path).parent.mkdir(parents=True, exist_ok=True)
+        (rules_dir / rel_path).write_text(rel_path)
+    return project_root
+
+
+def roo_files(project_root):
+    roo_dir = project_root / ".roo"
+    return sorted(p.relative_to(roo_dir).as_posix() for p in roo_dir.rglob("*") if p.is_file())
+
+
+def test_roo_sync_splits_mode_directories(project):
+    manager = RuleManager(project_root=str(project))
+    assert manager.sync(assistants=['roo'], include_copilot=False) == 0
+
+    assert roo_files(project) == [
+        "rules-architect/01-plan_v1.md",
+        "rules-code/01-code_v1.md",
+        "rules-debug/01-debug_v1.md",
+        "rules/01-rules/00-meta-rules.md",
+        "rules/05-notes/01-notes.md",
+    ]
+
+
+def test_roo_modes_configurable_per_rule_set(project):
+    (project / "project_rules" / ".rulebook.json").write_text(json.dumps({
+        "roo_modes": {"05-notes": "review", "04-rules-debug": None}
+    }))
+    manager = RuleManager(project_root=str(project))
+    assert manager.sync(assistants=['roo'], include_copilot=False) == 0
+
+    files = roo_files(project)
+    assert "rules-review/01-notes.md" in files
+    assert "rules/04-rules-debug/01-debug_v1.md" in files
+    assert not any(f.startswith("rules-debug/") for f in files)
+
+
+def test_roo_resync_removes_stale_mode_directories(project):
+    manager = RuleManager(project_root=str(project))
+    assert manager.sync(assistants=['roo'], include_copilot=False) == 0
+
+    (project / "project_rules" / "04-rules-debug" / "01-debug_v1.md").unlink()
+    (project / "project_rules" / "04-rules-debug").rmdir()
+    assert manager.sync(assistants=['roo'], include_copilot=False, changed_only=True) == 0
+
+    assert not (project / ".roo" / "rules-debug").exists()
+    assert manager.status()["up_to_date"] is True
+
+
+def test_roo_config_change_triggers_full_resync(project):
+    manager = RuleManager(project_root=str(project))
+    assert manager.sync(assistants=['roo'], include_copilot=False) == 0
+    (project / "project_rules" / ".rulebook.json").write_text(json.dumps({
+        "roo_modes": {"02-rules-architect": "plan"}
+    }))
+
+    assert manager.status()["stale"] == ["roo"]
+    assert manager.sync(assistants=['roo'], include_copilot=False, changed_only=True) == 0
+    assert (project / ".roo" / "rules-plan" / "01-plan_v1.md").is_file()
+    assert not (project / ".roo" / "rules-architect").exists()
+
+
+def test_clean_rules_removes_roo_mode_directories(project):
+    manager = RuleManager(project_root=str(project))
+    assert manager.sync(assistants=['roo'], include_copilot=False) == 0
+    assert manager.clean_rules() == 0
+    assert list((project / ".roo").iterdir()) == []
+
+
+def test_foreign_roo_mode_directories_are_left_alone(project):
+    custom = project / ".roo" / "rules-custom" / "mine.md"
+    custom.parent.mkdir(parents=True)
+    custom.write_text("Hand-written mode rules.\n")
+    manager = RuleManager(project_root=str(project))
+
+    assert manager.sync(assistants=['roo'], include_copilot=False) == 0
+    assert manager.status()["orphaned"] == []
+    assert manager.sync(assistants=['roo'], include_copilot=False) == 0
+    assert custom.is_file()
+
+    assert manager.clean_rules() == 0
+    assert custom.is_file()
+    assert not (project / ".roo" / "rules-code").exists()
@@ -0,0 +1,103 @@
+"""Unit tests for installing rule sets from local git repos and archives."""
+
+import subprocess
+import tarfile
+from pathlib import Path
+
+import pytest
+
+from rulebook_ai import sources
+from rulebook_ai.core import RuleManager
+from rulebook_ai.sources import SourceError, find_rule_set, parse_git_spec, resolve_rule_set_source
+
+
+def git(*args, cwd=None):
+    """Run git with a throwaway identity."""
+    subprocess.run(
+        ["git", "-c", "user.name=Test", "-c", "user.email=test@example.com", *args],
+        cwd=cwd, check=True, capture_output=True,
+    )
+
+
+@pytest.fixture
+def cache_dir(temp_dir, monkeypatch):
+    """Isolate the source cache in the test's temp directory."""
+    cache = Path(temp_dir) / "cache"
+    monkeypatch.setenv(sources.CACHE_DIR_ENV, str(cache))
+    return cache
+
+
+@pytest.fixture
+def bare_repo(temp_dir):
+    """Create a bare git repo holding a 'team' rule set, tagged v1."""
+    work = Path(temp_dir) / "work"
+    (work / "team" / "01-rules").mkdir(parents=True)
+    (work / "team" / "01-rules" / "01-team.md").write_text("Team rule v1")
+    git("init", "-q", str(work))
+    git("add", ".", cwd=work)
+    git("commit", "-q", "-m", "v1", cwd=work)
+    git("tag", "v1", cwd=work)
+    (work / "team" / "01-rules" / "01-team.md").write_text("Team rule v2")
+    git("commit", "-q", "-am", "v2", cwd=work)
+    bare = Path(temp_dir) / "rules.git"
+    git("clone", "-q", "--bare", str(work), str(bare))
+    return bare
+
+
+def test_parse_git_spec():
+    assert parse_git_spec("git+file:///srv/rules.git@v1.2") == (Path("/srv/rules.git"), "v1.2")
+    assert parse_git_spec("git+file:///srv/rules.git") == (Path("/srv/rules.git"), "HEAD")
+
+
+def test_git_source_is_exported_once_per_commit(bare_repo, cache_dir, monkeypatch):
+    spec = f"git+file://{bare_repo}@v1"
+    first = resolve_rule_set_source(spec)
+    assert first.parent == cache_dir / "sources"
+    assert (first / "team" / "01-rules" / "01-team.md").read_text() == "Team rule v1"
+
+    head = resolve_rule_set_source(f"git+file://{bare_repo}")
+    assert head != first
+    assert (head / "team" / "01-rules" / "01-team.md").read_text() == "Team rule v2"
+
+    monkeypatch.setattr(sources, "_extract_tar_stream",
+                        lambda *args: pytest.fail("pinned commit was extracted again"))
+    assert resolve_rule_set_source(spec) == first
+
+
+def test_archive_source_is_keyed_by_digest(temp_dir, cache_dir):
+    rule_set = Path(temp_dir) / "pkg" / "team" / "01-rules"
+    rule_set.mkdir(parents=True)
+    (rule_set / "01-team.md").write_text("Archived rule")
+    archive = Path(temp_dir) / "rules.tar.gz"
+    with tarfile.open(archive, "w:gz") as tar:
+        tar.add(Path(temp_dir) / "pkg", arcname="rules-1.0")
+
+    resolved = resolve_rule_set_source(f"file://{archive}")
+    assert resolved.name.startswith("archive-")
+    assert resolve_rule_set_source(str(archive)) == resolved
+    assert len(list((cache_dir / "sources").iterdir())) == 1
+    assert find_rule_set(resolved, "team") == resolved / "rules-1.0" / "team"
+
+
+def test_unsafe_archive_is_rejected(temp_dir, cache_dir):
+    archive = Path(temp_dir) / "evil.tar"
+    payload = Path(temp_dir) / "payload.md"
+    payload.write_text("x")
+    with tarfile.open(archive, "w") as tar:
+        tar.add(payload, arcname="../escaped.md")
+
+    with pytest.raises(SourceError):
+        resolve_rule_set_source(str(archive))
+    assert not (Path(temp_dir) / "escaped.md").exists()
+    assert not any((cache_dir / "sources").iterdir())
+
+
+def test_install_layers_source_set_over_bundled(bare_repo, cache_dir, temp_dir):
+    target = Path(temp_dir) / "target"
+    target.mkdir()
+    manager = RuleManager(project_root=str(target))
+
+    assert manager.install(rule_set=["test-set", "team"], assistants=['cline'],
+                           rule_set_source=f"git+file://{bare_repo}") == 0
+    assert (target / "project_rules" / "01-rules" / "01-team.md").read_text() == "Team rule v2"
+    assert manager.install(rule_set="missing", rule_set_source=str(bare_repo) + ".nope") == 1
@@ -0,0 +1,79 @@
+"""Unit tests for the read-only `status` drift report."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from rulebook_ai import cli
+from rulebook_ai.core import RuleManager
+
+
+@pytest.fixture
+def synced_project(temp_dir):
+    """Create a project with project_rules/ that has been synced once."""
+    project_root = Path(temp_dir)
+    rules_dir = project_root / "project_rules"
+    rules_dir.mkdir()
+    (rules_dir / "01-first.md").write_text("First rule")
+    (rules_dir / "02-second.md").write_text("Second rule")
+
+    manager = RuleManager(project_root=str(project_root))
+    assert manager.sync(assistants=['cursor', 'cline']) == 0
+    return manager, project_root
+
+
+def test_status_up_to_date_after_sync(synced_project):
+    manager, project_root = synced_project
+    report = manager.status()
+
+    assert report["synced"] is True
+    assert report["up_to_date"] is True
+    assert report["stale"] == report["missing"] == report["orphaned"] == []
+
+
+def test_status_reports_stale_missing_and_orphaned(synced_project):
+    manager, project_root = synced_project
+    (project_root / "project_rules" / "02-second.md").write_text("Second rule, edited")
+    (project_root / ".clinerules" / "01-first").unlink()
+    (project_root / ".cursor" / "rules" / "99-leftover.mdc").write_text("old")
+
+    report = manager.status()
+
+    assert report["up_to_date"] is False
+    assert report["sources"]["modified"] == ["02-second.md"]
+    assert report["stale"] == ["cline", "copilot", "cursor"]
+    assert report["missing"] == [".clinerules/01-first"]
+    assert report["orphaned"] == [".cursor/rules/99-leftover.mdc"]
+
+
+def test_status_partial_sync_leaves_other_assistants_stale(synced_project):
+    manager, project_root = synced_project
+    (project_root / "project_rules" / "01-first.md").write_text("First rule, edited")
+    assert manager.sync(assistants=['cursor']) == 0
+
+    report = manager.status()
+    assert report["sources"]["modified"] == []
+    assert report["stale"] == ["cline"]
+
+
+def test_status_after_install_is_up_to_date(temp_dir):
+    target = Path(temp_dir) / "target"
+    target.mkdir()
+    manager = RuleManager(project_root=str(target))
+    assert manager.install(rule_set="test-set", assistants=['cursor', 'roo']) == 0
+
+    report = manager.status()
+    assert report["up_to_date"] is True, report
+
+
+def test_status_cli_exit_codes(synced_project, capsys):
+    _, project_root = synced_project
+    assert cli.main(["status", "--project-dir", str(project_root), "--json"]) == 0
+    assert json.loads(capsys.readouterr().out)["up_to_date"] is True
+
+    (project_root / "project_rules" / "03-third.md").write_text("Third rule")
+    assert cli.main(["status", "--project-dir", str(project_root)]) == 1
+    assert "added: project_rules/03-third.md" in capsys.readouterr().out
+
+    assert cli.main(["status", "--project-dir", str(project_root / "elsewhere")]) == 2
@@ -0,0 +1,129 @@
+"""Unit tests for manifest-driven `sync --changed-only`."""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from rulebook_ai.core import RuleManager
+from rulebook_ai.manifest import load_manifest
+
+SRC_DIR = Path(__file__).parent.parent.parent / "src"
+
+
+@pytest.fixture
+def synced_project(temp_dir):
+    """Create a project with project_rules/ and an initial full sync."""
+    project_root = Path(temp_dir)
+    rules_dir = project_root / "project_rules"
+    (rules_dir / "01-rules").mkdir(parents=True)
+    (rules_dir / "01-rules" / "00-meta.md").write_text("Meta rule")
+    (rules_dir / "01-rules" / "01-memory.md").write_text("Memory rule")
+    (rules_dir / "02-rules-code").mkdir()
+    (rules_dir / "02-rules-code" / "01-code.md").write_text("Code rule")
+
+    manager = RuleManager(project_root=str(project_root))
+    assert manager.sync(assistants=['cursor', 'roo']) == 0
+    return manager, project_root
+
+
+def count_copies(manager, monkeypatch):
+    """Record every destination written through RuleManager.copy_file."""
+    written = []
+    original = manager.copy_file
+
+    def recording_copy(source, destination):
+        written.append(Path(destination))
+        return original(source, destination)
+
+    monkeypatch.setattr(manager, "copy_file", recording_copy)
+    return written
+
+
+def test_sync_records_manifest(synced_project):
+    manager, project_root = synced_project
+    manifest = load_manifest(project_root)
+
+    assert manifest is not None
+    assert set(manifest["sources"]) == {
+        "01-rules/00-meta.md", "01-rules/01-memory.md", "02-rules-code/01-code.md"
+    }
+    assert manifest["outputs"]["cursor"]["files"] == [
+        ".cursor/rules/01-meta.mdc", ".cursor/rules/02-memory.mdc", ".cursor/rules/03-code.mdc"
+    ]
+    assert manifest["outputs"]["copilot"]["tree"] == manifest["tree"]
+
+
+def test_changed_only_noop_when_nothing_changed(synced_project, monkeypatch, capsys):
+    manager, project_root = synced_project
+    copilot_file = project_root / ".github" / "copilot-instructions.md"
+    copilot_mtime = copilot_file.stat().st_mtime_ns
+    written = count_copies(manager, monkeypatch)
+
+    # Touching a file without changing its content is not a change
+    meta = project_root / "project_rules" / "01-rules" / "00-meta.md"
+    os.utime(meta, ns=(meta.stat().st_atime_ns, meta.stat().st_mtime_ns + 10**9))
+
+    assert manager.sync(assistants=['cursor', 'roo'], changed_only=True) == 0
+    assert written == []
+    assert copilot_file.stat().st_mtime_ns == copilot_mtime
+    assert "up to date" in capsys.readouterr().out
+
+
+def test_changed_only_rerenders_modified_file(synced_project, monkeypatch):
+    manager, project_root = synced_project
+    (project_root / "project_rules" / "01-rules" / "01-memory.md").write_text("Memory rule v2")
+    written = count_copies(manager, monkeypatch)
+
+    assert manager.sync(assistants=['cursor', 'roo'], changed_only=True) == 0
+    assert sorted(p.relative_to(project_root).as_posix() for p in written) == [
+        ".cursor/rules/02-memory.mdc", ".roo/rules/01-rules/01-memory.md"
+    ]
+    assert (project_root / ".cursor/rules/02-memory.mdc").read_text() == "Memory rule v2"
+    assert "Memory rule v2" in (project_root / ".github/copilot-instructions.md").read_text()
+
+
+def test_changed_only_added_file_regenerates_numbering(synced_project):
+    manager, project_root = synced_project
+    (project_root / "project_rules" / "01-rules" / "00-aaa.md").write_text("New first rule")
+
+    assert manager.sync(assistants=['cursor'], changed_only=True) == 0
+    cursor_dir = project_root / ".cursor" / "rules"
+    assert sorted(p.name for p in cursor_dir.iterdir()) == [
+        "01-aaa.mdc", "02-meta.mdc", "03-memory.mdc", "04-code.mdc"
+    ]
+
+
+def test_changed_only_without_manifest_does_full_sync(temp_dir):
+    project_root = Path(temp_dir)
+    (project_root / "project_rules").mkdir()
+    (project_root / "project_rules" / "rule.md").write_text("Rule")
+    manager = RuleManager(project_root=str(project_root))
+
+    assert manager.sync(assistants=['windsurf'], changed_only=True) == 0
+    assert (project_root / ".windsurf" / "rules" / "01-rule.md").read_text() == "Rule"
+    assert load_manifest(project_root) is not None
+
+
+def test_changed_only_noop_stays_within_startup_budget(synced_project):
+    _, project_root = synced_project
+    script = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "from rulebook_ai.cli import main\n"
+        "code = main(['sync', '--changed-only', '--project-dir', sys.argv[1]])\n"
+        "elapsed = time.perf_counter() - start\n"
+        "heavy = ('catalog', 'context_cost', 'diagnostics', 'memory_index', 'packing',\n"
+        "         'snapshots', 'sources', 'templates')\n"
+        "print(code, elapsed, sorted(m for m in heavy if 'rulebook_ai.' + m in sys.modules))\n"
+    )
+    env = {"PATH": "", "PYTHONPATH": str(SRC_DIR)}
+    runs = [subprocess.run([sys.executable, "-c", script, str(project_root)], capture_output=True,
+                           text=True, env=env, timeout=60) for _ in range(3)]
+
+    assert all(run.returncode == 0 for run in runs), runs[0].stderr
+    results = [run.stdout.splitlines()[-1].split(" ", 2) for run in runs]
+    assert all(code == "0" and modules == "[]" for code, _, modules in results)
+    assert min(float(elapsed) for _, elapsed, _ in results) < 0.05
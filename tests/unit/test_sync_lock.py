@@ -0,0 +1,92 @@
+"""Unit tests for the per-project sync lock and request coalescing."""
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from rulebook_ai.core import RuleManager
+from rulebook_ai.locking import SyncCoalescer, file_lock
+
+
+@pytest.fixture
+def project(temp_dir):
+    project_root = Path(temp_dir)
+    (project_root / "project_rules").mkdir()
+    (project_root / "project_rules" / "rule.md").write_text("Rule")
+    return project_root
+
+
+def test_file_lock_non_blocking_reports_busy(temp_dir):
+    lock_path = Path(temp_dir) / "state" / "test.lock"
+    with file_lock(lock_path) as held:
+        assert held is True
+        with file_lock(lock_path, blocking=False) as second:
+            assert second is False
+    with file_lock(lock_path, blocking=False) as third:
+        assert third is True
+
+
+def test_concurrent_syncs_coalesce_into_one_follow_up(project, monkeypatch):
+    manager = RuleManager(project_root=str(project))
+    calls = []
+    first_started = threading.Event()
+    release_first = threading.Event()
+
+    def fake_sync_now(target_root, include_copilot=True, assistants=None, changed_only=False, **options):
+        calls.append((assistants, include_copilot, changed_only))
+        if len(calls) == 1:
+            first_started.set()
+            release_first.wait(timeout=10)
+        return 0
+
+    monkeypatch.setattr(manager, "_sync_now", fake_sync_now)
+    results = {}
+
+    def run(name, **kwargs):
+        results[name] = manager.sync(**kwargs)
+
+    first = threading.Thread(target=run, args=("first",), kwargs={"assistants": ['cursor']})
+    first.start()
+    assert first_started.wait(timeout=10)
+
+    waiters = [
+        threading.Thread(target=run, args=("cline",),
+                         kwargs={"assistants": ['cline'], "changed_only": True}),
+        threading.Thread(target=run, args=("roo",),
+                         kwargs={"assistants": ['roo'], "include_copilot": False}),
+        threading.Thread(target=run, args=("roo-again",),
+                         kwargs={"assistants": ['roo'], "changed_only": True}),
+    ]
+    for waiter in waiters:
+        waiter.start()
+
+    # Wait until every waiter has queued its request behind the running sync
+    coalescer = SyncCoalescer(project / ".rulebook-ai")
+    deadline = time.time() + 10
+    while len(coalescer._read_queue()["pending"]) < 3 and time.time() < deadline:
+        time.sleep(0.01)
+    release_first.set()
+
+    for thread in [first, *waiters]:
+        thread.join(timeout=10)
+
+    assert results == {"first": 0, "cline": 0, "roo": 0, "roo-again": 0}
+    assert len(calls) == 2
+    assert calls[1] == (['cline', 'roo'], True, False)
+
+
+def test_failed_sync_requeues_other_requests(project):
+    (project / ".rulebook-ai").mkdir()
+    coalescer = SyncCoalescer(project / ".rulebook-ai")
+    queue = coalescer._read_queue()
+    queue["pending"]["other"] = {"assistants": ['roo']}
+    coalescer._write_queue(queue)
+
+    def failing_runner(batch):
+        raise RuntimeError("render failed")
+
+    with pytest.raises(RuntimeError):
+        coalescer.run({"assistants": ['cursor']}, failing_runner)
+    assert list(coalescer._read_queue()["pending"]) == ["other"]